@@ -0,0 +1,350 @@
+"""
+Local end-to-end load benchmark for every Lambda handler in the repository
+(see targets.py for the list), against moto's in-memory DynamoDB, Cognito
+and S3. For each handler it measures:
+
+* load    - --requests synthetic events (API Gateway, DynamoDB stream, S3 or
+            Step Functions, whichever triggers the function) replayed from
+            --concurrency threads against one warm module: throughput and
+            p50/p95/p99 latency, plus the status codes returned
+* alloc   - --alloc-requests sequential invocations under tracemalloc: median
+            peak of memory allocated during one invocation, and what stays
+            allocated afterwards (moto keeps written items in memory too)
+* cold    - --cold-runs fresh Python processes: import of the handler module
+            in a clean interpreter with no mocking library loaded, then the
+            first and second invocation after import (against moto)
+
+Threads share one module, as concurrent requests would share one execution
+environment if Lambda allowed it; they show contention on module level state
+(clients, caches, connection pools) rather than how Lambda scales out. moto
+answers in about a millisecond, so compare results between runs on the same
+machine rather than with production latency. Needs boto3 and moto, plus
+aws-lambda-powertools and aws-xray-sdk for the scale-up and enterprise
+handlers (targets with missing packages are skipped and listed):
+
+    python benchmarks/load_benchmark.py --list
+    python benchmarks/load_benchmark.py --stages terraform --requests 500 --concurrency 8
+    python benchmarks/load_benchmark.py --output results.json
+    python benchmarks/load_benchmark.py --baseline results.json --max-regression 0.2
+
+--output writes every number as JSON (with the git commit, Python version and
+parameters of the run). With --baseline the exit code is 1 when a handler's
+p50/p95 latency, cold start or allocation peak regresses by more than
+--max-regression.
+"""
+import argparse
+import contextlib
+import fnmatch
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import targets
+
+RESULT_PREFIX = "BENCHMARK_RESULT "
+# Compared metric -> (path in the results, difference below which it is noise)
+COMPARED = {
+    "p50_ms": (("load", "latency_ms", "p50"), 1.0),
+    "p95_ms": (("load", "latency_ms", "p95"), 2.0),
+    "cold_ms": (("cold", "cold_ms"), 5.0),
+    "peak_kib": (("alloc", "peak_kib"), 16.0),
+}
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Send the handlers' logs and EMF metrics to /dev/null; formatting them is still measured."""
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        yield
+
+
+def _ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def _invoke(target, module, index):
+    """One invocation. Returns (elapsed ms, status): the statusCode, "ok" or the exception name."""
+    event = target.event(index)
+    context = targets.Context(target.name)
+    start = time.perf_counter()
+    try:
+        response = module.lambda_handler(event, context)
+    except Exception as e:
+        return _ms(start), type(e).__name__
+    elapsed = _ms(start)
+    status = response.get("statusCode", "ok") if isinstance(response, dict) else "ok"
+    return elapsed, str(status)
+
+
+def _prepare(target, counter_start, count):
+    if target.prepare:
+        target.prepare(counter_start, count)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(cuts[49], 3),
+        "p95": round(cuts[94], 3),
+        "p99": round(cuts[98], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def measure_load(target, module, counter, requests, concurrency, warmup):
+    start_index = next(counter)
+    _prepare(target, start_index, warmup + requests + 1)
+    for _ in range(warmup):
+        _invoke(target, module, next(counter))
+
+    statuses = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        outcomes = list(executor.map(lambda index: _invoke(target, module, index),
+                                     [next(counter) for _ in range(requests)]))
+        elapsed = time.perf_counter() - start
+    for _, status in outcomes:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_ms": summarize([ms for ms, _ in outcomes]),
+        "status_codes": dict(sorted(statuses.items())),
+    }
+
+
+def measure_allocations(target, module, counter, requests):
+    _prepare(target, next(counter), requests + 1)
+    peaks = []
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(requests):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            _invoke(target, module, next(counter))
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return {
+        "requests": requests,
+        "peak_kib": round(statistics.median(peaks) / 1024, 1),
+        "retained_kib_per_request": round(retained / requests / 1024, 2),
+    }
+
+
+def _child(mode, name):
+    """Runs in the measured process; prints one result line for the parent."""
+    target = targets.TARGETS[name]
+    for key, value in targets.BASE_ENV.items():
+        os.environ.setdefault(key, value)  # the parent's --log-level is inherited
+    os.environ.update(target.env)
+    result = {"target": name, "mode": mode}
+
+    with _quiet():
+        if mode == "import":
+            # Nothing may reach AWS here: clients created at import point at a closed port
+            os.environ.update(AWS_ENDPOINT_URL="http://127.0.0.1:9", COGNITO_USER_POOL_ID="eu-central-1_bench",
+                              COGNITO_CLIENT_ID="bench")
+            start = time.perf_counter()
+            target.load()
+            result["import_ms"] = _ms(start)
+        else:
+            from moto import mock_aws
+
+            with mock_aws():
+                targets.setup_resources()
+                _prepare(target, 0, 2)
+                module = target.load()
+                result["first_ms"], result["status"] = _invoke(target, module, 0)
+                result["warm_ms"], _ = _invoke(target, module, 1)
+
+    print(RESULT_PREFIX + json.dumps(result), file=sys.__stdout__, flush=True)
+
+
+def _run_child(mode, name):
+    completed = subprocess.run([sys.executable, __file__, "--child", mode, name],
+                               capture_output=True, text=True, check=False)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"{name} ({mode}) produced no result:\n{completed.stderr[-2000:]}")
+
+
+def measure_cold(name, runs):
+    samples = {"import_ms": [], "first_ms": [], "warm_ms": []}
+    for _ in range(runs):
+        samples["import_ms"].append(_run_child("import", name)["import_ms"])
+        invoked = _run_child("invoke", name)
+        samples["first_ms"].append(invoked["first_ms"])
+        samples["warm_ms"].append(invoked["warm_ms"])
+    cold = {key: round(statistics.median(values), 1) for key, values in samples.items()}
+    # What a request that lands on a new execution environment waits for (plus Lambda's own init)
+    cold["cold_ms"] = round(cold["import_ms"] + cold["first_ms"], 1)
+    cold["runs"] = runs
+    return cold
+
+
+def _print_row(name, result, out):
+    load, alloc, cold = result.get("load"), result.get("alloc"), result.get("cold")
+    line = f"{name:<32}"
+    if load:
+        latency = load["latency_ms"]
+        codes = ",".join(f"{code}x{count}" for code, count in load["status_codes"].items())
+        line += (f" {load['throughput_rps']:>8.1f} req/s  p50 {latency['p50']:>7.2f}  p95 {latency['p95']:>7.2f}"
+                 f"  p99 {latency['p99']:>7.2f} ms")
+    if alloc:
+        line += f"  peak {alloc['peak_kib']:>7.1f} KiB"
+    if cold:
+        line += f"  cold {cold['cold_ms']:>7.1f} ms (import {cold['import_ms']:.1f})"
+    if load:
+        line += f"  [{codes}]"
+    print(line, file=out, flush=True)
+
+
+def run(selected, args, out):
+    from moto import mock_aws
+
+    results = {}
+    os.environ.update(targets.BASE_ENV)
+    os.environ["LOG_LEVEL"] = args.log_level
+    with mock_aws():
+        with _quiet():
+            targets.setup_resources()
+        for name in selected:
+            target = targets.TARGETS[name]
+            os.environ.update(target.env)
+            result = {"stage": target.stage, "trigger": target.trigger}
+            counter = itertools.count()
+            with _quiet():
+                module = target.load()
+                if args.requests:
+                    result["load"] = measure_load(target, module, counter, args.requests, args.concurrency,
+                                                  args.warmup)
+                if args.alloc_requests:
+                    result["alloc"] = measure_allocations(target, module, counter, args.alloc_requests)
+            if args.cold_runs:
+                result["cold"] = measure_cold(name, args.cold_runs)
+            results[name] = result
+            _print_row(name, result, out)
+    return results
+
+
+def _metric(result, path):
+    for key in path:
+        result = (result or {}).get(key)
+    return result
+
+
+def compare(results, baseline, max_regression):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric, (path, noise_floor) in COMPARED.items():
+            before, after = _metric(previous, path), _metric(current, path)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + max_regression) and after - before > noise_floor:
+                regressions.append(f"{name}.{metric}: {before:.1f} -> {after:.1f}")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=targets.ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _select(parser, args):
+    selected = [name for name, target in targets.TARGETS.items()
+                if (not args.stages or target.stage in args.stages)
+                and (not args.targets or any(fnmatch.fnmatch(name, pattern) for pattern in args.targets))]
+    if not selected:
+        parser.error("no targets match --stages/--targets (see --list)")
+    skipped = {}
+    for name in selected:
+        missing = targets.TARGETS[name].missing()
+        if missing:
+            skipped[name] = f"not installed: {', '.join(missing)}"
+    return [name for name in selected if name not in skipped], skipped
+
+
+def _csv(value):
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", type=_csv, help=f"comma separated, from: {', '.join(targets.STAGES)}")
+    parser.add_argument("--targets", type=_csv, help="comma separated names or patterns, e.g. 'enterprise.get_*'")
+    parser.add_argument("--requests", type=int, default=200, help="invocations per target in the load phase (0 skips it)")
+    parser.add_argument("--concurrency", type=int, default=4, help="threads replaying events in the load phase")
+    parser.add_argument("--warmup", type=int, default=10, help="invocations before the load phase is timed")
+    parser.add_argument("--alloc-requests", type=int, default=50, help="invocations under tracemalloc (0 skips it)")
+    parser.add_argument("--cold-runs", type=int, default=3, help="fresh processes per target (0 skips it)")
+    parser.add_argument("--log-level", default="INFO", help="LOG_LEVEL for the handlers (INFO, as deployed)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file written by --output to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    parser.add_argument("--list", action="store_true", help="list the targets and exit")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "TARGET"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(*args.child)
+        return 0
+    if args.list:
+        for name, target in targets.TARGETS.items():
+            missing = target.missing()
+            print(f"{name:<32} {target.trigger:<16} {'missing: ' + ', '.join(missing) if missing else ''}")
+        return 0
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    selected, skipped = _select(parser, args)
+    for name, reason in skipped.items():
+        print(f"{name:<32} skipped ({reason})")
+    results = run(selected, args, sys.stdout)
+
+    if args.output:
+        document = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "parameters": {key: getattr(args, key) for key in
+                               ("requests", "concurrency", "warmup", "alloc_requests", "cold_runs", "log_level")},
+            },
+            "results": results,
+            "skipped": skipped,
+        }
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline.get("results", {}), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
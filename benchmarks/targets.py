@@ -0,0 +1,444 @@
+"""
+The Lambda handlers exercised by load_benchmark.py: where each handler's code
+lives, the environment it reads, the packages it needs and the synthetic event
+it is invoked with, plus the moto-backed resources they all share.
+
+Handlers are loaded the way Lambda loads them:
+
+* startup / scale-up - the inline ZipFile code of the function in template.yaml,
+                       written out as index.py and imported from there
+* enterprise         - handlers.<name> from src/, with the SharedCodeLayer
+                       (layer/) on the path
+* terraform          - terraform/lambda/<name>.py with its shared modules
+* snippets           - snippets/scheduled_task/transform_lambda.py (S3 trigger)
+"""
+import importlib
+import importlib.util
+import json
+import os
+import re
+import sys
+import tempfile
+import textwrap
+import threading
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+CLOUDFORMATION = ROOT / "cloudformation"
+ENTERPRISE = CLOUDFORMATION / "enterprise"
+TERRAFORM_LAMBDA = ROOT / "terraform" / "lambda"
+SCHEDULED_TASK = ROOT / "snippets" / "scheduled_task"
+
+REGION = "eu-central-1"
+ORDERS_TABLE = "bench-Orders"
+CUSTOMERS_TABLE = "bench-Customers"
+FEEDBACK_TABLE = "bench-Feedback"
+STATS_TABLE = "bench-AnalyticsStats"
+USER_TABLE = "bench-UserData"
+ITEMS_TABLE = "example-table"  # hard-coded in some terraform handlers
+DATA_BUCKET = "bench-data"
+INDEX_NAME = "UserOrdersIndex"
+
+SEED_USER_ID = "user-0001"
+SEED_ORDER_ID = "order-0001"
+SEED_EMAIL = "bench@example.com"
+SEED_PASSWORD = "Bench-Passw0rd!"
+SEED_ORDERS = 25      # orders of SEED_USER_ID, i.e. one list page
+SEED_ITEMS = 200      # terraform items, read by the get/put/batch endpoints
+SEED_OBJECTS = 32     # raw_data/ objects for the transform
+
+# Set before any handler is imported (module level constants read them)
+BASE_ENV = {
+    "AWS_DEFAULT_REGION": REGION,
+    "AWS_REGION": REGION,
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_SESSION_TOKEN": "testing",
+    "POWERTOOLS_METRICS_NAMESPACE": "MyApp",
+    "POWERTOOLS_SERVICE_NAME": "benchmark",
+    "POWERTOOLS_TRACE_DISABLED": "1",
+    "LOG_LEVEL": "INFO",
+}
+
+# Packages a stage needs on top of boto3 (which the harness needs anyway)
+POWERTOOLS = ("aws_lambda_powertools", "aws_xray_sdk")
+
+
+class Context:
+    """The parts of the Lambda context object the handlers use."""
+    memory_limit_in_mb = 512
+    function_version = "$LATEST"
+
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.invoked_function_arn = f"arn:aws:lambda:{REGION}:123456789012:function:{function_name}"
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+class Target:
+    """
+    One handler. `event(index)` builds the index-th event of a run, `prepare(start, count)`
+    (optional) creates whatever events start..start+count-1 consume, e.g. items to delete.
+    """
+
+    def __init__(self, name, trigger, load, event, env=None, requires=(), prepare=None):
+        self.name = name
+        self.stage = name.split(".")[0]
+        self.trigger = trigger
+        self.load = load
+        self.event = event
+        self.env = env or {}
+        self.requires = requires
+        self.prepare = prepare
+
+    def missing(self):
+        """Names of required packages that are not installed."""
+        return [module for module in self.requires if importlib.util.find_spec(module) is None]
+
+
+# --- events -------------------------------------------------------------------
+
+def rest_event(method, path, body=None, path_parameters=None, query=None, version=None):
+    """API Gateway proxy event: REST API, or HTTP API with version="1.0" (terraform)."""
+    event = {
+        "resource": path,
+        "path": path,
+        "httpMethod": method,
+        "headers": {"Accept-Encoding": "gzip, deflate, br", "Content-Type": "application/json"},
+        "queryStringParameters": query,
+        "pathParameters": path_parameters,
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+        "requestContext": {"requestId": str(uuid.uuid4()), "stage": "prod", "httpMethod": method,
+                           "identity": {"sourceIp": "127.0.0.1"}},
+    }
+    if version:
+        event.update(version=version, routeKey=f"{method} {path}")
+    return event
+
+
+def http_event(method, path, body=None, path_parameters=None, query=None):
+    return rest_event(method, path, body, path_parameters, query, version="1.0")
+
+
+def s3_event(key):
+    return {"Records": [{
+        "eventSource": "aws:s3",
+        "eventName": "ObjectCreated:Put",
+        "s3": {"bucket": {"name": DATA_BUCKET}, "object": {"key": key}},
+    }]}
+
+
+def stream_event(index):
+    order_id = f"order-stream-{index}"
+    return {"Records": [{
+        "eventName": "INSERT",
+        "dynamodb": {
+            "Keys": {"orderId": {"S": order_id}},
+            "NewImage": {"orderId": {"S": order_id}, "orderTotal": {"N": "10"}, "status": {"S": "PENDING"}},
+        },
+    }]}
+
+
+def _email(index):
+    # Unique across runs and processes: every registration creates a user
+    return f"bench-{uuid.uuid4().hex[:12]}-{index}@example.com"
+
+
+def _order_body(index):
+    return {"userId": SEED_USER_ID, "shippingAddress": "Main St 1",
+            "items": [{"productId": f"p{index % 7}", "price": 10.5, "quantity": 2},
+                      {"productId": "p9", "price": 3, "quantity": 1}]}
+
+
+def _item_id(index):
+    return f"item-{index % SEED_ITEMS:05d}"
+
+
+# --- loaders ------------------------------------------------------------------
+
+_extracted_dir = None
+
+
+def inline_code(template, resource):
+    """The ZipFile source of `resource` in a CloudFormation template."""
+    lines = Path(template).read_text(encoding="utf-8").split("\n")
+    start = lines.index(f"  {resource}:")
+    for index in range(start + 1, len(lines)):
+        if re.match(r"^  \S", lines[index]):
+            break  # next resource, no inline code
+        match = re.match(r"^(\s*)ZipFile: \|", lines[index])
+        if match:
+            indent, block = len(match.group(1)), []
+            for line in lines[index + 1:]:
+                if line.strip() and len(line) - len(line.lstrip()) <= indent:
+                    break
+                block.append(line)
+            return textwrap.dedent("\n".join(block))
+    raise LookupError(f"{resource} has no ZipFile code in {template}")
+
+
+def _load_file(module_name, path):
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def inline(stage, resource):
+    def load():
+        global _extracted_dir
+        if _extracted_dir is None:
+            _extracted_dir = Path(tempfile.mkdtemp(prefix="lambda-benchmark-"))
+        directory = _extracted_dir / stage / resource
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "index.py").write_text(inline_code(CLOUDFORMATION / stage / "template.yaml", resource),
+                                            encoding="utf-8")
+        return _load_file(f"{stage.replace('-', '_')}_{resource}", directory / "index.py")
+    return load
+
+
+def enterprise(handler):
+    def load():
+        for path in (ENTERPRISE / "layer", ENTERPRISE / "src"):
+            if str(path) not in sys.path:
+                sys.path.insert(0, str(path))
+        return importlib.import_module(f"handlers.{handler}")
+    return load
+
+
+def from_file(directory, filename):
+    def load():
+        if str(directory) not in sys.path:
+            sys.path.insert(0, str(directory))  # shared modules (pagination, batch, ...)
+        return _load_file(f"{directory.name}_{Path(filename).stem}", directory / filename)
+    return load
+
+
+# --- local resources ----------------------------------------------------------
+
+def _create_table(dynamodb, name, key, index_key=None):
+    attributes = [{"AttributeName": key, "AttributeType": "S"}]
+    extra = {}
+    if index_key:
+        attributes.append({"AttributeName": index_key, "AttributeType": "S"})
+        extra["GlobalSecondaryIndexes"] = [{
+            "IndexName": INDEX_NAME,
+            "KeySchema": [{"AttributeName": index_key, "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }]
+    dynamodb.create_table(TableName=name, BillingMode="PAY_PER_REQUEST", AttributeDefinitions=attributes,
+                          KeySchema=[{"AttributeName": key, "KeyType": "HASH"}], **extra)
+
+
+def _serialize_moto_transactions():
+    # moto's TransactWriteItems copies tables while other threads write to them
+    # ("dictionary changed size during iteration"); DynamoDB itself has no such limit
+    from moto.dynamodb.models import DynamoDBBackend
+
+    original = DynamoDBBackend.transact_write_items
+    if getattr(original, "serialized", False):
+        return
+    lock = threading.Lock()
+
+    def transact_write_items(self, *args, **kwargs):
+        with lock:
+            return original(self, *args, **kwargs)
+
+    transact_write_items.serialized = True
+    DynamoDBBackend.transact_write_items = transact_write_items
+
+
+def setup_resources():
+    """
+    Create the tables, user pool, bucket and seed data every target expects.
+    Must run inside moto's mock_aws; the pool and client ids are exported in
+    the environment before the handlers read them at import.
+    """
+    import boto3
+
+    _serialize_moto_transactions()
+    dynamodb = boto3.client("dynamodb", region_name=REGION)
+    _create_table(dynamodb, ORDERS_TABLE, "orderId", index_key="userId")
+    _create_table(dynamodb, CUSTOMERS_TABLE, "userId")
+    _create_table(dynamodb, FEEDBACK_TABLE, "feedbackId")
+    _create_table(dynamodb, STATS_TABLE, "statId")
+    _create_table(dynamodb, ITEMS_TABLE, "id")
+    dynamodb.create_table(TableName=USER_TABLE, BillingMode="PAY_PER_REQUEST",
+                          KeySchema=[{"AttributeName": "PK", "KeyType": "HASH"},
+                                     {"AttributeName": "SK", "KeyType": "RANGE"}],
+                          AttributeDefinitions=[{"AttributeName": "PK", "AttributeType": "S"},
+                                                {"AttributeName": "SK", "AttributeType": "S"}])
+
+    resource = boto3.resource("dynamodb", region_name=REGION)
+    orders = [{
+        "orderId": SEED_ORDER_ID if index == 0 else f"order-{index + 1:04d}", "userId": SEED_USER_ID,
+        "status": "PENDING", "orderTotal": Decimal("21.00"), "createdAt": Decimal(1700000000 + index),
+        "items": [{"productId": "p1", "price": Decimal("10.5"), "quantity": Decimal(2)}],
+    } for index in range(SEED_ORDERS)]
+    with resource.Table(ORDERS_TABLE).batch_writer() as writer:
+        for order in orders:
+            writer.put_item(Item=order)
+    # The same orders and a profile in the enterprise single-table layout (GetDashboard)
+    with resource.Table(USER_TABLE).batch_writer() as writer:
+        writer.put_item(Item={"PK": f"USER#{SEED_USER_ID}", "SK": "PROFILE", "itemType": "PROFILE",
+                              "userId": SEED_USER_ID, "email": SEED_EMAIL, "firstName": "Bench"})
+        for order in orders:
+            writer.put_item(Item={**order, "PK": f"USER#{SEED_USER_ID}", "itemType": "ORDER",
+                                  "SK": f"ORDER#{int(order['createdAt']):010d}#{order['orderId']}"})
+    with resource.Table(ITEMS_TABLE).batch_writer() as writer:
+        for index in range(SEED_ITEMS):
+            writer.put_item(Item={"id": _item_id(index), "name": f"Item {index}",
+                                  "description": "seeded", "value": Decimal(index)})
+
+    cognito = boto3.client("cognito-idp", region_name=REGION)
+    pool_id = cognito.create_user_pool(PoolName="bench")["UserPool"]["Id"]
+    client_id = cognito.create_user_pool_client(
+        UserPoolId=pool_id, ClientName="bench",
+        ExplicitAuthFlows=["ALLOW_ADMIN_USER_PASSWORD_AUTH", "ALLOW_USER_PASSWORD_AUTH",
+                           "ALLOW_REFRESH_TOKEN_AUTH"])["UserPoolClient"]["ClientId"]
+    cognito.admin_create_user(UserPoolId=pool_id, Username=SEED_EMAIL, MessageAction="SUPPRESS")
+    cognito.admin_set_user_password(UserPoolId=pool_id, Username=SEED_EMAIL, Password=SEED_PASSWORD, Permanent=True)
+    os.environ["COGNITO_USER_POOL_ID"] = pool_id
+    os.environ["COGNITO_CLIENT_ID"] = client_id
+
+    s3 = boto3.client("s3", region_name=REGION)
+    s3.create_bucket(Bucket=DATA_BUCKET, CreateBucketConfiguration={"LocationConstraint": REGION})
+    for index in range(SEED_OBJECTS):
+        record = {"id": f"rec-{index}", "payload": {"value1": index, "value2": "abc", "items": list(range(20))}}
+        s3.put_object(Bucket=DATA_BUCKET, Key=f"raw_data/record-{index:04d}.json", Body=json.dumps(record))
+
+
+def _seed_deletable(start, count):
+    import boto3
+
+    with boto3.resource("dynamodb", region_name=REGION).Table(ITEMS_TABLE).batch_writer() as writer:
+        for index in range(start, start + count):
+            writer.put_item(Item={"id": f"del-{index:06d}", "name": "to delete"})
+
+
+def _deletable_ids(index, size=1):
+    return [f"del-{position:06d}" for position in range(index * size, (index + 1) * size)]
+
+
+def _seed_deletable_batches(size):
+    def prepare(start, count):
+        _seed_deletable(start * size, count * size)
+    return prepare
+
+
+# --- catalogue ----------------------------------------------------------------
+
+def _cloudformation_api(stage, requires=()):
+    """The seven API Gateway functions every CloudFormation stage defines."""
+    def target(resource, event):
+        name = re.sub(r"(?<!^)(?=[A-Z])", "_", resource[:-len("Function")]).lower()
+        return Target(f"{stage}.{name}", "api", inline(stage, resource), event, requires=requires)
+
+    return [
+        target("RegisterUserFunction", lambda i: rest_event("POST", "/register", {
+            "email": _email(i), "password": SEED_PASSWORD, "firstName": "Bench", "lastName": "User"})),
+        target("LoginUserFunction", lambda i: rest_event("POST", "/login",
+                                                          {"email": SEED_EMAIL, "password": SEED_PASSWORD})),
+        target("CreateOrderFunction", lambda i: rest_event("POST", "/orders", _order_body(i))),
+        target("GetOrdersFunction", lambda i: rest_event("GET", "/orders", query={"userId": SEED_USER_ID})),
+        target("GetOrderDetailsFunction", lambda i: rest_event("GET", "/orders/{orderId}",
+                                                                path_parameters={"orderId": SEED_ORDER_ID})),
+        target("SubmitFeedbackFunction", lambda i: rest_event("POST", "/feedback", {
+            "userId": SEED_USER_ID, "rating": 1 + i % 5, "comment": "fast delivery"})),
+        target("GetAnalyticsFunction", lambda i: rest_event("GET", "/analytics")),
+    ]
+
+
+def _enterprise():
+    def target(handler, trigger, event, env=None):
+        return Target(f"enterprise.{handler}", trigger, enterprise(handler), event, env, POWERTOOLS)
+
+    return [
+        target("register_user", "api", lambda i: rest_event("POST", "/register", {
+            "email": _email(i), "password": SEED_PASSWORD, "firstName": "Bench", "lastName": "User"})),
+        target("login_user", "api", lambda i: rest_event("POST", "/login",
+                                                         {"email": SEED_EMAIL, "password": SEED_PASSWORD})),
+        target("create_order", "api", lambda i: rest_event("POST", "/orders", _order_body(i))),
+        target("get_orders", "api", lambda i: rest_event("GET", "/orders", query={"userId": SEED_USER_ID})),
+        target("get_order_details", "api", lambda i: rest_event("GET", "/orders/{orderId}",
+                                                                 path_parameters={"orderId": SEED_ORDER_ID})),
+        target("get_dashboard", "api", lambda i: rest_event("GET", "/users/{userId}/dashboard",
+                                                             path_parameters={"userId": SEED_USER_ID})),
+        target("submit_feedback", "api", lambda i: rest_event("POST", "/feedback", {
+            "userId": SEED_USER_ID, "rating": 1 + i % 5, "comment": "fast delivery"}),
+            env={"TABLE_NAME": FEEDBACK_TABLE}),
+        target("get_analytics", "api", lambda i: rest_event("GET", "/analytics")),
+        target("analytics_aggregator", "dynamodb-stream", stream_event),
+        # One state of PaymentProcessingStateMachine; ValidatePayment can run again on the same order
+        target("payment_step", "step-functions",
+               lambda i: {"step": "ValidatePayment", "input": {"orderId": SEED_ORDER_ID}}),
+    ]
+
+
+def _terraform():
+    def target(handler, event, prepare=None):
+        return Target(f"terraform.{handler}", "api", from_file(TERRAFORM_LAMBDA, f"{handler}.py"), event,
+                      {"DYNAMODB_TABLE_NAME": ITEMS_TABLE}, prepare=prepare)
+
+    return [
+        target("post", lambda i: http_event("POST", "/items", {"name": f"Item {i}", "value": str(i)})),
+        target("get", lambda i: http_event("GET", "/items", query={"limit": "25"})),
+        target("get_by_id", lambda i: http_event("GET", "/items/{id}", path_parameters={"id": _item_id(i)})),
+        target("put", lambda i: http_event("PUT", "/items", {"id": _item_id(i), "name": f"Renamed {i}",
+                                                             "value": str(i)})),
+        target("delete", lambda i: http_event("DELETE", "/items", {"id": _deletable_ids(i)[0]}),
+               prepare=_seed_deletable),
+        target("batch_post", lambda i: http_event("POST", "/items/batch", {
+            "items": [{"name": f"Item {i}-{n}", "value": n} for n in range(25)]})),
+        target("batch_get", lambda i: http_event("POST", "/items/batch-get", {
+            "ids": [_item_id(i * 25 + n) for n in range(25)]})),
+        target("batch_delete", lambda i: http_event("POST", "/items/batch-delete",
+                                                    {"ids": _deletable_ids(i, 25)}),
+               prepare=_seed_deletable_batches(25)),
+    ]
+
+
+def _snippets():
+    return [
+        Target("snippets.transform", "s3", from_file(SCHEDULED_TASK, "transform_lambda.py"),
+               lambda i: s3_event(f"raw_data/record-{i % SEED_OBJECTS:04d}.json"),
+               {"S3_BUCKET_NAME": DATA_BUCKET, "COMPACT_OUTPUT": "true"}),
+    ]
+
+
+STAGE_ENV = {
+    "startup": {"CUSTOMERS_TABLE_NAME": CUSTOMERS_TABLE, "ORDERS_TABLE_NAME": ORDERS_TABLE,
+                "ORDERS_INDEX_NAME": INDEX_NAME, "FEEDBACK_TABLE_NAME": FEEDBACK_TABLE},
+    "scale-up": {"CUSTOMERS_TABLE_NAME": CUSTOMERS_TABLE, "TABLE_NAME": ORDERS_TABLE, "INDEX_NAME": INDEX_NAME,
+                 "ORDERS_TABLE": ORDERS_TABLE, "CUSTOMERS_TABLE": CUSTOMERS_TABLE},
+    "enterprise": {"CUSTOMERS_TABLE_NAME": CUSTOMERS_TABLE, "ORDERS_TABLE_NAME": ORDERS_TABLE,
+                   "TABLE_NAME": FEEDBACK_TABLE, "INDEX_NAME": INDEX_NAME, "STATS_TABLE_NAME": STATS_TABLE,
+                   # as deployed with SingleTableWrites=true: writes also copy to the user table
+                   "USER_TABLE_NAME": USER_TABLE},
+}
+
+
+def _with_stage_env(targets):
+    for target in targets:
+        target.env = {**STAGE_ENV.get(target.stage, {}), **target.env}
+    return targets
+
+
+TARGETS = {target.name: target for target in _with_stage_env(
+    _cloudformation_api("startup")
+    + _cloudformation_api("scale-up", POWERTOOLS)
+    + [Target("scale-up.payment_step", "step-functions", inline("scale-up", "PaymentStepLambdaFunction"),
+              lambda i: {"orderId": SEED_ORDER_ID}, requires=POWERTOOLS)]
+    + _enterprise()
+    + _terraform()
+    + _snippets()
+)}
+
+STAGES = tuple(dict.fromkeys(target.stage for target in TARGETS.values()))
@@ -0,0 +1,204 @@
+"""
+Login, token refresh and registration latency of LoginUser and RegisterUser
+(src/handlers/) against moto's Cognito user pool and DynamoDB:
+
+* login    - POST /login, ADMIN_USER_PASSWORD_AUTH with the password
+* refresh  - POST /login/refresh, REFRESH_TOKEN_AUTH with the refresh token
+             the login returned; no password is sent or checked
+* register - POST /register: sign_up, then admin_confirm_sign_up and the
+             Customers write, one after the other (sequential) or at the
+             same time (overlapped, the handler's way)
+
+moto answers in well under a millisecond and does not verify passwords the
+way Cognito does, so every call first sleeps a simulated round trip:
+--password-auth-ms for a password login, --refresh-auth-ms for a refresh,
+--cognito-ms for the other Cognito calls and --dynamodb-ms per DynamoDB
+request. These are assumptions to adjust, not Cognito measurements; what
+the benchmark measures is how many of them a request waits for in a row.
+Needs boto3, aws-lambda-powertools, aws-xray-sdk and moto[cognitoidp]:
+
+    python benchmarks/auth_benchmark.py --requests 50
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+CUSTOMERS_TABLE = "bench-Customers"
+PASSWORD = "Bench-Passw0rd!"
+
+os.environ.update({
+    "AWS_DEFAULT_REGION": "eu-central-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "POWERTOOLS_METRICS_NAMESPACE": "MyApp",
+    "POWERTOOLS_SERVICE_NAME": "benchmark",
+    "POWERTOOLS_TRACE_DISABLED": "1",
+    "LOG_LEVEL": "WARNING",
+    "LOG_EVENT_SAMPLE_RATE": "0",
+    "CUSTOMERS_TABLE_NAME": CUSTOMERS_TABLE,
+})
+sys.path[:0] = [str(ROOT / "src"), str(ROOT / "layer")]
+
+
+class _Context:
+    function_name = "benchmark"
+    function_version = "$LATEST"
+    memory_limit_in_mb = 512
+    invoked_function_arn = "arn:aws:lambda:eu-central-1:123456789012:function:benchmark"
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 15000
+
+
+class _Inline:
+    """Runs RegisterUser's confirmation on the handler thread: the sequential flow."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class Latency:
+    """Sleeps a simulated round trip before every Cognito and DynamoDB call."""
+
+    def __init__(self, clients, args):
+        self.args = args
+        for client in clients:
+            client.meta.events.register("before-parameter-build", self._keep_auth_flow)
+            client.meta.events.register("before-call", self._before_call)
+
+    @staticmethod
+    def _keep_auth_flow(params, context, **kwargs):
+        # before-call only sees the serialized request
+        context["auth_flow"] = params.get("AuthFlow")
+
+    def _before_call(self, model, context, **kwargs):
+        if model.service_model.service_name == "dynamodb":
+            ms = self.args.dynamodb_ms
+        elif model.name == "AdminInitiateAuth":
+            refresh = context.get("auth_flow") == "REFRESH_TOKEN_AUTH"
+            ms = self.args.refresh_auth_ms if refresh else self.args.password_auth_ms
+        else:
+            ms = self.args.cognito_ms
+        time.sleep(ms / 1000)
+
+
+def _event(path, body):
+    return {"httpMethod": "POST", "path": path, "resource": path, "headers": {"Content-Type": "application/json"},
+            "body": json.dumps(body), "isBase64Encoded": False,
+            "requestContext": {"requestId": str(uuid.uuid4()), "stage": "prod"}}
+
+
+def _timed(handler, event):
+    start = time.perf_counter()
+    response = handler(event, _Context())
+    return response, time.perf_counter() - start
+
+
+def _report(name, seconds):
+    seconds = sorted(seconds)
+    p50, p95 = seconds[len(seconds) // 2], seconds[int(len(seconds) * 0.95)]
+    print(f"{name:<22} p50 {p50 * 1000:>6.1f} ms   p95 {p95 * 1000:>6.1f} ms")
+    return p50
+
+
+def _register(register_user, requests):
+    timings = []
+    for _ in range(requests):
+        email = f"{uuid.uuid4().hex[:12]}@example.com"
+        response, seconds = _timed(register_user.lambda_handler, _event("/register", {
+            "email": email, "password": PASSWORD, "firstName": "Bench", "lastName": "User"}))
+        assert response["statusCode"] == 201 and "warning" not in json.loads(response["body"]), response
+        timings.append(seconds)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="requests per measurement")
+    parser.add_argument("--password-auth-ms", type=float, default=150.0)
+    parser.add_argument("--refresh-auth-ms", type=float, default=50.0)
+    parser.add_argument("--cognito-ms", type=float, default=60.0, help="any other Cognito call")
+    parser.add_argument("--dynamodb-ms", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    import boto3
+    from moto import mock_aws
+
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName=CUSTOMERS_TABLE, BillingMode="PAY_PER_REQUEST",
+            KeySchema=[{"AttributeName": "userId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "userId", "AttributeType": "S"}])
+        cognito = boto3.client("cognito-idp")
+        pool_id = cognito.create_user_pool(PoolName="bench", UsernameAttributes=["email"])["UserPool"]["Id"]
+        os.environ["COGNITO_USER_POOL_ID"] = pool_id
+        os.environ["COGNITO_CLIENT_ID"] = cognito.create_user_pool_client(
+            UserPoolId=pool_id, ClientName="bench",
+            ExplicitAuthFlows=["ALLOW_ADMIN_USER_PASSWORD_AUTH", "ALLOW_REFRESH_TOKEN_AUTH"])["UserPoolClient"]["ClientId"]
+
+        from common import runtime
+        from handlers import login_user, register_user
+        # Lambda runs one request per process; the benchmark runs silent, as in idempotency_benchmark
+        logging.disable(logging.WARNING)
+        Latency([runtime.client("cognito-idp"), runtime.client("dynamodb"), runtime.dynamodb().meta.client], args)
+
+        print(f"{args.requests} requests each; simulated: password auth {args.password_auth_ms:g} ms, refresh "
+              f"{args.refresh_auth_ms:g} ms, other Cognito calls {args.cognito_ms:g} ms, "
+              f"DynamoDB {args.dynamodb_ms:g} ms")
+        # The handlers' EMF metric lines go to stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            overlapped = _register(register_user, args.requests)
+            confirmations, register_user._confirmations = register_user._confirmations, _Inline()
+            sequential = _register(register_user, args.requests)
+            register_user._confirmations = confirmations
+
+            email = f"{uuid.uuid4().hex[:12]}@example.com"
+            registered = register_user.lambda_handler(_event("/register", {
+                "email": email, "password": PASSWORD, "firstName": "Bench", "lastName": "User"}), _Context())
+            assert registered["statusCode"] == 201, registered
+            logins, refreshes, refresh_token = [], [], None
+            for _ in range(args.requests):
+                response, seconds = _timed(login_user.lambda_handler,
+                                           _event("/login", {"email": email, "password": PASSWORD}))
+                assert response["statusCode"] == 200, response
+                refresh_token = json.loads(response["body"])["refreshToken"]
+                logins.append(seconds)
+            for _ in range(args.requests):
+                response, seconds = _timed(login_user.lambda_handler,
+                                           _event("/login/refresh", {"refreshToken": refresh_token}))
+                body = json.loads(response["body"])
+                assert response["statusCode"] == 200 and body["idToken"] and "refreshToken" not in body, response
+                refreshes.append(seconds)
+            # (moto fails an unknown refresh token with an internal error, not NotAuthorizedException)
+            missing = login_user.lambda_handler(_event("/login/refresh", {}), _Context())
+        assert missing["statusCode"] == 400, missing
+
+    sequential_p50 = _report("register (sequential)", sequential)
+    overlapped_p50 = _report("register (overlapped)", overlapped)
+    login_p50 = _report("login (password)", logins)
+    refresh_p50 = _report("refresh (token)", refreshes)
+    print(f"register {sequential_p50 / overlapped_p50:.2f}x faster overlapped; "
+          f"refresh {login_p50 / refresh_p50:.2f}x faster than a password login")
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Product catalog (layer/common/catalog.py) behind CreateOrder, on moto's S3 and
+DynamoDB. Writes --products products as the ETL job does (Parquet files
+partitioned by category and ingest_date, decimal(10,2) discounted_price, 10%
+of the products with stock 0), then measures:
+
+* the first load, a refresh when nothing changed (one LIST) and a refresh
+  after a job run appended files (only those are read), with new prices and
+  products that sold out since
+* the memory of the index, against keeping the rows as dicts
+* CreateOrder with the catalog: the price stored is the catalog's, and an
+  order for a product out of stock is rejected with 409 and no DynamoDB
+  request, and a retry (same Idempotency-Key) of an order that succeeded
+  before its product sold out still gets the stored 201
+
+Needs boto3, aws-lambda-powertools, aws-xray-sdk, moto and pyarrow:
+
+    python benchmarks/catalog_benchmark.py --products 200000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+ORDERS_TABLE = "bench-Orders"
+IDEMPOTENCY_TABLE = "bench-Idempotency"
+BUCKET = "bench-transformed-data"
+PREFIX = "transformed_product_data/"
+CATEGORIES = ["Accessories", "Appliances", "Books", "Electronics", "Furniture"]
+
+os.environ.update({
+    "AWS_DEFAULT_REGION": "eu-central-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "POWERTOOLS_METRICS_NAMESPACE": "MyApp",
+    "POWERTOOLS_SERVICE_NAME": "benchmark",
+    "POWERTOOLS_TRACE_DISABLED": "1",
+    "LOG_LEVEL": "WARNING",
+    "LOG_EVENT_SAMPLE_RATE": "0",
+    "ORDERS_TABLE_NAME": ORDERS_TABLE,
+    "IDEMPOTENCY_TABLE_NAME": IDEMPOTENCY_TABLE,
+    "PRODUCT_CATALOG_S3_PATH": f"s3://{BUCKET}/{PREFIX}",
+    "PRODUCT_CATALOG_REFRESH_SECONDS": "0",
+})
+sys.path[:0] = [str(ROOT / "src"), str(ROOT / "layer")]
+
+
+class _Context:
+    function_name = "benchmark"
+    function_version = "$LATEST"
+    memory_limit_in_mb = 512
+    invoked_function_arn = "arn:aws:lambda:eu-central-1:123456789012:function:benchmark"
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 15000
+
+
+def _products(count, seed):
+    """(rows in stock, rows out of stock), as the job writes them."""
+    rng = random.Random(seed)
+    rows, out_of_stock = [], []
+    updated = datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+    for i in range(count):
+        price = Decimal(rng.randint(100, 200000)).scaleb(-2)
+        row = {"id": f"prod{seed}-{i:09d}", "name": f"Product {i}", "category": rng.choice(CATEGORIES),
+               "price": float(price), "stock": 0 if rng.random() < 0.1 else rng.randint(1, 500),
+               "discounted_price": (price * Decimal("0.9")).quantize(Decimal("0.01")), "last_updated": updated}
+        (rows if row["stock"] > 0 else out_of_stock).append(row)
+    return rows, out_of_stock
+
+
+def _write_files(s3, rows, files_per_category, ingest_date):
+    """
+    Write `rows` as the job's partitioned write would: up to `files_per_category`
+    Parquet objects in each category's partition. Returns the number written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("id", pa.string()), ("name", pa.string()), ("price", pa.float64()),
+                        ("stock", pa.int32()), ("last_updated", pa.timestamp("us", tz="UTC")),
+                        ("discounted_price", pa.decimal128(10, 2)), ("etl_processed_at", pa.timestamp("us"))])
+    now = int(time.time() * 1_000_000)
+    written, by_category = 0, {}
+    for row in rows:
+        by_category.setdefault(row["category"], []).append(row)
+    for category, category_rows in by_category.items():
+        per_file = -(-len(category_rows) // files_per_category)
+        for part, start in enumerate(range(0, len(category_rows), per_file)):
+            chunk = category_rows[start:start + per_file]
+            columns = {name: [row[name] for row in chunk] for name in schema.names if name != "etl_processed_at"}
+            table = pa.table({**columns, "etl_processed_at": [now] * len(chunk)}, schema=schema)
+            out = io.BytesIO()
+            pq.write_table(table, out, compression="snappy")
+            s3.put_object(Bucket=BUCKET, Body=out.getvalue(),
+                          Key=f"{PREFIX}category={category}/ingest_date={ingest_date}/"
+                              f"part-{part:05d}-{uuid.uuid4()}.c000.snappy.parquet")
+            written += 1
+    s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}_SUCCESS", Body=b"")
+    return written
+
+
+class Calls:
+    """Counts the requests a client makes, per operation."""
+
+    def __init__(self, client):
+        self.counts = Counter()
+        client.meta.events.register("before-call", self._count)
+
+    def _count(self, model, **kwargs):
+        self.counts[model.name] += 1
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _memory(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def _order_event(items, idempotency_key=None):
+    headers = {"Content-Type": "application/json"}
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    return {"httpMethod": "POST", "path": "/orders", "resource": "/orders",
+            "headers": headers, "isBase64Encoded": False,
+            "body": json.dumps({"userId": "user-0001", "shippingAddress": "Main St 1", "items": items}),
+            "requestContext": {"requestId": str(uuid.uuid4()), "stage": "prod"}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--files-per-category", type=int, default=2, help="Parquet files per partition")
+    parser.add_argument("--orders", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    import boto3
+    from moto import mock_aws
+
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "eu-central-1"})
+        boto3.client("dynamodb").create_table(
+            TableName=ORDERS_TABLE, BillingMode="PAY_PER_REQUEST",
+            KeySchema=[{"AttributeName": "orderId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "orderId", "AttributeType": "S"}])
+        boto3.client("dynamodb").create_table(
+            TableName=IDEMPOTENCY_TABLE, BillingMode="PAY_PER_REQUEST",
+            KeySchema=[{"AttributeName": "idempotencyKey", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "idempotencyKey", "AttributeType": "S"}])
+        rows, out_of_stock = _products(args.products, 1)
+        files = _write_files(s3, rows + out_of_stock, args.files_per_category, "2024-05-01")
+
+        from common import catalog, runtime
+        from handlers import create_order
+        logging.disable(logging.WARNING)
+        calls = Calls(runtime.client("s3"))
+        dynamodb = Calls(runtime.dynamodb().meta.client)
+
+        products = catalog.Catalog(os.environ["PRODUCT_CATALOG_S3_PATH"])
+        read, load_ms = _timed(products.refresh)
+        print(f"{len(rows):,} products in stock and {len(out_of_stock):,} out of stock in {read} files: "
+              f"first load {load_ms:,.0f} ms ({dict(calls.counts)})")
+        assert len(products.prices) == len(rows) + len(out_of_stock) and read == files
+        assert all(products.price(row["id"]) == row["discounted_price"] for row in rows[:1000])
+        assert all(products.price(row["id"]) is None for row in out_of_stock[:1000])
+
+        calls.counts.clear()
+        read, unchanged_ms = _timed(products.refresh)
+        print(f"refresh, nothing changed:  {unchanged_ms:,.1f} ms, {read} files read ({dict(calls.counts)})")
+        assert read == 0 and "GetObject" not in calls.counts
+
+        # An order (with an Idempotency-Key) for a product that sells out in the next run
+        catalog.set_catalog(products)
+        sold_out_order = _order_event([{"productId": rows[100]["id"], "quantity": 1}], "order-before-sell-out")
+        with contextlib.redirect_stdout(io.StringIO()):
+            created = create_order.lambda_handler(sold_out_order, _Context())
+        assert created["statusCode"] == 201, created
+
+        # The next job run appends a file per category with the products that changed: new prices,
+        # products sold out, a late row older than the one loaded (ignored), and new products
+        later = rows[0]["last_updated"] + timedelta(days=1)
+        earlier = rows[0]["last_updated"] - timedelta(days=1)
+        updated = [dict(row, discounted_price=row["discounted_price"] + Decimal("1.00"), last_updated=later)
+                   for row in rows[:100]]
+        sold_out = [dict(row, stock=0, last_updated=later) for row in rows[100:110]]
+        stale = [dict(rows[110], discounted_price=Decimal("0.01"), last_updated=earlier)]
+        added, added_out_of_stock = _products(1000, 2)
+        files = _write_files(s3, updated + sold_out + stale + added + added_out_of_stock, 1, "2024-05-02")
+        calls.counts.clear()
+        read, appended_ms = _timed(products.refresh)
+        print(f"refresh, {files} files appended: {appended_ms:,.1f} ms, {read} files read ({dict(calls.counts)})")
+        assert read == files and calls.counts["GetObject"] == read
+        assert products.price(rows[0]["id"]) == rows[0]["discounted_price"] + Decimal("1.00")
+        assert all(products.price(row["id"]) is None for row in sold_out)
+        assert products.price(rows[110]["id"]) == rows[110]["discounted_price"]
+        assert len(products.prices) == len(rows) + len(out_of_stock) + len(added) + len(added_out_of_stock)
+
+        # The retry of the order placed before the sell-out gets its 201; a new order for it a 409
+        with contextlib.redirect_stdout(io.StringIO()):
+            replayed = create_order.lambda_handler(sold_out_order, _Context())
+            refused = create_order.lambda_handler(
+                _order_event([{"productId": rows[100]["id"], "quantity": 1}], "order-after-sell-out"), _Context())
+        assert replayed["statusCode"] == 201 and replayed["body"] == created["body"], replayed
+        assert replayed["headers"]["Idempotent-Replayed"] == "true"
+        assert refused["statusCode"] == 409, refused
+        print("sold out since: retried order replayed with its 201, new order rejected with 409")
+
+        # What a load keeps: the index, against every row of every file as a dict
+        import pyarrow.parquet as pq
+        bodies = [s3.get_object(Bucket=BUCKET, Key=key)["Body"].read() for key in products.objects]
+        fresh = catalog.Catalog(os.environ["PRODUCT_CATALOG_S3_PATH"])
+        _, index_bytes = _memory(fresh.refresh)
+        _, rows_bytes = _memory(lambda: {row["id"]: row for body in bodies
+                                         for row in pq.read_table(io.BytesIO(body)).to_pylist()})
+        print(f"index {index_bytes / len(fresh.prices):,.0f} bytes per product "
+              f"(all columns as dicts: {rows_bytes / len(fresh.prices):,.0f})")
+
+        available = rows[:100] + rows[110:]
+        timings = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for index in range(args.orders):
+                row = available[index * 7 % len(available)]
+                items = [{"productId": row["id"], "price": 0.01, "quantity": 2}]
+                response, ms = _timed(lambda: create_order.lambda_handler(_order_event(items), _Context()))
+                assert response["statusCode"] == 201, response
+                assert Decimal(str(json.loads(response["body"])["orderTotal"])) == products.price(row["id"]) * 2
+                timings.append(ms)
+            dynamodb.counts.clear()
+            rejected = create_order.lambda_handler(_order_event(
+                [{"productId": rows[0]["id"], "quantity": 1}, {"productId": out_of_stock[0]["id"], "quantity": 1}]),
+                _Context())
+        assert rejected["statusCode"] == 409
+        assert json.loads(rejected["body"])["productIds"] == [out_of_stock[0]["id"]]
+        assert not dynamodb.counts, dynamodb.counts
+        timings.sort()
+        print(f"CreateOrder priced from the catalog: p50 {timings[len(timings) // 2]:.1f} ms; "
+              f"out-of-stock order rejected with 409 and no DynamoDB request")
+
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
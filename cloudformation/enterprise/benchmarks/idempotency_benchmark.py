@@ -0,0 +1,250 @@
+"""
+Duplicate order submissions against CreateOrder (src/handlers/create_order.py)
+on moto's in-memory DynamoDB: every order is sent --duplicates times at once,
+as a client retrying after gateway timeouts would, from --workers threads.
+
+* no key          - today's clients: every duplicate creates an order
+* Idempotency-Key - one order per key; the other submissions get the stored
+                    response (same orderId, Idempotent-Replayed: true)
+
+The submissions run one at a time under a lock, which each gives up only for
+the --latency-ms round trip slept before every DynamoDB request: duplicates
+interleave at their DynamoDB calls, as they would in separate Lambda
+environments, while the handler code (and its module-level Powertools Metrics,
+which is not thread safe) and moto (whose TransactWriteItems is not either)
+never run on two threads at once. moto's TransactWriteItems deep-copies every
+table it touches for its rollback, so the time spent in moto and queued for
+the lock is taken out of the reported latencies: they are the handler's own
+time plus --latency-ms per request. The item normalisation is
+timed on its own, the old nested conversion loops against the single pass.
+Needs boto3, aws-lambda-powertools, aws-xray-sdk and moto:
+
+    python benchmarks/idempotency_benchmark.py --orders 100 --duplicates 4 --workers 16
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import timeit
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+ORDERS_TABLE = "bench-Orders"
+IDEMPOTENCY_TABLE = "bench-Idempotency"
+
+os.environ.update({
+    "AWS_DEFAULT_REGION": "eu-central-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "POWERTOOLS_METRICS_NAMESPACE": "MyApp",
+    "POWERTOOLS_SERVICE_NAME": "benchmark",
+    "POWERTOOLS_TRACE_DISABLED": "1",
+    "LOG_LEVEL": "WARNING",
+    "LOG_EVENT_SAMPLE_RATE": "0",
+    "ORDERS_TABLE_NAME": ORDERS_TABLE,
+    "IDEMPOTENCY_TABLE_NAME": IDEMPOTENCY_TABLE,
+})
+sys.path[:0] = [str(ROOT / "src"), str(ROOT / "layer")]
+
+
+class _Context:
+    function_name = "benchmark"
+    function_version = "$LATEST"
+    memory_limit_in_mb = 512
+    invoked_function_arn = "arn:aws:lambda:eu-central-1:123456789012:function:benchmark"
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+class MotoCalls:
+    """
+    Runs one submission at a time across threads (`run`), letting the others
+    in during each DynamoDB request's simulated round trip; counts requests per
+    operation and keeps each thread's time spent queued for the lock and
+    inside moto (`in_moto`).
+    """
+
+    def __init__(self, clients, latency_ms):
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.counts = Counter()
+        for client in clients:
+            client.meta.events.register("before-call.dynamodb", self._before_call)
+            client.meta.events.register("after-call.dynamodb", self._after_call)
+
+    @property
+    def in_moto(self):
+        return getattr(self.local, "in_moto", 0.0)
+
+    def run(self, fn):
+        """fn() holding the lock; returns its result and the seconds not spent queued or in moto."""
+        start = time.perf_counter()
+        self.lock.acquire()
+        self.local.in_moto = time.perf_counter() - start
+        try:
+            return fn(), time.perf_counter() - start - self.in_moto
+        finally:
+            self.lock.release()
+
+    def _before_call(self, model, context, **kwargs):
+        self.lock.release()
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        context["moto_start"] = time.perf_counter()
+        self.lock.acquire()
+        self.counts[model.name] += 1
+
+    def _after_call(self, context, **kwargs):
+        self.local.in_moto = self.in_moto + time.perf_counter() - context["moto_start"]
+
+
+def _order_body(index, items):
+    return {
+        "userId": f"user-{index % 50:04d}",
+        "items": [{"productId": f"p-{line}", "name": "Widget", "price": 9.99 + line, "quantity": 1 + line % 3}
+                  for line in range(items)],
+        "shippingAddress": {"street": "1 Main St", "city": "Bratislava", "zip": "81101"},
+        "paymentMethod": "card",
+    }
+
+
+def _event(body, key=None):
+    headers = {"Content-Type": "application/json"}
+    if key:
+        headers["Idempotency-Key"] = key
+    return {"httpMethod": "POST", "path": "/orders", "resource": "/orders", "headers": headers,
+            "body": body, "isBase64Encoded": False,
+            "requestContext": {"requestId": str(uuid.uuid4()), "stage": "prod"}}
+
+
+def _count_orders(client):
+    return sum(page["Count"] for page in client.get_paginator("scan").paginate(TableName=ORDERS_TABLE,
+                                                                                Select="COUNT"))
+
+
+def _run(create_order, client, calls, name, args, with_key):
+    run = uuid.uuid4().hex[:8]
+    bodies = [json.dumps(_order_body(index, args.items)) for index in range(args.orders)]
+    # Duplicates of one order are submitted back to back, so they are in flight together
+    submissions = [(index, f"{run}-{index}" if with_key else None)
+                   for index in range(args.orders) for _ in range(args.duplicates)]
+    before = _count_orders(client)
+    calls.counts.clear()
+
+    def submit(submission):
+        index, key = submission
+        response, seconds = calls.run(lambda: create_order.lambda_handler(_event(bodies[index], key), _Context()))
+        return index, response, seconds
+
+    start = time.perf_counter()
+    # The handlers' EMF metric lines go to stdout
+    with ThreadPoolExecutor(max_workers=args.workers) as pool, contextlib.redirect_stdout(io.StringIO()):
+        results = list(pool.map(submit, submissions))
+    elapsed = time.perf_counter() - start
+
+    created = _count_orders(client) - before
+    replays = sum(1 for _, response, _ in results if response["headers"].get("Idempotent-Replayed"))
+    assert all(response["statusCode"] == 201 for _, response, _ in results), \
+        [response for _, response, _ in results if response["statusCode"] != 201][:3]
+    order_ids = {}
+    for index, response, _ in results:
+        order_ids.setdefault(index, set()).add(json.loads(response["body"])["orderId"])
+    latencies = sorted(seconds for _, _, seconds in results)
+    p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+    requests = ", ".join(f"{count / len(results):.2f} {operation}" for operation, count in sorted(calls.counts.items()))
+    print(f"{name:<16} p50 {p50 * 1000:>6.1f} ms   p99 {p99 * 1000:>6.1f} ms   {created:>5} orders created   "
+          f"{replays:>5} replays   per submission: {requests}   ({elapsed:.1f} s on moto)")
+    return created, order_ids
+
+
+def _old_normalise(items):
+    # CreateOrder before: a sum over str() conversions, then nested loops converting every number again
+    order_total = Decimal(sum(Decimal(str(item.get('price', 0))) * Decimal(str(item.get('quantity', 1)))
+                              for item in items))
+    decimal_items = []
+    for item in items:
+        decimal_item = {}
+        for key, value in item.items():
+            decimal_item[key] = Decimal(str(value)) if isinstance(value, (int, float)) else value
+        decimal_items.append(decimal_item)
+    return decimal_items, order_total
+
+
+def _normalisation(create_order, items, number):
+    body = json.dumps(_order_body(0, items))
+    old = timeit.timeit(lambda: _old_normalise(json.loads(body)["items"]), number=number) / number
+    new = timeit.timeit(lambda: create_order.normalise_items(
+        json.loads(body, parse_float=Decimal, parse_int=Decimal)["items"]), number=number) / number
+    old_items, old_total = _old_normalise(json.loads(body)["items"])
+    new_items = json.loads(body, parse_float=Decimal, parse_int=Decimal)["items"]
+    assert create_order.normalise_items(new_items) == old_total and new_items == old_items
+    print(f"parse + normalise {items} items: {old * 1e6:,.1f} us before, {new * 1e6:,.1f} us single pass "
+          f"({old / new:.1f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100, help="distinct orders")
+    parser.add_argument("--duplicates", type=int, default=4, help="submissions of each order")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--items", type=int, default=5, help="lines per order")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated round trip per DynamoDB request")
+    args = parser.parse_args(argv)
+
+    import boto3
+    from moto import mock_aws
+
+    with mock_aws():
+        client = boto3.client("dynamodb")
+        for name, key in ((ORDERS_TABLE, "orderId"), (IDEMPOTENCY_TABLE, "idempotencyKey")):
+            client.create_table(TableName=name, BillingMode="PAY_PER_REQUEST",
+                                KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+                                AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}])
+
+        from common import runtime
+        from handlers import create_order
+        # The handler's log lines are not what is measured
+        logging.disable(logging.WARNING)
+
+        calls = MotoCalls([runtime.client("dynamodb"), runtime.dynamodb().meta.client], args.latency_ms)
+
+        print(f"{args.orders} orders x {args.duplicates} submissions, {args.workers} workers, "
+              f"{args.latency_ms:g} ms per DynamoDB request")
+        # Keyed first: moto's transaction cost grows with the tables it copies
+        created, order_ids = _run(create_order, client, calls, "Idempotency-Key", args, with_key=True)
+        assert created == args.orders, f"{created} orders for {args.orders} keys"
+        assert all(len(ids) == 1 for ids in order_ids.values()), "duplicates answered with different orders"
+        created, _ = _run(create_order, client, calls, "no key", args, with_key=False)
+        assert created == args.orders * args.duplicates
+
+        # The same key with another body is refused, not answered with the first order
+        key = f"mismatch-{uuid.uuid4().hex}"
+        with contextlib.redirect_stdout(io.StringIO()):
+            first, _ = calls.run(lambda: create_order.lambda_handler(_event(json.dumps(_order_body(1, 1)), key),
+                                                                     _Context()))
+            second, _ = calls.run(lambda: create_order.lambda_handler(_event(json.dumps(_order_body(1, 2)), key),
+                                                                      _Context()))
+        assert (first["statusCode"], second["statusCode"]) == (201, 422), (first, second)
+
+    _normalisation(create_order, args.items, 2000)
+    _normalisation(create_order, 50, 200)
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
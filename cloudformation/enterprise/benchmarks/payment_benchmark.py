@@ -0,0 +1,160 @@
+"""
+Local run of the payment handler (src/handlers/payment_step.py) against
+moto's in-memory DynamoDB, counting the DynamoDB requests it makes:
+
+* steps  - PaymentProcessingStateMachine's path for each order: ValidatePayment,
+           ProcessExternally and UpdateOrderStatus, invoked as the state machine
+           does ({"step": <state name>, "input": <previous output>})
+* batch  - the same number of orders settled by one invocation, as a Map state
+           with an ItemBatcher sends them ({"Items": [{"orderId": ...}, ...]})
+* sqs    - the same again as an SQS batch ({"Records": [...]})
+
+Every path checks that each order ends up PAID, that a paid order is not paid
+twice and that unknown orders are reported rather than created. Needs boto3,
+aws-lambda-powertools, aws-xray-sdk and moto:
+
+    python benchmarks/payment_benchmark.py --orders 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+ORDERS_TABLE = "bench-Orders"
+STATE_PATH = ("ValidatePayment", "ProcessExternally", "UpdateOrderStatus")
+
+os.environ.update({
+    "AWS_DEFAULT_REGION": "eu-central-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "POWERTOOLS_METRICS_NAMESPACE": "MyApp",
+    "POWERTOOLS_SERVICE_NAME": "benchmark",
+    "POWERTOOLS_TRACE_DISABLED": "1",
+    "LOG_LEVEL": "WARNING",
+    "ORDERS_TABLE_NAME": ORDERS_TABLE,
+})
+sys.path[:0] = [str(ROOT / "src"), str(ROOT / "layer")]
+
+
+class _Context:
+    function_name = "benchmark"
+    function_version = "$LATEST"
+    memory_limit_in_mb = 512
+    invoked_function_arn = "arn:aws:lambda:eu-central-1:123456789012:function:benchmark"
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+class RequestCounter:
+    """Counts the requests made by a client through its botocore event hooks."""
+
+    def __init__(self, client):
+        self.count = 0
+        client.meta.events.register("before-call.dynamodb", self._on_call)
+
+    def _on_call(self, **kwargs):
+        self.count += 1
+
+
+def _seed(table, count, prefix):
+    order_ids = [f"{prefix}-{index:05d}" for index in range(count)]
+    with table.batch_writer() as writer:
+        for order_id in order_ids:
+            writer.put_item(Item={"orderId": order_id, "userId": "user-0001", "status": "PENDING",
+                                  "orderTotal": Decimal("21.00"), "items": [], "createdAt": Decimal(0)})
+    return order_ids
+
+
+def _assert_paid(table, order_ids):
+    for order_id in order_ids:
+        item = table.get_item(Key={"orderId": order_id})["Item"]
+        assert item["status"] == "PAID" and item["paymentStatus"] == "COMPLETED", item
+
+
+def _report(name, invocations, requests, elapsed, orders):
+    print(f"{name:<6} {orders:>6} orders   {invocations / orders:>5.2f} invocations/order   "
+          f"{requests / orders:>5.2f} DynamoDB requests/order   {elapsed * 1000 / orders:>7.2f} ms/order")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100, help="orders settled by each path")
+    parser.add_argument("--batch-size", type=int, default=100, help="orders per batch / SQS invocation")
+    args = parser.parse_args(argv)
+
+    import boto3
+    from moto import mock_aws
+
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName=ORDERS_TABLE, BillingMode="PAY_PER_REQUEST",
+            KeySchema=[{"AttributeName": "orderId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "orderId", "AttributeType": "S"}])
+        table = boto3.resource("dynamodb").Table(ORDERS_TABLE)
+
+        from common import runtime
+        from handlers import payment_step
+
+        counter = RequestCounter(runtime.client("dynamodb"))
+
+        # Step Functions path: three invocations per order
+        order_ids = _seed(table, args.orders, "steps")
+        counter.count, start = 0, time.perf_counter()
+        for order_id in order_ids:
+            state = {"orderId": order_id}
+            for step in STATE_PATH:
+                state = payment_step.lambda_handler({"step": step, "input": state}, _Context())
+            assert state["orderStatus"] == "PAID", state
+        _report("steps", len(STATE_PATH) * args.orders, counter.count, time.perf_counter() - start, args.orders)
+        _assert_paid(table, order_ids)
+        json.dumps(state)  # the state output must be plain JSON for Step Functions
+
+        # A second payment of a paid order is rejected by the condition, not by a read
+        try:
+            payment_step.lambda_handler({"step": "ValidatePayment", "input": {"orderId": order_ids[0]}}, _Context())
+            raise AssertionError("paid order validated again")
+        except payment_step.OrderAlreadyPaid:
+            pass
+
+        # Map state with an ItemBatcher
+        order_ids = _seed(table, args.orders, "batch")
+        counter.count, invocations, start = 0, 0, time.perf_counter()
+        for offset in range(0, len(order_ids), args.batch_size):
+            chunk = order_ids[offset:offset + args.batch_size]
+            result = payment_step.lambda_handler({"Items": [{"orderId": order_id} for order_id in chunk]}, _Context())
+            assert result["settled"] == len(chunk), result
+            invocations += 1
+        _report("batch", invocations, counter.count, time.perf_counter() - start, args.orders)
+        _assert_paid(table, order_ids)
+
+        # SQS batch, including a duplicate payment and an unknown order
+        order_ids = _seed(table, args.orders, "sqs")
+        counter.count, invocations, start = 0, 0, time.perf_counter()
+        for offset in range(0, len(order_ids), args.batch_size):
+            chunk = order_ids[offset:offset + args.batch_size]
+            records = [{"messageId": order_id, "body": json.dumps({"orderId": order_id})} for order_id in chunk]
+            result = payment_step.lambda_handler({"Records": records}, _Context())
+            assert result == {"batchItemFailures": []}, result
+            invocations += 1
+        _report("sqs", invocations, counter.count, time.perf_counter() - start, args.orders)
+        _assert_paid(table, order_ids)
+
+        result = payment_step.lambda_handler({"Items": [{"orderId": order_ids[0]}, {"orderId": "missing"}]}, _Context())
+        assert {r["orderId"]: r.get("error") for r in result["results"]} == {order_ids[0]: "already_paid",
+                                                                              "missing": "not_found"}, result
+        assert "Item" not in table.get_item(Key={"orderId": "missing"})
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Micro-benchmark for common.serialization against the per-handler encoder it
+replaced, on order payloads shaped like the ones DynamoDB returns (every
+number a Decimal):
+
+* page     - a GetOrders page (--orders orders of --items line items each)
+* order    - a single GetOrderDetails body
+* to_plain - PaymentStep's Decimal stripping: json.loads(json.dumps(cls=...))
+             before, one to_plain() pass now
+* gzip/br  - compressing the page body, with the resulting sizes
+
+Runs in-process and needs the layer's simplejson (plus `brotli` for the br
+row). The minimum over --repeat runs is reported, per call:
+
+    python benchmarks/serialization_benchmark.py
+    python benchmarks/serialization_benchmark.py --orders 100 --items 10 --repeat 9
+"""
+import argparse
+import json
+import random
+import sys
+import timeit
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "layer"))
+
+from common import serialization  # noqa: E402
+
+
+class LegacyDecimalEncoder(json.JSONEncoder):
+    """The encoder each handler used to carry."""
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return super().default(o)
+
+
+def legacy_dumps(body):
+    return json.dumps(body, cls=LegacyDecimalEncoder)
+
+
+def legacy_plain(value):
+    return json.loads(json.dumps(value, cls=LegacyDecimalEncoder))
+
+
+def make_order(rng, index, item_count):
+    items = [{
+        "productId": f"prod-{rng.randrange(10000):05d}",
+        "name": f"Product {rng.randrange(500)}",
+        "price": Decimal(f"{rng.uniform(1, 500):.2f}"),
+        "quantity": Decimal(rng.randint(1, 5)),
+    } for _ in range(item_count)]
+    return {
+        "orderId": f"order-{index:06d}",
+        "userId": "user-0001",
+        "status": rng.choice(["PENDING", "PAID", "SHIPPED"]),
+        "items": items,
+        "orderTotal": sum((item["price"] * item["quantity"] for item in items), Decimal(0)),
+        "shippingAddress": "Main Street 1, 811 01 Bratislava",
+        "createdAt": Decimal(1700000000 + index),
+        "updatedAt": Decimal(1700000000 + index),
+    }
+
+
+def best_us(func, number, repeat):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def compare_us(legacy, new, number, repeat):
+    """Best per-call time of both, alternating the runs so both see the same machine load."""
+    legacy_runs, new_runs = [], []
+    for _ in range(repeat):
+        legacy_runs.append(timeit.timeit(legacy, number=number))
+        new_runs.append(timeit.timeit(new, number=number))
+    return min(legacy_runs) / number * 1e6, min(new_runs) / number * 1e6
+
+
+def _row(name, legacy_us, new_us):
+    print(f"{name:<10} legacy {legacy_us:>10.1f} us   new {new_us:>10.1f} us   x{legacy_us / new_us:>5.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=20, help="orders per GetOrders page (the handler's default limit)")
+    parser.add_argument("--items", type=int, default=5, help="line items per order")
+    parser.add_argument("--number", type=int, default=200, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=15, help="timing runs (the minimum is reported)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(42)
+    orders = [make_order(rng, index, args.items) for index in range(args.orders)]
+    page = {"orders": orders, "count": len(orders)}
+    order = {"order": orders[0]}
+
+    # Same numbers either way, but only the new encoder keeps every digit
+    assert json.loads(serialization.dumps(page)) == json.loads(legacy_dumps(page))
+    assert json.loads(serialization.dumps(page), parse_float=Decimal) == page
+    exact = {"orderTotal": Decimal("12345678901234567.5")}
+    assert json.loads(serialization.dumps(exact), parse_float=Decimal) == exact
+    assert json.loads(legacy_dumps(exact), parse_float=Decimal) != exact
+    assert serialization.to_plain(order) == legacy_plain(order)
+
+    page_bytes = len(serialization.dumps(page).encode("utf-8"))
+    legacy_bytes = len(legacy_dumps(page).encode("utf-8"))
+    print(f"page: {args.orders} orders x {args.items} items, {legacy_bytes} bytes of JSON before, {page_bytes} now")
+
+    def run(legacy, new, payload):
+        return compare_us(lambda: legacy(payload), lambda: new(payload), args.number, args.repeat)
+
+    _row("page", *run(legacy_dumps, serialization.dumps, page))
+    _row("order", *run(legacy_dumps, serialization.dumps, order))
+    _row("to_plain", *run(legacy_plain, serialization.to_plain, order))
+
+    data = serialization.dumps(page).encode("utf-8")
+    encodings = ["gzip"] + (["br"] if serialization.brotli else [])
+    for encoding in encodings:
+        size = len(serialization.compress(data, encoding))
+        took = best_us(lambda: serialization.compress(data, encoding), max(1, args.number // 10), args.repeat)
+        print(f"{encoding:<10} {took:>10.1f} us   {page_bytes} -> {size} bytes ({size / page_bytes:.0%})")
+    if not serialization.brotli:
+        print("br         skipped (pip install brotli)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Cold-start benchmark for the enterprise handlers (src/handlers).
+
+Every measurement runs in a fresh Python process, so module caches are as
+cold as in a new Lambda execution environment:
+
+* import  - time to import the handler module (Powertools, boto3, clients)
+            in a clean interpreter, with no mocking library loaded
+* first   - first invocation after import, against moto-mocked AWS services
+* warm    - second invocation in the same process
+
+Absolute numbers depend on the machine (and Lambda CPU scales with memory);
+compare runs on the same machine. Requires boto3, aws-lambda-powertools,
+aws-xray-sdk and moto:
+
+    python benchmarks/startup_benchmark.py --runs 5
+    python benchmarks/startup_benchmark.py --runs 5 --save baseline.json
+    python benchmarks/startup_benchmark.py --runs 5 --baseline baseline.json --max-regression 0.2
+
+With --baseline the exit code is 1 when a handler's median import or first
+invocation time regresses by more than --max-regression.
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULT_PREFIX = "BENCHMARK_RESULT "
+# Differences below this are noise, whatever the relative change
+NOISE_FLOOR_MS = 5.0
+
+ORDERS_TABLE = "bench-Orders"
+CUSTOMERS_TABLE = "bench-Customers"
+STATS_TABLE = "bench-AnalyticsStats"
+FEEDBACK_TABLE = "bench-Feedback"
+USER_TABLE = "bench-UserData"
+RATINGS_TABLE = "bench-FeedbackRatings"
+SEED_ORDER_ID = "order-0001"
+SEED_USER_ID = "user-0001"
+SEED_EMAIL = "bench@example.com"
+SEED_PASSWORD = "Bench-Passw0rd!"
+
+BASE_ENV = {
+    "AWS_DEFAULT_REGION": "eu-central-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_SESSION_TOKEN": "testing",
+    "POWERTOOLS_METRICS_NAMESPACE": "MyApp",
+    "POWERTOOLS_SERVICE_NAME": "benchmark",
+    "POWERTOOLS_LOGGER_LOG_EVENT": "true",
+    "LOG_LEVEL": "WARNING",
+    "ORDERS_TABLE_NAME": ORDERS_TABLE,
+    "TABLE_NAME": FEEDBACK_TABLE,
+    "INDEX_NAME": "UserOrdersIndex",
+    "CUSTOMERS_TABLE_NAME": CUSTOMERS_TABLE,
+    "STATS_TABLE_NAME": STATS_TABLE,
+    "USER_TABLE_NAME": USER_TABLE,
+    "FEEDBACK_RATINGS_TABLE_NAME": RATINGS_TABLE,
+}
+
+
+def _api_event(body=None, path=None, query=None):
+    return {
+        "body": json.dumps(body) if body is not None else None,
+        "pathParameters": path,
+        "queryStringParameters": query,
+        "requestContext": {"requestId": str(uuid.uuid4())},
+    }
+
+
+def _stream_event():
+    return {"Records": [{
+        "eventName": "INSERT",
+        "dynamodb": {
+            "Keys": {"orderId": {"S": "order-stream"}},
+            "NewImage": {"orderId": {"S": "order-stream"}, "orderTotal": {"N": "10"}, "status": {"S": "PENDING"}},
+        },
+    }]}
+
+
+def _feedback_queue_event():
+    feedback = {"feedbackId": str(uuid.uuid4()), "userId": SEED_USER_ID, "rating": 4, "comment": "queued",
+                "createdAt": int(time.time()), "orderId": SEED_ORDER_ID}
+    return {"Records": [{"messageId": str(uuid.uuid4()), "body": json.dumps(feedback), "eventSource": "aws:sqs"}]}
+
+
+# handler module -> event factory (called after the mocked resources exist)
+HANDLERS = {
+    "register_user": lambda: _api_event({"email": f"{uuid.uuid4().hex[:8]}@example.com", "password": SEED_PASSWORD,
+                                         "firstName": "Bench", "lastName": "User"}),
+    "login_user": lambda: _api_event({"email": SEED_EMAIL, "password": SEED_PASSWORD}),
+    "create_order": lambda: _api_event({"userId": SEED_USER_ID, "shippingAddress": "Main St 1",
+                                        "items": [{"productId": "p1", "price": 10.5, "quantity": 2}]}),
+    "get_orders": lambda: _api_event(query={"userId": SEED_USER_ID}),
+    "get_order_details": lambda: _api_event(path={"orderId": SEED_ORDER_ID}),
+    "get_dashboard": lambda: _api_event(path={"userId": SEED_USER_ID}),
+    "submit_feedback": lambda: _api_event({"userId": SEED_USER_ID, "rating": 5, "comment": "fast"}),
+    "feedback_writer": _feedback_queue_event,
+    "get_analytics": lambda: _api_event(),
+    "analytics_aggregator": _stream_event,
+    # A state machine step; unlike a direct invocation it can run twice on the same order
+    "payment_step": lambda: {"step": "ValidatePayment", "input": {"orderId": SEED_ORDER_ID}},
+}
+
+
+class _Context:
+    function_name = "benchmark"
+    function_version = "$LATEST"
+    memory_limit_in_mb = 512
+    invoked_function_arn = "arn:aws:lambda:eu-central-1:123456789012:function:benchmark"
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 15000
+
+
+def _ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def _setup_mocked_resources():
+    """Create the tables, user pool and seed data the handlers expect (inside mock_aws)."""
+    import boto3
+
+    dynamodb = boto3.client("dynamodb")
+
+    def create(name, key, extra=None):
+        dynamodb.create_table(TableName=name, BillingMode="PAY_PER_REQUEST",
+                              KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+                              AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}] + (extra or {}).get("attrs", []),
+                              **(extra or {}).get("kwargs", {}))
+
+    create(CUSTOMERS_TABLE, "userId")
+    create(STATS_TABLE, "statId")
+    create(FEEDBACK_TABLE, "feedbackId")
+    create(RATINGS_TABLE, "ratingKey")
+    create(ORDERS_TABLE, "orderId", {
+        "attrs": [{"AttributeName": "userId", "AttributeType": "S"}],
+        "kwargs": {"GlobalSecondaryIndexes": [{
+            "IndexName": "UserOrdersIndex",
+            "KeySchema": [{"AttributeName": "userId", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }]},
+    })
+    dynamodb.create_table(TableName=USER_TABLE, BillingMode="PAY_PER_REQUEST",
+                          KeySchema=[{"AttributeName": "PK", "KeyType": "HASH"},
+                                     {"AttributeName": "SK", "KeyType": "RANGE"}],
+                          AttributeDefinitions=[{"AttributeName": "PK", "AttributeType": "S"},
+                                                {"AttributeName": "SK", "AttributeType": "S"}])
+    order = {"orderId": SEED_ORDER_ID, "userId": SEED_USER_ID, "status": "PENDING",
+             "orderTotal": Decimal("21.00"), "items": [], "createdAt": Decimal(0)}
+    boto3.resource("dynamodb").Table(ORDERS_TABLE).put_item(Item=order)
+    boto3.resource("dynamodb").Table(USER_TABLE).put_item(Item={
+        **order, "PK": f"USER#{SEED_USER_ID}", "SK": f"ORDER#{0:010d}#{SEED_ORDER_ID}", "itemType": "ORDER"})
+
+    cognito = boto3.client("cognito-idp")
+    pool_id = cognito.create_user_pool(PoolName="bench")["UserPool"]["Id"]
+    client_id = cognito.create_user_pool_client(
+        UserPoolId=pool_id, ClientName="bench",
+        ExplicitAuthFlows=["ALLOW_ADMIN_USER_PASSWORD_AUTH", "ALLOW_REFRESH_TOKEN_AUTH"])["UserPoolClient"]["ClientId"]
+    cognito.admin_create_user(UserPoolId=pool_id, Username=SEED_EMAIL, MessageAction="SUPPRESS")
+    cognito.admin_set_user_password(UserPoolId=pool_id, Username=SEED_EMAIL, Password=SEED_PASSWORD, Permanent=True)
+    os.environ["COGNITO_USER_POOL_ID"] = pool_id
+    os.environ["COGNITO_CLIENT_ID"] = client_id
+
+
+def _child(mode, name):
+    """Runs in the measured process; prints one result line for the parent."""
+    sys.path[:0] = [str(ROOT / "src"), str(ROOT / "layer")]
+    module_name = f"handlers.{name}"
+    result = {"handler": name, "mode": mode}
+
+    if mode == "import":
+        start = time.perf_counter()
+        importlib.import_module(module_name)
+        result["import_ms"] = _ms(start)
+    else:
+        from moto import mock_aws
+
+        with mock_aws():
+            _setup_mocked_resources()
+            module = importlib.import_module(module_name)
+            timings = []
+            for _ in range(2):
+                event = HANDLERS[name]()
+                start = time.perf_counter()
+                response = module.lambda_handler(event, _Context())
+                timings.append(_ms(start))
+            result.update(first_ms=timings[0], warm_ms=timings[1], status=response.get("statusCode"))
+
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+def _run_child(mode, name, env):
+    completed = subprocess.run([sys.executable, __file__, "--child", mode, name],
+                               env=env, capture_output=True, text=True, check=False)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"{name} ({mode}) produced no result:\n{completed.stderr[-2000:]}")
+
+
+def run(handlers, runs, trace):
+    env = dict(os.environ, **BASE_ENV)
+    env["POWERTOOLS_TRACE_DISABLED"] = "0" if trace else "1"
+    summary = {}
+    for name in handlers:
+        samples = {"import_ms": [], "first_ms": [], "warm_ms": []}
+        status = None
+        for _ in range(runs):
+            samples["import_ms"].append(_run_child("import", name, env)["import_ms"])
+            invoked = _run_child("invoke", name, env)
+            samples["first_ms"].append(invoked["first_ms"])
+            samples["warm_ms"].append(invoked["warm_ms"])
+            status = invoked["status"]
+        summary[name] = {key: round(statistics.median(values), 1) for key, values in samples.items()}
+        summary[name]["status"] = status
+        print(f"{name:<22} import {summary[name]['import_ms']:>8.1f} ms   first {summary[name]['first_ms']:>8.1f} ms"
+              f"   warm {summary[name]['warm_ms']:>7.1f} ms   status {status}", flush=True)
+    return summary
+
+
+def compare(summary, baseline, max_regression):
+    regressions = []
+    for name, current in summary.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for key in ("import_ms", "first_ms"):
+            limit = previous[key] * (1 + max_regression)
+            if current[key] > limit and current[key] - previous[key] > NOISE_FLOOR_MS:
+                regressions.append(f"{name}.{key}: {previous[key]:.1f} -> {current[key]:.1f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per handler (median is reported)")
+    parser.add_argument("--handlers", default=",".join(HANDLERS), help="comma separated handler modules")
+    parser.add_argument("--trace", action="store_true", help="keep the X-Ray Tracer enabled (as deployed)")
+    parser.add_argument("--save", help="write the medians to this JSON file")
+    parser.add_argument("--baseline", help="JSON file written by --save to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "HANDLER"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(*args.child)
+        return 0
+
+    handlers = [name.strip() for name in args.handlers.split(",") if name.strip()]
+    unknown = set(handlers) - set(HANDLERS)
+    if unknown:
+        parser.error(f"unknown handlers: {', '.join(sorted(unknown))}")
+
+    summary = run(handlers, args.runs, args.trace)
+    if args.save:
+        Path(args.save).write_text(json.dumps(summary, indent=2) + "\n")
+    if args.baseline:
+        regressions = compare(summary, json.loads(Path(args.baseline).read_text()), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Shared code for the enterprise Lambdas, deployed as the SharedCodeLayer
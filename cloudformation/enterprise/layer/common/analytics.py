@@ -0,0 +1,150 @@
+"""
+Running analytics aggregates kept in a single stats item.
+
+The DynamoDB Streams consumer turns order/customer changes into deltas and
+applies a whole batch with one atomic ADD, so GetAnalytics can serve the
+report with a single get_item. recompute() rebuilds the item from parallel
+segmented scans for reconciliation.
+"""
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+
+STATS_TABLE_NAME = os.environ.get("STATS_TABLE_NAME")
+STATS_ID = "GLOBAL"
+STATUS_PREFIX = "status_"
+RECOMPUTE_SEGMENTS = int(os.environ.get("RECOMPUTE_SEGMENTS", 8))
+
+_deserializer = TypeDeserializer()
+
+
+def _image(record, name):
+    image = record["dynamodb"].get(name)
+    if not image:
+        return None
+    return {k: _deserializer.deserialize(v) for k, v in image.items()}
+
+
+def _order_delta(old, new, delta):
+    if old is None and new is None:
+        return
+    if old is None:
+        delta["totalOrders"] += 1
+    elif new is None:
+        delta["totalOrders"] -= 1
+
+    old_total = Decimal(old.get("orderTotal", 0)) if old else Decimal(0)
+    new_total = Decimal(new.get("orderTotal", 0)) if new else Decimal(0)
+    delta["totalRevenue"] += new_total - old_total
+
+    # Status transitions (e.g. PENDING -> PAID from PaymentStep) move one count between buckets
+    old_status = old.get("status", "UNKNOWN") if old else None
+    new_status = new.get("status", "UNKNOWN") if new else None
+    if old_status != new_status:
+        if old_status:
+            delta[STATUS_PREFIX + old_status] -= 1
+        if new_status:
+            delta[STATUS_PREFIX + new_status] += 1
+
+
+def deltas_from_records(records):
+    """Fold a batch of stream records from the Orders and Customers tables into one delta."""
+    delta = Counter()
+    for record in records:
+        keys = record["dynamodb"].get("Keys", {})
+        event_name = record["eventName"]
+        if "orderId" in keys:
+            _order_delta(_image(record, "OldImage"), _image(record, "NewImage"), delta)
+        elif "userId" in keys:
+            if event_name == "INSERT":
+                delta["totalCustomers"] += 1
+            elif event_name == "REMOVE":
+                delta["totalCustomers"] -= 1
+    return {name: value for name, value in delta.items() if value}
+
+
+def apply_deltas(table, delta):
+    """Apply all deltas with a single atomic ADD on the stats item."""
+    if not delta:
+        return
+    names, values, clauses = {}, {}, []
+    for i, (name, value) in enumerate(sorted(delta.items())):
+        names[f"#a{i}"] = name
+        values[f":v{i}"] = Decimal(value)
+        clauses.append(f"#a{i} :v{i}")
+    table.update_item(
+        Key={"statId": STATS_ID},
+        UpdateExpression="ADD " + ", ".join(clauses),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+    )
+
+
+def read_stats(table):
+    """Shape the stats item as the analytics report (one get_item)."""
+    item = table.get_item(Key={"statId": STATS_ID}).get("Item", {})
+    distribution = {
+        name[len(STATUS_PREFIX):]: int(count)
+        for name, count in item.items()
+        if name.startswith(STATUS_PREFIX) and count
+    }
+    return {
+        "totalCustomers": int(item.get("totalCustomers", 0)),
+        "totalOrders": int(item.get("totalOrders", 0)),
+        "totalRevenue": item.get("totalRevenue", Decimal(0)),
+        "orderStatusDistribution": distribution,
+        "recomputedAt": item.get("recomputedAt"),
+    }
+
+
+def _scan_segment(client, table_name, segment, total_segments, **kwargs):
+    paginator = client.get_paginator("scan")
+    for page in paginator.paginate(TableName=table_name, Segment=segment,
+                                   TotalSegments=total_segments, **kwargs):
+        yield page
+
+
+def _count_customers(client, table_name, segment, total_segments):
+    return sum(page["Count"] for page in _scan_segment(client, table_name, segment, total_segments,
+                                                         Select="COUNT"))
+
+
+def _aggregate_orders(client, table_name, segment, total_segments):
+    delta = Counter()
+    pages = _scan_segment(client, table_name, segment, total_segments,
+                          ProjectionExpression="orderTotal, #s",
+                          ExpressionAttributeNames={"#s": "status"})
+    for page in pages:
+        for raw in page["Items"]:
+            _order_delta(None, {k: _deserializer.deserialize(v) for k, v in raw.items()}, delta)
+    return delta
+
+
+def recompute(stats_table, orders_table_name, customers_table_name,
+              segments=RECOMPUTE_SEGMENTS, client=None, now=None):
+    """
+    Rebuild the stats item from scratch with parallel segmented scans of both
+    tables and overwrite it. Changes streamed while the scan runs may be lost,
+    so run it off-peak (the template schedules it nightly).
+    """
+    client = client or boto3.client("dynamodb")
+    with ThreadPoolExecutor(max_workers=segments * 2) as executor:
+        order_parts = [executor.submit(_aggregate_orders, client, orders_table_name, s, segments)
+                       for s in range(segments)]
+        customer_parts = [executor.submit(_count_customers, client, customers_table_name, s, segments)
+                          for s in range(segments)]
+        totals = Counter()
+        for part in order_parts:
+            totals.update(part.result())
+        totals["totalCustomers"] = sum(part.result() for part in customer_parts)
+
+    item = {"statId": STATS_ID, "totalOrders": 0, "totalRevenue": Decimal(0)}
+    item.update({name: Decimal(value) for name, value in totals.items() if value})
+    if now is not None:
+        item["recomputedAt"] = now
+    stats_table.put_item(Item=item)
+    return item
@@ -0,0 +1,148 @@
+"""
+Read-through Redis cache for the order Lambdas.
+
+The connection pool lives at module level so warm invocations reuse open
+sockets. Redis is strictly an optimisation: every cache error is logged,
+counted and then ignored so the caller falls back to DynamoDB.
+"""
+import json
+import logging
+import os
+from decimal import Decimal
+
+from common import serialization
+
+logger = logging.getLogger(__name__)
+
+REDIS_ENDPOINT = os.environ.get("REDIS_ENDPOINT")
+REDIS_PORT = int(os.environ.get("REDIS_PORT") or 6379)
+ORDER_TTL_SECONDS = int(os.environ.get("CACHE_ORDER_TTL_SECONDS", 300))
+ORDER_LIST_TTL_SECONDS = int(os.environ.get("CACHE_ORDER_LIST_TTL_SECONDS", 60))
+NEGATIVE_TTL_SECONDS = int(os.environ.get("CACHE_NEGATIVE_TTL_SECONDS", 30))
+# Keep Redis from ever becoming the slow path of a request
+SOCKET_TIMEOUT_SECONDS = float(os.environ.get("CACHE_SOCKET_TIMEOUT_SECONDS", 0.25))
+
+# Stored in place of a value to remember that DynamoDB had no such item
+_NOT_FOUND = b"\x00404"
+
+_client = None
+
+
+def get_client():
+    """Return the shared Redis client, or None when no cache is configured."""
+    global _client
+    if _client is None and REDIS_ENDPOINT:
+        import redis  # shipped in the layer; only needed when a cache is configured
+
+        pool = redis.ConnectionPool(
+            host=REDIS_ENDPOINT,
+            port=REDIS_PORT,
+            socket_timeout=SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=SOCKET_TIMEOUT_SECONDS,
+            health_check_interval=30,
+        )
+        _client = redis.Redis(connection_pool=pool)
+    return _client
+
+
+def set_client(client):
+    """Swap the Redis client, e.g. for an in-process fakeredis.FakeRedis() in tests."""
+    global _client
+    _client = client
+
+
+def order_key(order_id):
+    return f"order:{order_id}"
+
+
+def user_orders_key(user_id):
+    # A hash holding every cached page of the user's order list, one field per page
+    return f"orders:user:{user_id}"
+
+
+def _decode(raw):
+    # Numbers come back as Decimal, exactly as boto3 returns them from DynamoDB
+    return json.loads(raw, parse_float=Decimal)
+
+
+def _count(metrics, name):
+    if metrics is not None:
+        metrics.add_metric(name=name, unit="Count", value=1)
+
+
+def get_or_load(key, loader, ttl=ORDER_TTL_SECONDS, field=None, metrics=None,
+                negative_ttl=NEGATIVE_TTL_SECONDS):
+    """
+    Return the cached value for `key` (or hash `field` of `key`), calling
+    `loader()` on a miss and caching its result for `ttl` seconds. A loader
+    result of None is cached for `negative_ttl` seconds so repeated lookups of
+    missing items stay off DynamoDB too.
+    """
+    client = get_client()
+    if client is None:
+        return loader()
+
+    try:
+        raw = client.hget(key, field) if field is not None else client.get(key)
+    except Exception:
+        logger.warning("Cache read failed for %s", key, exc_info=True)
+        _count(metrics, "CacheError")
+        return loader()
+
+    if raw is not None:
+        _count(metrics, "CacheHit")
+        return None if raw == _NOT_FOUND else _decode(raw)
+
+    _count(metrics, "CacheMiss")
+    value = loader()
+    if value is None and not negative_ttl:
+        return None
+
+    payload = _NOT_FOUND if value is None else serialization.dumps(value)
+    expiry = negative_ttl if value is None else ttl
+    try:
+        if field is not None:
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(key, field, payload)
+            pipe.expire(key, expiry)
+            pipe.execute()
+        else:
+            client.set(key, payload, ex=expiry)
+    except Exception:
+        logger.warning("Cache write failed for %s", key, exc_info=True)
+        _count(metrics, "CacheError")
+    return value
+
+
+def put_order(order, ttl=ORDER_TTL_SECONDS, metrics=None):
+    """
+    Write-through for a changed order: refresh its detail entry and drop the
+    owner's cached list pages, which may now show a stale status.
+    """
+    client = get_client()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.set(order_key(order["orderId"]), serialization.dumps(order), ex=ttl)
+        if order.get("userId"):
+            pipe.delete(user_orders_key(order["userId"]))
+        pipe.execute()
+    except Exception:
+        logger.warning("Cache write-through failed for order %s", order.get("orderId"), exc_info=True)
+        _count(metrics, "CacheError")
+
+
+def invalidate_order(order_id, user_id=None, metrics=None):
+    """Drop an order's detail entry (and the owner's list pages when known)."""
+    client = get_client()
+    if client is None:
+        return
+    keys = [order_key(order_id)]
+    if user_id:
+        keys.append(user_orders_key(user_id))
+    try:
+        client.delete(*keys)
+    except Exception:
+        logger.warning("Cache invalidation failed for order %s", order_id, exc_info=True)
+        _count(metrics, "CacheError")
@@ -0,0 +1,172 @@
+"""
+Server-side product prices for CreateOrder, from the output of the product
+ETL job (snippets/etl/glue_etl_script.py): Parquet files under its
+TARGET_S3_PATH, partitioned by category and ingest_date, listing each
+product's stock and discounted_price (stock <= 0 included, as sold out).
+
+With PRODUCT_CATALOG_S3_PATH set (s3://bucket/prefix/), the catalog is loaded
+once per execution environment into one dict, {product id: (last_updated,
+price in cents)}, and shared by every warm invocation. At most every
+PRODUCT_CATALOG_REFRESH_SECONDS (default 60) one ListObjectsV2 compares the
+objects' ETag and LastModified with the ones loaded:
+
+* nothing changed - nothing is read
+* files were added (a job run appends) - only those are read, on top of the index
+* a file changed or went away - the index is rebuilt from all files
+
+Each run appends only the products that changed, so the index keeps the
+latest row of each product: the highest last_updated, and of equal ones the
+row of the file written last. A product whose latest row has stock <= 0 is
+sold out, and one the catalog does not list is unknown; neither is sold.
+
+Reading Parquet needs pyarrow (e.g. the AWS SDK for pandas layer), imported
+on the first load. When a refresh fails the loaded index is kept; when there
+is none yet, CatalogUnavailable is raised.
+"""
+import io
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from common import runtime
+
+logger = logging.getLogger(__name__)
+
+# Empty leaves item prices as the client sent them
+S3_PATH = os.environ.get("PRODUCT_CATALOG_S3_PATH") or None
+REFRESH_SECONDS = float(os.environ.get("PRODUCT_CATALOG_REFRESH_SECONDS", 60))
+# Files downloaded at once on a (re)load
+LOAD_CONCURRENCY = int(os.environ.get("PRODUCT_CATALOG_LOAD_CONCURRENCY", 4))
+COLUMNS = ["id", "discounted_price", "stock", "last_updated"]
+
+
+class CatalogUnavailable(Exception):
+    """No catalog could be loaded."""
+
+
+class ProductsUnavailable(ValueError):
+    """Order lines whose product is not in the catalog (out of stock or unknown)."""
+
+    def __init__(self, product_ids):
+        super().__init__(f"Products not available: {', '.join(product_ids)}")
+        self.product_ids = product_ids
+
+
+def split_s3_path(path):
+    """'s3://bucket/prefix/' -> ('bucket', 'prefix/')."""
+    bucket, _, prefix = path.removeprefix("s3://").partition("/")
+    return bucket, prefix
+
+
+def read_prices(data):
+    """
+    [(product id, last_updated in microseconds, cents or None when sold out)]
+    of one Parquet file, reading only the columns needed.
+    """
+    import pyarrow as pa  # from a layer; only needed when a catalog is configured
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(io.BytesIO(data), columns=COLUMNS).drop_null()
+    # In Arrow rather than per row: decimal(10,2) (or a float price) to whole cents, null when sold out
+    cents = pc.round(pc.multiply(pc.cast(table.column("discounted_price"), pa.float64()), 100)).cast(pa.int64())
+    cents = pc.if_else(pc.greater(table.column("stock"), 0), cents, pa.scalar(None, pa.int64()))
+    updated = pc.cast(pc.cast(table.column("last_updated"), pa.timestamp("us")), pa.int64())
+    return list(zip(table.column("id").to_pylist(), updated.to_pylist(), cents.to_pylist()))
+
+
+class Catalog:
+    def __init__(self, s3_path):
+        self.bucket, self.prefix = split_s3_path(s3_path)
+        # {product id: (last_updated, cents or None when sold out)}
+        self.prices = {}
+        # {key: (ETag, LastModified)} of the files the index was built from
+        self.objects = {}
+        self.checked_at = None
+
+    def price(self, product_id):
+        """The product's price as a Decimal, or None when it is sold out or unknown."""
+        row = self.prices.get(product_id)
+        return None if row is None or row[1] is None else Decimal(row[1]).scaleb(-2)
+
+    def _list(self):
+        objects = {}
+        for page in runtime.client("s3").get_paginator("list_objects_v2").paginate(
+                Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", ()):
+                # Spark writes part-*.snappy.parquet next to markers such as _SUCCESS
+                if obj["Key"].endswith(".parquet"):
+                    objects[obj["Key"]] = (obj["ETag"], obj["LastModified"])
+        return objects
+
+    def _read(self, key):
+        return read_prices(runtime.client("s3").get_object(Bucket=self.bucket, Key=key)["Body"].read())
+
+    def refresh(self):
+        """Bring the index up to date with the files under the prefix. Returns the number of files read."""
+        listed = self._list()
+        if not listed:
+            raise CatalogUnavailable(f"No Parquet files under s3://{self.bucket}/{self.prefix}")
+        if listed == self.objects:
+            return 0
+        appended = all(listed.get(key) == version for key, version in self.objects.items())
+        keys = sorted((key for key in listed if not appended or key not in self.objects),
+                      key=lambda key: (listed[key][1], key))
+        with ThreadPoolExecutor(max_workers=max(1, min(LOAD_CONCURRENCY, len(keys)))) as executor:
+            files = list(executor.map(self._read, keys))
+
+        # Built aside and swapped in, so a failed read leaves the old index whole
+        prices = dict(self.prices) if appended else {}
+        for rows in files:
+            for product_id, updated, cents in rows:
+                latest = prices.get(product_id)
+                if latest is None or updated >= latest[0]:
+                    prices[product_id] = (updated, cents)
+        self.prices, self.objects = prices, listed
+        logger.info("Product catalog %s: %d files read, %d products",
+                    "extended" if appended else "loaded", len(keys), len(prices))
+        return len(keys)
+
+    def refresh_if_due(self, metrics=None):
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < REFRESH_SECONDS:
+            return
+        try:
+            if self.refresh() and metrics is not None:
+                metrics.add_metric(name="CatalogRefresh", unit="Count", value=1)
+        except (CatalogUnavailable, ClientError, BotoCoreError, OSError, ValueError, ImportError) as e:
+            # pyarrow raises ArrowInvalid (a ValueError) for a corrupt file; ImportError: no pyarrow layer
+            if self.checked_at is None:
+                raise CatalogUnavailable(str(e)) from e
+            logger.warning("Product catalog not refreshed, keeping the loaded one: %s", e)
+            if metrics is not None:
+                metrics.add_metric(name="CatalogRefreshError", unit="Count", value=1)
+        self.checked_at = now
+
+
+_catalog = None
+
+
+def get_catalog(metrics=None):
+    """
+    The shared catalog, refreshed when PRODUCT_CATALOG_REFRESH_SECONDS have
+    passed, or None when no catalog is configured. Raises CatalogUnavailable
+    when none could be loaded yet.
+    """
+    global _catalog
+    if _catalog is None:
+        if not S3_PATH:
+            return None
+        _catalog = Catalog(S3_PATH)
+    _catalog.refresh_if_due(metrics)
+    return _catalog
+
+
+def set_catalog(catalog):
+    """Swap the catalog, e.g. for one on another path in tests."""
+    global _catalog
+    _catalog = catalog
@@ -0,0 +1,230 @@
+"""
+Asynchronous, batched feedback ingestion and per-order/per-user rating aggregates.
+
+With FEEDBACK_ASYNC=true SubmitFeedback validates the request, enqueues the
+item it would have written (feedbackId and createdAt already assigned, so a
+redelivered message writes the same item) and answers 202. FeedbackWriter
+drains the queue: write_records() puts the items with BatchWriteItem, 25
+requests at a time (an item and its user table copy travel together), retries
+what DynamoDB leaves unprocessed and returns the messages whose item could not
+be written, for a partial batch response. In the same pass the written items
+are folded into one rating delta per order and per user (FEEDBACK_RATINGS_TABLE_NAME:
+ratingKey ORDER#<orderId> | USER#<userId>, ratingCount, ratingSum), applied
+with one ADD each.
+
+The aggregates are derived data: a failed ADD is logged and counted, not
+retried through the queue, because redelivering the message would count the
+aggregates that did succeed twice. Only a message delivered again after its
+aggregates were applied (SQS delivers at least once) is counted twice.
+
+The queue is swappable: set_queue(LocalQueue()) keeps messages in memory, and
+LocalQueue.records() hands them to the consumer as an SQS event would.
+"""
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+from common import runtime, single_table
+from common.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+ASYNC = os.environ.get("FEEDBACK_ASYNC", "false").lower() == "true"
+QUEUE_URL = os.environ.get("FEEDBACK_QUEUE_URL")
+RATINGS_TABLE_NAME = os.environ.get("FEEDBACK_RATINGS_TABLE_NAME") or None
+# Batches (and aggregate updates) in flight at once; the low-level client is thread safe
+WRITE_CONCURRENCY = int(os.environ.get("FEEDBACK_WRITE_CONCURRENCY", 4))
+BATCH_WRITE_LIMIT = 25
+UNPROCESSED_RETRIES = 5
+UNPROCESSED_BASE_DELAY = 0.05
+
+
+class SqsQueue:
+    def __init__(self, url):
+        self.url = url
+
+    def send(self, body):
+        runtime.client("sqs").send_message(QueueUrl=self.url, MessageBody=body)
+
+
+class LocalQueue:
+    """In-process stand-in for tests and benchmarks."""
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, body):
+        self.messages.append(body)
+
+    def records(self):
+        """Take the queued messages as the Records of an SQS event."""
+        messages, self.messages = self.messages, []
+        return [{"messageId": str(uuid.uuid4()), "body": body, "eventSource": "aws:sqs"} for body in messages]
+
+
+_queue = None
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        if not QUEUE_URL:
+            raise RuntimeError("FEEDBACK_QUEUE_URL is not set")
+        _queue = SqsQueue(QUEUE_URL)
+    return _queue
+
+
+def set_queue(queue):
+    """Swap the queue, e.g. for LocalQueue() in tests."""
+    global _queue
+    _queue = queue
+
+
+def enqueue(item):
+    get_queue().send(dumps(item))
+
+
+def _rating_keys(item):
+    keys = [f"USER#{item['userId']}"]
+    if item.get("orderId"):
+        keys.append(f"ORDER#{item['orderId']}")
+    return keys
+
+
+def rating_deltas(items):
+    """{ratingKey: (count, sum)} for `items`."""
+    deltas = defaultdict(lambda: [0, 0])
+    for item in items:
+        for key in _rating_keys(item):
+            deltas[key][0] += 1
+            deltas[key][1] += int(item["rating"])
+    return {key: tuple(delta) for key, delta in deltas.items()}
+
+
+def _add_rating(key, count, total, now):
+    runtime.client("dynamodb").update_item(
+        TableName=RATINGS_TABLE_NAME, Key={"ratingKey": {"S": key}},
+        UpdateExpression="ADD ratingCount :count, ratingSum :sum SET updatedAt = :now",
+        ExpressionAttributeValues={":count": {"N": str(count)}, ":sum": {"N": str(total)},
+                                   ":now": {"N": str(now)}})
+
+
+def apply_ratings(items):
+    """Add `items` to the rating aggregates. Returns the number of aggregates not updated."""
+    if not RATINGS_TABLE_NAME or not items:
+        return 0
+    deltas = rating_deltas(items)
+    now = int(time.time())
+
+    def add(entry):
+        key, (count, total) = entry
+        try:
+            _add_rating(key, count, total, now)
+            return True
+        except ClientError as e:
+            logger.warning("Rating aggregate not updated: %s (%s)", e.response["Error"]["Code"], key)
+            return False
+
+    if len(deltas) == 1:
+        return 0 if add(next(iter(deltas.items()))) else 1
+    with ThreadPoolExecutor(max_workers=min(WRITE_CONCURRENCY, len(deltas))) as executor:
+        return sum(1 for ok in executor.map(add, deltas.items()) if not ok)
+
+
+def _requests(item):
+    """(table, PutRequest) pairs that store `item`: the Feedback item and its user table copy."""
+    requests = [(None, single_table.serialize(item))]
+    if single_table.TABLE_NAME:
+        requests.append((single_table.TABLE_NAME, single_table.serialize(single_table.feedback_item(item))))
+    return requests
+
+
+def _key(table_name, raw_item):
+    # Identifies a request among the UnprocessedItems DynamoDB hands back
+    if table_name == single_table.TABLE_NAME and "PK" in raw_item:
+        return table_name, raw_item["PK"]["S"], raw_item["SK"]["S"]
+    return table_name, raw_item["feedbackId"]["S"]
+
+
+def _write_batch(table_name, batch):
+    """
+    One BatchWriteItem of up to 25 (feedbackId, table, item) requests, retrying
+    unprocessed requests with jittered backoff. Returns the feedbackIds not written.
+    """
+    owners, request_items = {}, {}
+    for feedback_id, target, raw_item in batch:
+        target = target or table_name
+        owners[_key(target, raw_item)] = feedback_id
+        request_items.setdefault(target, []).append({"PutRequest": {"Item": raw_item}})
+
+    client = runtime.client("dynamodb")
+    for attempt in range(UNPROCESSED_RETRIES + 1):
+        try:
+            request_items = client.batch_write_item(RequestItems=request_items).get("UnprocessedItems") or {}
+        except ClientError as e:
+            logger.error("BatchWriteItem failed: %s", e.response["Error"]["Code"])
+            break
+        if not request_items or attempt == UNPROCESSED_RETRIES:
+            break
+        time.sleep(random.uniform(0, UNPROCESSED_BASE_DELAY * 2 ** attempt))
+    return {owners[_key(target, request["PutRequest"]["Item"])]
+            for target, requests in request_items.items() for request in requests}
+
+
+def parse_record(record):
+    """The feedback item in an SQS record; raises ValueError for a malformed message."""
+    try:
+        item = json.loads(record["body"], parse_float=Decimal)
+        if not (item["feedbackId"] and item["userId"]):
+            raise ValueError("missing key")
+        item["rating"] = int(item["rating"])
+        return item
+    except (KeyError, TypeError) as e:
+        raise ValueError(str(e)) from e
+
+
+def write_records(table_name, records):
+    """
+    Write the feedback of an SQS batch. Returns (failed messageIds, items
+    written, aggregates not updated).
+    """
+    items, owners, failed = {}, defaultdict(list), []
+    for record in records:
+        try:
+            item = parse_record(record)
+        except ValueError:
+            logger.error("Malformed feedback message (messageId %s)", record.get("messageId"))
+            failed.append(record.get("messageId"))
+            continue
+        # A message delivered twice in one batch: BatchWriteItem rejects duplicate keys
+        items[item["feedbackId"]] = item
+        owners[item["feedbackId"]].append(record["messageId"])
+
+    # An item and its copy stay in the same request: it is one unit of success or failure
+    batches, batch = [], []
+    for feedback_id, item in items.items():
+        requests = [(feedback_id, target, raw) for target, raw in _requests(item)]
+        if len(batch) + len(requests) > BATCH_WRITE_LIMIT:
+            batches.append(batch)
+            batch = []
+        batch.extend(requests)
+    if batch:
+        batches.append(batch)
+
+    unwritten = set()
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(WRITE_CONCURRENCY, len(batches))) as executor:
+            for ids in executor.map(lambda batch: _write_batch(table_name, batch), batches):
+                unwritten |= ids
+
+    written = [item for feedback_id, item in items.items() if feedback_id not in unwritten]
+    failed += [message_id for feedback_id in unwritten for message_id in owners[feedback_id]]
+    return failed, len(written), apply_ratings(written)
@@ -0,0 +1,154 @@
+"""
+Idempotency-Key support for requests that create something (CreateOrder).
+
+A client that retries a request it never got an answer to (a gateway timeout)
+sends it again with the same Idempotency-Key header. The first request writes
+an idempotency record (IDEMPOTENCY_TABLE_NAME, key idempotencyKey) in the same
+TransactWriteItems as the items it creates, on condition that no live record
+exists. The record and the items are written together or not at all, so there
+is no in-progress state to lock, time out or clean up.
+
+A replay fails that condition and DynamoDB hands the stored record back with
+the cancellation (ReturnValuesOnConditionCheckFailure), so the stored response
+is returned without writing anything. Duplicates sent at the same time race
+on the condition: one transaction wins, the others see its record, or a
+TransactionConflict while it commits, after which they retry and see the
+record. A handler whose validation depends on state that changes (CreateOrder's
+catalog prices and stock) looks the record up first (stored_response), so a
+replay gets the stored response even when the request would now be rejected.
+
+The record keeps a SHA-256 of the request body: the same key with a different
+body is rejected (IdempotencyKeyMismatch) instead of being answered with the
+other request's response. Records expire after IDEMPOTENCY_TTL_SECONDS through
+the table's TTL on expiresAt; TTL deletes lazily, so an expired record that is
+still there counts as absent.
+"""
+import hashlib
+import logging
+import os
+import random
+import time
+
+from botocore.exceptions import ClientError
+
+from common import runtime
+from common.serialization import request_header
+
+logger = logging.getLogger(__name__)
+
+# Empty leaves the Idempotency-Key header ignored
+TABLE_NAME = os.environ.get("IDEMPOTENCY_TABLE_NAME") or None
+TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 24 * 3600))
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+CONFLICT_RETRIES = 5
+CONFLICT_BASE_DELAY = 0.02
+
+
+class InvalidIdempotencyKey(ValueError):
+    pass
+
+
+class IdempotencyKeyMismatch(Exception):
+    """The key was already used with a different request body."""
+
+
+def request_key(event):
+    """
+    The request's Idempotency-Key, or None when it has none or no table is
+    configured. Raises InvalidIdempotencyKey for an empty, overlong or
+    non-printable key.
+    """
+    if not TABLE_NAME:
+        return None
+    key = request_header(event, HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+        raise InvalidIdempotencyKey(f"{HEADER} must be 1-{MAX_KEY_LENGTH} printable characters")
+    return key
+
+
+def record_key(operation, owner, key):
+    # Scoped, so two users (or two operations) can't collide on the same client-chosen key
+    return f"{operation}#{owner}#{key}"
+
+
+def body_hash(body):
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _record_put(record_key, request_hash, status_code, response_text, now):
+    return {"Put": {
+        "TableName": TABLE_NAME,
+        "Item": {
+            "idempotencyKey": {"S": record_key},
+            "requestHash": {"S": request_hash},
+            "statusCode": {"N": str(status_code)},
+            "response": {"S": response_text},
+            "createdAt": {"N": str(now)},
+            "expiresAt": {"N": str(now + TTL_SECONDS)},
+        },
+        "ConditionExpression": "attribute_not_exists(idempotencyKey) OR expiresAt < :now",
+        "ExpressionAttributeValues": {":now": {"N": str(now)}},
+        "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+    }}
+
+
+def _stored(raw_item, request_hash):
+    if raw_item["requestHash"]["S"] != request_hash:
+        raise IdempotencyKeyMismatch(f"{HEADER} was already used with a different request")
+    return int(raw_item["statusCode"]["N"]), raw_item["response"]["S"]
+
+
+def _get_record(client, record_key):
+    return client.get_item(TableName=TABLE_NAME, Key={"idempotencyKey": {"S": record_key}},
+                           ConsistentRead=True).get("Item")
+
+
+def stored_response(record_key, body):
+    """
+    The stored (status code, response text) when the key was already used with
+    the same body and its record is live, else None. Lets a handler answer a
+    replay before doing work whose outcome may have changed since (pricing);
+    raises IdempotencyKeyMismatch when the key was used with a different body.
+    """
+    raw_item = _get_record(runtime.client("dynamodb"), record_key)
+    if not raw_item or int(raw_item["expiresAt"]["N"]) < int(time.time()):
+        return None
+    return _stored(raw_item, body_hash(body))
+
+
+def write_once(record_key, body, status_code, response_text, transact_items):
+    """
+    Write `transact_items` (TransactWriteItems entries) together with the
+    idempotency record holding the response. Returns None when they were
+    written, or the stored (status code, response text) when the key was
+    already used with the same body; raises IdempotencyKeyMismatch when it was
+    used with a different one.
+    """
+    client = runtime.client("dynamodb")
+    request_hash = body_hash(body)
+    for attempt in range(CONFLICT_RETRIES + 1):
+        now = int(time.time())
+        try:
+            client.transact_write_items(TransactItems=[
+                _record_put(record_key, request_hash, status_code, response_text, now), *transact_items])
+            return None
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            reasons = e.response.get("CancellationReasons") or [{}]
+            # The record is the first entry; the created items never exist without it
+            if reasons[0].get("Code") == "ConditionalCheckFailed":
+                raw_item = reasons[0].get("Item") or _get_record(client, record_key)
+                if raw_item:
+                    return _stored(raw_item, request_hash)
+            elif not any(reason.get("Code") == "TransactionConflict" for reason in reasons):
+                raise
+            if attempt == CONFLICT_RETRIES:
+                raise
+            # A duplicate is committing right now: its record is there on the next attempt
+            logger.info("Idempotency record busy, retrying (%s)", record_key)
+            time.sleep(random.uniform(0, CONFLICT_BASE_DELAY * 2 ** attempt))
@@ -0,0 +1,160 @@
+"""
+Per-request stage timings and sampled logging for the enterprise handlers.
+
+@instrumentation.instrument(logger, metrics), placed under @metrics.log_metrics,
+adds to every invocation's metrics (EMF) HandlerDuration and a <Stage>Duration
+in milliseconds for each stage that ran:
+
+* AWS calls, per service (DynamoDBDuration, CognitoIdentityProviderDuration,
+  ...), timed through botocore's before-call/after-call events on every client
+  created after this module is imported
+* Serialize, recorded by serialization.json_response()
+* anything a handler wraps in `with instrumentation.stage("Parse"):`
+
+Time spent in the same stage is summed, also across threads (PaymentStep's
+batch settlement), so a stage can exceed HandlerDuration.
+
+Instead of logging every event, the event and the DEBUG lines are logged for
+a LOG_EVENT_SAMPLE_RATE share of requests (default 0.01) and for every failed
+(an exception or a 5xx response) or slow request (SLOW_REQUEST_MS, default
+1000). For the latter the DEBUG lines are held back while the request runs and
+written only when it turns out to need them (at most MAX_BUFFERED_RECORDS).
+"""
+import functools
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import boto3
+
+EVENT_SAMPLE_RATE = float(os.environ.get("LOG_EVENT_SAMPLE_RATE", 0.01))
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", 1000))
+MAX_BUFFERED_RECORDS = 200
+
+_lock = threading.Lock()
+_stages = {}
+
+
+def record(name, seconds):
+    """Add `seconds` to stage `name` of the current request."""
+    with _lock:
+        _stages[name] = _stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def _before_call(context, **kwargs):
+    context["instrumentation_start"] = time.perf_counter()
+
+
+def _after_call(model, context, **kwargs):
+    # Also emitted for error responses; only a failed connection goes unrecorded
+    start = context.get("instrumentation_start")
+    if start is not None:
+        record(model.service_model.service_id.replace(" ", ""), time.perf_counter() - start)
+
+
+def _register_aws_hooks():
+    # Clients copy the session's handlers when they are created, so this must run first
+    if boto3.DEFAULT_SESSION is None:
+        boto3.setup_default_session()
+    events = boto3.DEFAULT_SESSION.events
+    events.register("before-call", _before_call, unique_id="instrumentation-before-call")
+    events.register("after-call", _after_call, unique_id="instrumentation-after-call")
+
+
+_register_aws_hooks()
+
+
+class _HoldBack(logging.Filter):
+    """Keeps records below `threshold` out of a handler until flushed (or dropped)."""
+
+    def __init__(self, threshold):
+        super().__init__()
+        self.threshold = threshold
+        self.records = []
+        self.passing = False
+
+    def filter(self, record):
+        if self.passing or record.levelno >= self.threshold:
+            return True
+        if len(self.records) < MAX_BUFFERED_RECORDS:
+            self.records.append(record)
+        return False
+
+    def flush(self, handlers):
+        self.passing = True
+        for record in self.records:
+            for handler in handlers:
+                handler.handle(record)
+        self.records.clear()
+
+
+def _handlers(logger):
+    # A Powertools Logger writes through its own handler, a plain logger through root's
+    handlers = list(getattr(logger, "handlers", None) or ())
+    return handlers or logging.getLogger().handlers
+
+
+def _failed(response):
+    return isinstance(response, dict) and isinstance(response.get("statusCode"), int) \
+        and response["statusCode"] >= 500
+
+
+def instrument(logger, metrics):
+    """Decorator for a handler: stage timings as metrics and sampled event/DEBUG logging."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            with _lock:
+                _stages.clear()
+            level = getattr(logger, "log_level", None) or logging.getLogger().level
+            sampled = random.random() < EVENT_SAMPLE_RATE
+            hold_back, handlers = None, _handlers(logger)
+            if level > logging.DEBUG:
+                logger.setLevel(logging.DEBUG)
+                if not sampled:
+                    hold_back = _HoldBack(level)
+                    for log_handler in handlers:
+                        log_handler.addFilter(hold_back)
+
+            failed, start = True, time.perf_counter()
+            try:
+                response = handler(event, context)
+                failed = _failed(response)
+                return response
+            finally:
+                duration_ms = (time.perf_counter() - start) * 1000
+                with _lock:
+                    stages = {name: round(seconds * 1000, 3) for name, seconds in _stages.items()}
+                metrics.add_metric(name="HandlerDuration", unit="Milliseconds", value=round(duration_ms, 3))
+                for name, value in stages.items():
+                    metrics.add_metric(name=f"{name}Duration", unit="Milliseconds", value=value)
+                slow = duration_ms >= SLOW_REQUEST_MS
+                if slow:
+                    metrics.add_metric(name="SlowRequest", unit="Count", value=1)
+
+                if hold_back is not None and (failed or slow):
+                    hold_back.flush(handlers)
+                if failed or slow or sampled:
+                    reason = "error" if failed else "slow" if slow else "sampled"
+                    log = logger.info if reason == "sampled" else logger.warning
+                    log("Request event", extra={"reason": reason, "durationMs": round(duration_ms, 3),
+                                                "stages": stages, "event": event})
+                if hold_back is not None:
+                    for log_handler in handlers:
+                        log_handler.removeFilter(hold_back)
+                if level > logging.DEBUG:
+                    logger.setLevel(level)
+        return wrapper
+    return decorator
@@ -0,0 +1,53 @@
+"""
+Process-wide setup shared by the enterprise handlers.
+
+AWS clients are built once per execution environment and reused by every
+invocation (and every handler module loaded in the same process). Handlers
+request the ones they always need at import time, so the work happens in the
+init phase; anything only some requests need is created on first use.
+"""
+import os
+from functools import lru_cache
+
+import boto3
+from botocore.config import Config
+
+# Fail fast instead of stalling a request on a dead connection; standard retry mode
+# adds jittered backoff for throttling
+_CONFIG = Config(
+    connect_timeout=float(os.environ.get("AWS_CONNECT_TIMEOUT_SECONDS", 2)),
+    read_timeout=float(os.environ.get("AWS_READ_TIMEOUT_SECONDS", 5)),
+    retries={"max_attempts": 3, "mode": "standard"},
+    tcp_keepalive=True,
+)
+
+# Per-service adjustments on top of _CONFIG. Cognito's request rate quotas are per account
+# and low (UserAuthentication, UserCreation): adaptive mode also rate-limits this process's
+# own calls once it is throttled, instead of retrying into the throttle
+_SERVICE_CONFIGS = {
+    "cognito-idp": _CONFIG.merge(Config(
+        retries={"max_attempts": int(os.environ.get("COGNITO_MAX_ATTEMPTS", 3)), "mode": "adaptive"},
+        # RegisterUser has two calls in flight at once; kept-alive connections are reused
+        max_pool_connections=4,
+    )),
+}
+
+# Tracer patches only the AWS SDK; patching every supported library adds to the cold start
+TRACER_PATCH_MODULES = ("boto3",)
+
+
+@lru_cache(maxsize=None)
+def client(service_name):
+    """Shared low-level client for `service_name`."""
+    return boto3.client(service_name, config=_SERVICE_CONFIGS.get(service_name, _CONFIG))
+
+
+@lru_cache(maxsize=None)
+def dynamodb():
+    """Shared DynamoDB service resource (loading its model is the expensive part)."""
+    return boto3.resource("dynamodb", config=_CONFIG)
+
+
+@lru_cache(maxsize=None)
+def table(name):
+    return dynamodb().Table(name)
@@ -0,0 +1,207 @@
+"""
+JSON encoding and API Gateway responses for the enterprise handlers.
+
+DynamoDB returns every number as a Decimal. The encoder (simplejson with
+use_decimal, from layer/requirements.txt) writes each one as its own digits
+while it walks the payload, so prices, totals and ids come out exactly as
+stored at any precision. to_plain() is for payloads handed on as objects,
+which have no Decimal type: integral values become ints, everything else a
+float (exact up to 15 significant digits).
+
+Large responses are gzip or brotli compressed when the client's
+Accept-Encoding allows it and returned base64-encoded; the RestApi's
+BinaryMediaTypes makes API Gateway decode them back to bytes. The same setting
+makes API Gateway hand request bodies to Lambda base64-encoded, which is what
+request_body() undoes.
+
+Items carry a `version` counter that every write path increments; a response
+for one item has the weak ETag W/"<version>", and a request whose
+If-None-Match names it gets not_modified(): 304 and no body.
+"""
+import base64
+import os
+import zlib
+from decimal import Decimal
+
+import simplejson
+
+from common import instrumentation
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Expose-Headers": "ETag",
+}
+
+VERSION_ATTRIBUTE = "version"
+
+# Bodies smaller than this are sent as they are: the saving would not pay for the CPU
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
+
+# Preferred first when the client accepts several with the same q-value
+_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+# Built once per execution environment, never per response
+_VARY_HEADERS = {**JSON_HEADERS, "Vary": "Accept-Encoding"}
+_ENCODED_HEADERS = {
+    encoding: {**_VARY_HEADERS, "Content-Encoding": encoding} for encoding in _ENCODINGS
+}
+
+
+# Integers up to this size convert exactly through a float (which is cheaper than int(Decimal))
+_MAX_EXACT_FLOAT = 2 ** 53
+
+
+def _default(o):
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _plain_number(o):
+    number = float(o)
+    if not number.is_integer():
+        return number
+    if -_MAX_EXACT_FLOAT < number < _MAX_EXACT_FLOAT:
+        return int(number)
+    return int(o)
+
+
+# One encoder for the process: dumps(cls=...) builds a new one on every call
+_ENCODER = simplejson.JSONEncoder(use_decimal=True, default=_default, separators=(",", ":"))
+dumps = _ENCODER.encode
+
+
+def to_plain(value):
+    """
+    Copy of `value` with Decimals (and sets) replaced by JSON types, for payloads
+    that are handed on as objects (e.g. Step Functions state) rather than text.
+    """
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [to_plain(item) for item in value]
+    if isinstance(value, Decimal):
+        return _plain_number(value)
+    return value
+
+
+def _header(headers, name):
+    # REST API events keep the client's header casing
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        name = name.lower()
+        for key, candidate in headers.items():
+            if key.lower() == name:
+                return candidate
+    return value
+
+
+def request_header(event, name):
+    return _header((event or {}).get("headers"), name)
+
+
+def etag(version):
+    # Weak: the compressed and the plain body of one version are the same representation
+    return f'W/"{int(version or 0)}"'
+
+
+def etag_matches(event, version):
+    """Whether the request's If-None-Match (ETags or *) names `version`, by weak comparison."""
+    header = request_header(event, "If-None-Match")
+    if not header:
+        return False
+    current = etag(version)[2:]
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == current:
+            return True
+    return False
+
+
+def not_modified(version):
+    """304 for a conditional GET: the ETag and no body."""
+    return {"statusCode": 304, "headers": {**JSON_HEADERS, "ETag": etag(version)}, "body": ""}
+
+
+def accepted_encoding(event):
+    """The best response encoding the request's Accept-Encoding allows, or None."""
+    accept = _header((event or {}).get("headers"), "Accept-Encoding")
+    if not accept:
+        return None
+    weights = {}
+    for part in accept.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in _ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # wbits=31: gzip container
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def json_response(status_code, body, event=None, headers=None, version=None):
+    """
+    API Gateway proxy response. `body` may already be encoded JSON text. Pass
+    the request `event` to allow compressing a large body, and an item's
+    `version` to send its ETag. The time it takes is the request's Serialize
+    stage (common/instrumentation.py).
+    """
+    with instrumentation.stage("Serialize"):
+        text = body if isinstance(body, str) else dumps(body)
+        response = None
+        if event is not None and headers is None:
+            # The response now depends on Accept-Encoding, so shared caches must key on it
+            headers = _VARY_HEADERS
+            encoding = accepted_encoding(event)
+            if encoding:
+                data = text.encode("utf-8")
+                if len(data) >= COMPRESSION_MIN_BYTES:
+                    response = {
+                        "statusCode": status_code,
+                        "headers": _ENCODED_HEADERS[encoding],
+                        "isBase64Encoded": True,
+                        "body": base64.b64encode(compress(data, encoding)).decode("ascii"),
+                    }
+        if response is None:
+            response = {
+                "statusCode": status_code,
+                "headers": headers or JSON_HEADERS,
+                "body": text,
+            }
+        if version is not None:
+            response["headers"] = {**response["headers"], "ETag": etag(version)}
+        return response
+
+
+def request_body(event):
+    """The request body as text (None when there is none), decoding base64 bodies."""
+    body = event.get("body")
+    if body and event.get("isBase64Encoded"):
+        return base64.b64decode(body).decode("utf-8")
+    return body
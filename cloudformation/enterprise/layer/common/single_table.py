@@ -0,0 +1,147 @@
+"""
+Optional single-table copy of each user's data, for pages that need all of it.
+
+USER_TABLE_NAME names a table keyed by PK and SK (both strings):
+
+    PK = USER#<userId>  SK = PROFILE                               Customers item
+                        SK = ORDER#<createdAt>#<orderId>           Orders item
+                        SK = FEEDBACK#<createdAt>#<feedbackId>     Feedback item
+
+so one Query on PK returns a user's profile, orders and feedback. Customers,
+Orders and Feedback stay the source of truth: when USER_TABLE_NAME is set the
+handlers write the copy too (in the same transaction when they create an item)
+and tools/backfill_user_table.py copies the items written before that.
+"""
+import logging
+import os
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from common import runtime
+
+logger = logging.getLogger(__name__)
+
+# Empty (the template's default) leaves the handlers writing only their own table
+TABLE_NAME = os.environ.get("USER_TABLE_NAME") or None
+
+PROFILE = "PROFILE"
+ORDER = "ORDER"
+FEEDBACK = "FEEDBACK"
+_KEY_ATTRIBUTES = ("PK", "SK", "itemType")
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def user_key(user_id):
+    return f"USER#{user_id}"
+
+
+def _sort_time(record):
+    # Fixed width, so string order in SK is time order
+    return f"{int(record.get('createdAt') or 0):010d}"
+
+
+def profile_item(customer):
+    return {**customer, "PK": user_key(customer["userId"]), "SK": PROFILE, "itemType": PROFILE}
+
+
+def order_item(order):
+    return {**order, "PK": user_key(order["userId"]), "itemType": ORDER,
+            "SK": f"{ORDER}#{_sort_time(order)}#{order['orderId']}"}
+
+
+def feedback_item(feedback):
+    return {**feedback, "PK": user_key(feedback["userId"]), "itemType": FEEDBACK,
+            "SK": f"{FEEDBACK}#{_sort_time(feedback)}#{feedback['feedbackId']}"}
+
+
+def serialize(item):
+    return {key: _serializer.serialize(value) for key, value in item.items()}
+
+
+def deserialize(raw_item):
+    return {key: _deserializer.deserialize(value) for key, value in raw_item.items()}
+
+
+def transact_puts(table, item, copy):
+    """TransactWriteItems entries that write `item` into `table` and, when configured, its `copy`."""
+    puts = [{"Put": {"TableName": table.name, "Item": serialize(item)}}]
+    if TABLE_NAME:
+        puts.append({"Put": {"TableName": TABLE_NAME, "Item": serialize(copy)}})
+    return puts
+
+
+def put(table, item, copy):
+    """
+    put_item `item` into `table` (a Table resource). With a user table configured,
+    `item` and its `copy` are written by one TransactWriteItems instead, so the
+    copy never exists without the item or the other way round.
+    """
+    if not TABLE_NAME:
+        table.put_item(Item=item)
+        return
+    runtime.client("dynamodb").transact_write_items(TransactItems=transact_puts(table, item, copy))
+
+
+def sync_order(order):
+    """
+    Overwrite the copy of an order that was updated in place (PaymentStep). The
+    update already happened, so a failure is logged and reported (False), not
+    raised. Thread safe: it uses the shared low-level client.
+    """
+    if not TABLE_NAME:
+        return True
+    try:
+        runtime.client("dynamodb").put_item(TableName=TABLE_NAME, Item=serialize(order_item(order)))
+        return True
+    except ClientError as e:
+        logger.warning("User table copy not updated: %s (orderId %s)",
+                       e.response["Error"]["Code"], order.get("orderId"))
+        return False
+
+
+def _strip(item):
+    return {key: value for key, value in item.items() if key not in _KEY_ATTRIBUTES}
+
+
+def _query(table_name, user_id, limit, prefix=None):
+    condition, values = "PK = :pk", {":pk": {"S": user_key(user_id)}}
+    if prefix:
+        condition += " AND begins_with(SK, :prefix)"
+        values[":prefix"] = {"S": prefix}
+    response = runtime.client("dynamodb").query(
+        TableName=table_name, KeyConditionExpression=condition, ExpressionAttributeValues=values,
+        ScanIndexForward=False, Limit=limit)
+    return [deserialize(raw) for raw in response["Items"]], "LastEvaluatedKey" in response
+
+
+def load_dashboard(table_name, user_id, orders_limit, feedback_limit):
+    """
+    Profile, newest `orders_limit` orders and newest `feedback_limit` feedback of a user.
+
+    Newest first the partition reads PROFILE, then ORDER#... (newest first), then
+    FEEDBACK#..., so a single Query of 1 + orders_limit + feedback_limit items
+    covers every user with fewer orders than that. Only when the orders fill
+    the page before the feedback is reached, a second Query reads the feedback.
+    Returns (dashboard, queries made).
+    """
+    items, more = _query(table_name, user_id, 1 + orders_limit + feedback_limit)
+    profile, orders, feedback = None, [], []
+    for item in items:
+        item_type = item.get("itemType")
+        if item_type == PROFILE:
+            profile = _strip(item)
+        elif item_type == ORDER:
+            orders.append(_strip(item))
+        elif item_type == FEEDBACK:
+            feedback.append(_strip(item))
+
+    queries = 1
+    if more and len(feedback) < feedback_limit:
+        items, _ = _query(table_name, user_id, feedback_limit, prefix=f"{FEEDBACK}#")
+        feedback = [_strip(item) for item in items]
+        queries += 1
+
+    return {"profile": profile, "orders": orders[:orders_limit], "feedback": feedback[:feedback_limit]}, queries
@@ -0,0 +1,336 @@
+"""
+Relational copy of orders, customers and feedback in the RDS PostgreSQL
+instance (AnalyticsDBInstance), for time-range reports DynamoDB can't index.
+
+AnalyticsSinkFunction folds each DynamoDB stream batch into the latest state
+per key and writes it with multi-row INSERT ... ON CONFLICT upserts (and one
+DELETE per table), all in one transaction, so a retried batch converges to
+the same rows. GetAnalytics reads it with range queries on created_at.
+
+The connection and the Secrets Manager secret are cached per execution
+environment: only a cold start (or a dropped connection) pays for the TLS
+handshake, the authentication and the GetSecretValue call. The server
+certificate is always verified, against the RDS CA bundle shipped in the
+layer (RDS_CA_BUNDLE).
+
+The SQL is plain enough for SQLite as well: set_connection(sqlite3.connect(...),
+placeholder="?") runs everything against a local stand-in.
+"""
+import datetime
+import json
+import os
+import ssl
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from common import runtime
+
+ENDPOINT = os.environ.get("RDS_ENDPOINT")
+PORT = int(os.environ.get("RDS_PORT") or 5432)
+DB_NAME = os.environ.get("RDS_DB_NAME")
+SECRET_ARN = os.environ.get("RDS_SECRET_ARN")
+# PEM bundle of the RDS certificate authorities the server certificate is verified
+# against (https://truststore.pki.rds.amazonaws.com/global/global-bundle.pem)
+CA_BUNDLE = os.environ.get("RDS_CA_BUNDLE") or os.path.join(os.path.dirname(__file__), "rds-ca-bundle.pem")
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get("RDS_CONNECT_TIMEOUT_SECONDS", 5))
+STATEMENT_TIMEOUT_MS = int(os.environ.get("RDS_STATEMENT_TIMEOUT_MS", 10000))
+# 500 rows of 8 columns stay far below PostgreSQL's 65535 and SQLite's 32766 parameters
+ROWS_PER_STATEMENT = 500
+
+DAY_SECONDS = 86400
+HOUR_SECONDS = 3600
+
+# table -> (key column, columns); every column is copied from the stream's new image
+TABLES = {
+    "orders": ("order_id", ("order_id", "user_id", "status", "payment_status", "order_total",
+                            "item_count", "created_at", "updated_at")),
+    "customers": ("user_id", ("user_id", "created_at", "updated_at")),
+    "feedback": ("feedback_id", ("feedback_id", "user_id", "order_id", "rating", "created_at")),
+}
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS orders (
+        order_id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        status TEXT,
+        payment_status TEXT,
+        order_total NUMERIC(12, 2),
+        item_count INTEGER,
+        created_at BIGINT NOT NULL,
+        updated_at BIGINT
+    )""",
+    # Covers both range reports: they read only these columns
+    "CREATE INDEX IF NOT EXISTS orders_created_at_idx ON orders (created_at, status, order_total)",
+    """CREATE TABLE IF NOT EXISTS customers (
+        user_id TEXT PRIMARY KEY,
+        created_at BIGINT,
+        updated_at BIGINT
+    )""",
+    "CREATE INDEX IF NOT EXISTS customers_created_at_idx ON customers (created_at)",
+    """CREATE TABLE IF NOT EXISTS feedback (
+        feedback_id TEXT PRIMARY KEY,
+        user_id TEXT,
+        order_id TEXT,
+        rating SMALLINT,
+        created_at BIGINT
+    )""",
+    "CREATE INDEX IF NOT EXISTS feedback_created_at_idx ON feedback (created_at)",
+)
+
+_deserializer = TypeDeserializer()
+
+_connection = None
+_placeholder = "%s"
+_secret = None
+# Errors meaning the cached connection is gone (set by the driver in use)
+_stale_errors = ()
+
+
+def _credentials(refresh=False):
+    """The secret's username/password, fetched once per execution environment."""
+    global _secret
+    if _secret is None or refresh:
+        response = runtime.client("secretsmanager").get_secret_value(SecretId=SECRET_ARN)
+        _secret = json.loads(response["SecretString"])
+    return _secret
+
+
+def _ssl_context():
+    # No unverified fallback: without the bundle there is no connection
+    if not os.path.isfile(CA_BUNDLE):
+        raise RuntimeError(f"RDS CA bundle {CA_BUNDLE} not found (RDS_CA_BUNDLE)")
+    return ssl.create_default_context(cafile=CA_BUNDLE)
+
+
+def _connect():
+    global _stale_errors
+    import pg8000.dbapi  # shipped in the layer; only the analytics functions need it
+
+    _stale_errors = (pg8000.dbapi.InterfaceError,)
+    for refresh in (False, True):
+        secret = _credentials(refresh)
+        try:
+            connection = pg8000.dbapi.connect(
+                user=secret["username"], password=secret["password"], host=ENDPOINT, port=PORT,
+                database=DB_NAME, timeout=CONNECT_TIMEOUT_SECONDS, ssl_context=_ssl_context(),
+                application_name=os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "enterprise-analytics"))
+            break
+        except pg8000.dbapi.Error:
+            if refresh:
+                raise
+            # The password may have been rotated since the secret was cached
+    cursor = connection.cursor()
+    cursor.execute(f"SET statement_timeout = {STATEMENT_TIMEOUT_MS}")
+    connection.commit()
+    return connection
+
+
+def ensure_schema(connection):
+    cursor = connection.cursor()
+    for statement in SCHEMA:
+        cursor.execute(statement)
+    connection.commit()
+
+
+def get_connection():
+    """Return the shared connection, opening it (and creating the tables) on first use."""
+    global _connection
+    if _connection is None:
+        if not ENDPOINT:
+            raise RuntimeError("RDS_ENDPOINT is not set")
+        connection = _connect()
+        try:
+            ensure_schema(connection)
+        except Exception:
+            # Two cold starts creating the tables at once: the loser sees them on a second try
+            connection.rollback()
+            ensure_schema(connection)
+        _connection = connection
+    return _connection
+
+
+def set_connection(connection, placeholder="%s"):
+    """Swap the connection, e.g. for sqlite3.connect(":memory:") with placeholder="?" in tests."""
+    global _connection, _placeholder
+    _connection = connection
+    _placeholder = placeholder
+    if connection is not None:
+        ensure_schema(connection)
+
+
+def close():
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+        _connection = None
+
+
+def transaction(work):
+    """
+    Run work(cursor) in one transaction on the shared connection and return its
+    result. A connection that went stale while the environment was frozen is
+    reopened and the whole transaction retried once.
+    """
+    for attempt in (1, 2):
+        connection = get_connection()
+        try:
+            result = work(connection.cursor())
+            connection.commit()
+            return result
+        except _stale_errors:
+            close()
+            if attempt == 2 or not ENDPOINT:
+                raise
+        except Exception:
+            connection.rollback()
+            raise
+
+
+def _sql(statement):
+    return statement.replace("%s", _placeholder) if _placeholder != "%s" else statement
+
+
+def _epoch(value):
+    # Numbers from create_order/register_user, numeric strings from PaymentStep
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _bind(value):
+    # sqlite3 has no Decimal adapter; PostgreSQL gets the exact value
+    if isinstance(value, Decimal) and _placeholder != "%s":
+        return str(value)
+    return value
+
+
+def _order_row(item):
+    return (item["orderId"], item.get("userId"), item.get("status"), item.get("paymentStatus"),
+            item.get("orderTotal"), len(item.get("items") or ()), _epoch(item.get("createdAt")) or 0,
+            _epoch(item.get("updatedAt")))
+
+
+def _customer_row(item):
+    # Only what the reports need: no e-mail, names or phone numbers in the warehouse
+    return (item["userId"], _epoch(item.get("createdAt")), _epoch(item.get("updatedAt")))
+
+
+def _feedback_row(item):
+    rating = item.get("rating")
+    return (item["feedbackId"], item.get("userId"), item.get("orderId"),
+            int(rating) if rating is not None else None, _epoch(item.get("createdAt")))
+
+
+def _source(keys):
+    if "orderId" in keys:
+        return "orders", "orderId", _order_row
+    if "feedbackId" in keys:
+        return "feedback", "feedbackId", _feedback_row
+    if "userId" in keys:
+        return "customers", "userId", _customer_row
+    return None
+
+
+def changes_from_records(records):
+    """
+    Fold stream records into {table: {key: row or None}}: the last change of each
+    key in the batch wins, None meaning deleted. Records come from the Orders,
+    Customers and Feedback streams (new images).
+    """
+    changes = {table: {} for table in TABLES}
+    for record in records:
+        keys = record["dynamodb"].get("Keys", {})
+        source = _source(keys)
+        if source is None:
+            continue
+        table, key_name, to_row = source
+        key = _deserializer.deserialize(keys[key_name])
+        if record["eventName"] == "REMOVE":
+            changes[table][key] = None
+            continue
+        image = record["dynamodb"].get("NewImage")
+        if image:
+            changes[table][key] = to_row({k: _deserializer.deserialize(v) for k, v in image.items()})
+    return changes
+
+
+def _upsert(cursor, table, rows):
+    key, columns = TABLES[table]
+    row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != key)
+    for start in range(0, len(rows), ROWS_PER_STATEMENT):
+        chunk = rows[start:start + ROWS_PER_STATEMENT]
+        cursor.execute(_sql(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_sql] * len(chunk))} "
+            f"ON CONFLICT ({key}) DO UPDATE SET {updates}"
+        ), [_bind(value) for row in chunk for value in row])
+
+
+def _delete(cursor, table, keys):
+    key = TABLES[table][0]
+    for start in range(0, len(keys), ROWS_PER_STATEMENT):
+        chunk = keys[start:start + ROWS_PER_STATEMENT]
+        cursor.execute(_sql(f"DELETE FROM {table} WHERE {key} IN ({', '.join(['%s'] * len(chunk))})"), chunk)
+
+
+def apply_changes(changes):
+    """Write folded changes in one transaction; returns {table: (upserted, deleted)}."""
+    def work(cursor):
+        counts = {}
+        for table, by_key in changes.items():
+            rows = [row for row in by_key.values() if row is not None]
+            deleted = [key for key, row in by_key.items() if row is None]
+            if rows:
+                _upsert(cursor, table, rows)
+            if deleted:
+                _delete(cursor, table, deleted)
+            if rows or deleted:
+                counts[table] = (len(rows), len(deleted))
+        return counts
+    return transaction(work)
+
+
+def _iso(epoch_seconds, timespec):
+    moment = datetime.datetime.fromtimestamp(epoch_seconds, datetime.timezone.utc)
+    return moment.date().isoformat() if timespec == "date" else moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _number(value):
+    # PostgreSQL returns NUMERIC sums as Decimal, SQLite as float or int
+    return value if isinstance(value, Decimal) else Decimal(str(value or 0))
+
+
+def range_report(start, end):
+    """
+    Orders and revenue per UTC day and orders per status per UTC hour, for
+    orders created in [start, end) (epoch seconds). Both are range scans of
+    orders_created_at_idx, read in one transaction. Buckets are computed with
+    integer division, which both PostgreSQL and SQLite do on BIGINT.
+    """
+    def work(cursor):
+        cursor.execute(_sql(
+            f"SELECT created_at / {DAY_SECONDS} * {DAY_SECONDS} AS day, COUNT(*), SUM(order_total) "
+            "FROM orders WHERE created_at >= %s AND created_at < %s GROUP BY 1 ORDER BY 1"
+        ), (start, end))
+        per_day = cursor.fetchall()
+        cursor.execute(_sql(
+            f"SELECT created_at / {HOUR_SECONDS} * {HOUR_SECONDS} AS hour, status, COUNT(*) "
+            "FROM orders WHERE created_at >= %s AND created_at < %s GROUP BY 1, 2 ORDER BY 1, 2"
+        ), (start, end))
+        return per_day, cursor.fetchall()
+
+    per_day, per_hour = transaction(work)
+    hours = {}
+    for hour, status, count in per_hour:
+        hours.setdefault(int(hour), {})[status or "UNKNOWN"] = int(count)
+    return {
+        "revenuePerDay": [{"day": _iso(int(day), "date"), "orders": int(count), "revenue": _number(revenue)}
+                          for day, count, revenue in per_day],
+        "ordersPerStatusPerHour": [{"hour": _iso(hour, "hour"), "statuses": statuses}
+                                   for hour, statuses in hours.items()],
+    }
@@ -0,0 +1,8 @@
+"""
+Lambda handlers of the enterprise stack, one module per function.
+
+Every function ships this package (Code: src/) and points its Handler at
+its own module, e.g. handlers.create_order.lambda_handler. Code shared at
+runtime (clients, responses, cache, analytics) comes from the `common`
+package in the SharedCodeLayer.
+"""
@@ -0,0 +1,32 @@
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+
+from common import instrumentation, runtime, warehouse
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+logger = Logger()
+tracer = Tracer(patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics()
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+@metrics.log_metrics
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    # Stream batch from Orders, Customers or Feedback: folded to the last change per
+    # key and written in one transaction, so a retried batch writes the same rows
+    records = event.get('Records', [])
+    changes = warehouse.changes_from_records(records)
+    written = warehouse.apply_changes(changes)
+
+    upserted = sum(rows for rows, _ in written.values())
+    deleted = sum(removed for _, removed in written.values())
+    logger.info("Warehouse updated", extra={"records": len(records), "tables": written})
+    metrics.add_metric(name="WarehouseStreamRecords", unit="Count", value=len(records))
+    metrics.add_metric(name="WarehouseRowsUpserted", unit="Count", value=upserted)
+    metrics.add_metric(name="WarehouseRowsDeleted", unit="Count", value=deleted)
+    return {'statusCode': 200, 'records': len(records), 'upserted': upserted, 'deleted': deleted}
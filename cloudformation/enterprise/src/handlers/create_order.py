@@ -0,0 +1,221 @@
+import json
+import os
+import time
+import uuid
+from decimal import Decimal, InvalidOperation
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.logging import correlation_paths
+from botocore.exceptions import ClientError
+
+from common import cache, catalog, idempotency, instrumentation, runtime, single_table
+from common.serialization import JSON_HEADERS, VERSION_ATTRIBUTE, dumps, json_response, request_body
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Initialize PowerTools
+logger = Logger(service="create-order")
+tracer = Tracer(service="create-order", patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics(namespace="MyApp", service="create-order")
+
+ORDERS_TABLE_NAME = os.environ.get('ORDERS_TABLE_NAME')
+table = runtime.table(ORDERS_TABLE_NAME) if ORDERS_TABLE_NAME else None
+
+# A replayed response says so, for clients and for debugging duplicate submissions
+_REPLAY_HEADERS = {**JSON_HEADERS, "Idempotent-Replayed": "true",
+                   "Access-Control-Expose-Headers": "Idempotent-Replayed"}
+
+
+def _to_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _quantity(value):
+    # Decimal (or int) from the parser; bool is an int subclass but not a quantity
+    if isinstance(value, bool) or not isinstance(value, (int, Decimal)) or value <= 0 or value != int(value):
+        raise ValueError("Item quantity must be a positive integer")
+    return value
+
+
+def normalise_items(items, prices=None):
+    """
+    One pass over the order lines: checks each is an object with a positive
+    integer quantity and sums the order total. Numbers were parsed as Decimal
+    already, so the lines are stored as they are. With a product catalog
+    (`prices`), each line's price is the catalog's, whatever the client sent.
+    Raises ValueError for a bad line, price or quantity, and
+    catalog.ProductsUnavailable for products the catalog does not sell.
+    """
+    order_total = Decimal(0)
+    unavailable = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Every item must be an object")
+        quantity = _quantity(item.get('quantity', 1))
+        if prices is not None:
+            if not isinstance(item.get('productId'), str):
+                raise ValueError("Every item needs a productId")
+            price = prices.price(item['productId'])
+            if price is None:
+                unavailable.append(item['productId'])
+                continue
+            item['price'] = price
+        try:
+            order_total += _to_decimal(item.get('price', 0)) * _to_decimal(quantity)
+        except (InvalidOperation, TypeError):
+            raise ValueError("Item price must be a number") from None
+    if unavailable:
+        raise catalog.ProductsUnavailable(unavailable)
+    return order_total
+
+
+def _replayed(replay, user_id):
+    logger.info("Idempotent replay", extra={"userId": user_id})
+    metrics.add_metric(name="IdempotentReplay", unit="Count", value=1)
+    return json_response(replay[0], replay[1], headers=_REPLAY_HEADERS)
+
+
+@logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
+@tracer.capture_lambda_handler
+@metrics.log_metrics(capture_cold_start_metric=True)
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    function_name = context.function_name
+
+    # Log structured information
+    logger.info("Function invoked", extra={
+        "function_name": function_name,
+        "request_id": context.aws_request_id
+    })
+
+    # Add custom annotation for X-Ray
+    tracer.put_annotation(key="function_name", value=function_name)
+
+    # Add business metrics
+    metrics.add_metric(name="OrderCreationAttempt", unit="Count", value=1)
+    tracer.put_metadata(key="table_name", value=ORDERS_TABLE_NAME)
+
+    try:
+        # Parse the request body
+        body = request_body(event)
+        if not body:
+            return json_response(400, {"error": "Missing request body"})
+        with instrumentation.stage("Parse"):
+            # Decimal straight from the parser: DynamoDB needs it and no second pass is made
+            request_data = json.loads(body, parse_float=Decimal, parse_int=Decimal)
+        if not isinstance(request_data, dict):
+            return json_response(400, {"error": "Request body must be a JSON object"})
+        try:
+            idempotency_key = idempotency.request_key(event)
+        except idempotency.InvalidIdempotencyKey as e:
+            return json_response(400, {"error": str(e)})
+
+        # Validate required fields
+        required_fields = ['userId', 'items', 'shippingAddress']
+        missing_fields = [field for field in required_fields if field not in request_data]
+
+        if missing_fields:
+            return json_response(400, {"error": f"Missing required fields: {', '.join(missing_fields)}"})
+
+        # Validate items array
+        if not isinstance(request_data['items'], list) or len(request_data['items']) == 0:
+            return json_response(400, {"error": "Items must be a non-empty array"})
+
+        # A retry of a request that already succeeded gets its response, whatever the catalog says now.
+        # Without a catalog the checks below only depend on the body, and write_once finds the replay
+        if idempotency_key:
+            record_key = idempotency.record_key("CreateOrder", request_data['userId'], idempotency_key)
+            replay = catalog.S3_PATH and idempotency.stored_response(record_key, body)
+            if replay:
+                return _replayed(replay, request_data['userId'])
+
+        # Generate a unique order ID
+        order_id = str(uuid.uuid4())
+        timestamp = int(time.time())
+
+        # Price the items from the product catalog (when configured) and calculate the order total
+        try:
+            order_total = normalise_items(request_data['items'], catalog.get_catalog(metrics=metrics))
+        except catalog.ProductsUnavailable as e:
+            metrics.add_metric(name="ProductsUnavailable", unit="Count", value=1)
+            return json_response(409, {"error": str(e), "productIds": e.product_ids})
+        except ValueError as e:
+            return json_response(400, {"error": str(e)})
+
+        # Prepare order data for DynamoDB
+        order_item = {
+            'orderId': order_id,
+            'userId': request_data['userId'],
+            'items': request_data['items'],
+            'shippingAddress': request_data['shippingAddress'],
+            'orderTotal': order_total,
+            'status': 'PENDING',
+            'createdAt': Decimal(timestamp),
+            'updatedAt': Decimal(timestamp),
+            VERSION_ATTRIBUTE: 1
+        }
+
+        # Add optional fields if present
+        if 'paymentMethod' in request_data:
+            order_item['paymentMethod'] = request_data['paymentMethod']
+
+        if 'notes' in request_data:
+            order_item['notes'] = request_data['notes']
+
+        response_body = {
+            "message": "Order created successfully",
+            "orderId": order_id,
+            "status": "PENDING",
+            "orderTotal": float(order_total)  # Convert back to float for JSON response
+        }
+
+        # Write to DynamoDB (with the user table copy, when configured)
+        if idempotency_key:
+            # The order, its copy and the idempotency record holding this response in one transaction
+            response_text = dumps(response_body)
+            replay = idempotency.write_once(
+                record_key, body, 201, response_text,
+                single_table.transact_puts(table, order_item, single_table.order_item(order_item)))
+            if replay:
+                return _replayed(replay, request_data['userId'])
+        else:
+            single_table.put(table, order_item, single_table.order_item(order_item))
+
+        # Write-through: cache the new order and drop the user's cached list pages
+        cache.put_order(order_item, metrics=metrics)
+
+        # Log success and add metrics
+        logger.info("Order created successfully", extra={
+            "orderId": order_id,
+            "userId": request_data['userId'],
+            "orderTotal": order_total
+        })
+        metrics.add_metric(name="SuccessfulOrderCreation", unit="Count", value=1)
+        metrics.add_metric(name="OrderValue", unit="None", value=order_total)
+
+    except idempotency.IdempotencyKeyMismatch as e:
+        return json_response(422, {"error": str(e)})
+
+    except catalog.CatalogUnavailable as e:
+        logger.error("Product catalog unavailable", extra={"error": str(e)})
+        metrics.add_metric(name="CatalogUnavailable", unit="Count", value=1)
+        return json_response(503, {"error": "Product catalog unavailable"})
+
+    except ClientError as e:
+        # Handle DynamoDB errors
+        logger.error("DynamoDB error", extra={
+            "error_code": e.response['Error']['Code'],
+            "error_message": e.response['Error']['Message']
+        })
+        metrics.add_metric(name="DatabaseError", unit="Count", value=1)
+        return json_response(500, {"error": "Database operation failed"})
+
+    except Exception:
+        # Handle general errors
+        logger.exception("Error processing order creation")
+        metrics.add_metric(name="ProcessingError", unit="Count", value=1)
+        return json_response(500, {"error": "Internal server error"})
+
+    return json_response(201, response_body)  # Created
@@ -0,0 +1,34 @@
+import os
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+
+from common import feedback, instrumentation, runtime
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+logger = Logger()
+tracer = Tracer(patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics()
+
+TABLE_NAME = os.environ.get('TABLE_NAME')
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+@metrics.log_metrics
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    # SQS batch from FeedbackQueue (SubmitFeedback in async mode): BatchWriteItem in
+    # 25s plus the rating aggregates; only messages whose item was not written are retried
+    records = event.get('Records', [])
+    failed, written, ratings_failed = feedback.write_records(TABLE_NAME, records)
+
+    logger.info("Feedback written", extra={"records": len(records), "written": written, "failed": len(failed)})
+    metrics.add_metric(name="FeedbackSubmitted", unit="Count", value=written)
+    if failed:
+        metrics.add_metric(name="FeedbackWriteError", unit="Count", value=len(failed))
+    if ratings_failed:
+        metrics.add_metric(name="FeedbackRatingsError", unit="Count", value=ratings_failed)
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed]}
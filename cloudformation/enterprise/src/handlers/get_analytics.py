@@ -0,0 +1,96 @@
+import datetime
+import os
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.logging import correlation_paths
+from botocore.exceptions import ClientError
+
+from common import analytics, instrumentation, runtime, warehouse
+from common.serialization import json_response
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Initialize PowerTools - service name will be picked from POWERTOOLS_SERVICE_NAME env var
+logger = Logger()
+tracer = Tracer(patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics()
+
+STATS_TABLE_NAME = os.environ.get('STATS_TABLE_NAME')
+stats_table = runtime.table(STATS_TABLE_NAME) if STATS_TABLE_NAME else None
+RANGE_RESOURCE = '/analytics/range'
+DEFAULT_RANGE_DAYS = 7
+MAX_RANGE_DAYS = int(os.environ.get('ANALYTICS_MAX_RANGE_DAYS', 92))
+
+
+def _epoch(value, name):
+    """Epoch seconds of an ISO 8601 date or date-time (UTC unless it has an offset)."""
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or date-time") from None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return int(moment.timestamp())
+
+
+def _range_report(event):
+    """GET /analytics/range?from=2024-05-01&to=2024-05-08 from the RDS warehouse (end exclusive)."""
+    query_params = event.get('queryStringParameters') or {}
+    try:
+        end = _epoch(query_params['to'], 'to') if query_params.get('to') else int(datetime.datetime.now().timestamp())
+        start = (_epoch(query_params['from'], 'from') if query_params.get('from')
+                 else end - DEFAULT_RANGE_DAYS * warehouse.DAY_SECONDS)
+    except ValueError as e:
+        return json_response(400, {"error": str(e)})
+    if start >= end:
+        return json_response(400, {"error": "from must be before to"})
+    if end - start > MAX_RANGE_DAYS * warehouse.DAY_SECONDS:
+        return json_response(400, {"error": f"The range may span at most {MAX_RANGE_DAYS} days"})
+
+    try:
+        report = warehouse.range_report(start, end)
+    except Exception:
+        logger.exception("Analytics database error during range report")
+        metrics.add_metric(name="AnalyticsErrorRDS", unit="Count", value=1)
+        return json_response(500, {"error": "Could not generate analytics due to a database issue."})
+
+    metrics.add_metric(name="AnalyticsRangeReportGenerated", unit="Count", value=1)
+    return json_response(200, {
+        "from": datetime.datetime.fromtimestamp(start, datetime.timezone.utc).isoformat(),
+        "to": datetime.datetime.fromtimestamp(end, datetime.timezone.utc).isoformat(),
+        **report
+    }, event=event)
+
+
+@logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
+@tracer.capture_lambda_handler
+@metrics.log_metrics(capture_cold_start_metric=True)
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    logger.info("GetAnalyticsFunction invoked.")
+    if event.get('resource') == RANGE_RESOURCE:
+        return _range_report(event)
+
+    try:
+        if stats_table is None:
+            logger.error("STATS_TABLE_NAME environment variable not set.")
+            return json_response(500, {"error": "Server configuration error."})
+
+        # Aggregates are maintained incrementally by AnalyticsAggregatorFunction
+        # from the Orders/Customers streams, so the report is a single get_item
+        analytics_data = analytics.read_stats(stats_table)
+        logger.info(f"Analytics from stats item: Total orders: {analytics_data['totalOrders']}, Total revenue: {analytics_data['totalRevenue']}")
+
+        metrics.add_metric(name="AnalyticsReportGenerated", unit="Count", value=1)
+        return json_response(200, {"analyticsReport": analytics_data}, event=event)
+
+    except ClientError:
+        logger.exception("DynamoDB error during analytics generation")
+        metrics.add_metric(name="AnalyticsErrorDB", unit="Count", value=1)
+        return json_response(500, {"error": "Could not generate analytics due to a database issue."})
+    except Exception:
+        logger.exception("Unexpected error generating analytics report")
+        metrics.add_metric(name="AnalyticsErrorUnexpected", unit="Count", value=1)
+        return json_response(500, {"error": "An unexpected error occurred."})
@@ -0,0 +1,77 @@
+import os
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.logging import correlation_paths
+from botocore.exceptions import ClientError
+
+from common import instrumentation, runtime, single_table
+from common.serialization import json_response
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Initialize PowerTools
+logger = Logger(service="get-dashboard")
+tracer = Tracer(service="get-dashboard", patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics(namespace="MyApp", service="get-dashboard")
+
+USER_TABLE_NAME = os.environ.get('USER_TABLE_NAME')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+# Created at import so the init phase pays for it
+runtime.client('dynamodb')
+
+
+def _limit(query_params, name):
+    try:
+        value = int(query_params.get(name, DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+    if not 0 <= value <= MAX_LIMIT:
+        raise ValueError(f"{name} must be between 0 and {MAX_LIMIT}")
+    return value
+
+
+@logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
+@tracer.capture_lambda_handler
+@metrics.log_metrics(capture_cold_start_metric=True)
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    """GET /users/{userId}/dashboard?orders=10&feedback=10: profile, recent orders and feedback."""
+    metrics.add_metric(name="DashboardRequest", unit="Count", value=1)
+    tracer.put_metadata(key="table_name", value=USER_TABLE_NAME)
+
+    user_id = (event.get('pathParameters') or {}).get('userId')
+    if not user_id:
+        return json_response(400, {"error": "Missing required parameter: userId"})
+
+    query_params = event.get('queryStringParameters') or {}
+    try:
+        orders_limit = _limit(query_params, 'orders')
+        feedback_limit = _limit(query_params, 'feedback')
+    except ValueError as e:
+        return json_response(400, {"error": str(e)})
+
+    try:
+        dashboard, queries = single_table.load_dashboard(USER_TABLE_NAME, user_id, orders_limit, feedback_limit)
+    except ClientError as e:
+        logger.error("DynamoDB error", extra={
+            "error_code": e.response['Error']['Code'],
+            "error_message": e.response['Error']['Message']
+        })
+        metrics.add_metric(name="DatabaseError", unit="Count", value=1)
+        return json_response(500, {"error": "Database operation failed"})
+
+    metrics.add_metric(name="DashboardQueries", unit="Count", value=queries)
+    if dashboard["profile"] is None and not dashboard["orders"] and not dashboard["feedback"]:
+        return json_response(404, {"error": f"No data for user: {user_id}"})
+
+    logger.info("Dashboard retrieved", extra={
+        "userId": user_id,
+        "orders": len(dashboard["orders"]),
+        "feedback": len(dashboard["feedback"]),
+        "queries": queries
+    })
+    return json_response(200, {"userId": user_id, **dashboard}, event=event)
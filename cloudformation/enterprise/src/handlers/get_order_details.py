@@ -0,0 +1,115 @@
+import os
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.logging import correlation_paths
+from botocore.exceptions import ClientError
+
+from common import cache, instrumentation, runtime
+from common.serialization import VERSION_ATTRIBUTE, etag_matches, json_response, not_modified, request_header
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Initialize PowerTools
+logger = Logger(service="get-order-details")
+tracer = Tracer(service="get-order-details", patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics(namespace="MyApp", service="get-order-details")
+
+ORDERS_TABLE_NAME = os.environ.get('ORDERS_TABLE_NAME')
+table = runtime.table(ORDERS_TABLE_NAME) if ORDERS_TABLE_NAME else None
+
+
+@logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
+@tracer.capture_lambda_handler
+@metrics.log_metrics(capture_cold_start_metric=True)
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    function_name = context.function_name
+
+    # Log structured information
+    logger.info("Function invoked", extra={
+        "function_name": function_name,
+        "request_id": context.aws_request_id
+    })
+
+    # Add custom annotation for X-Ray
+    tracer.put_annotation(key="function_name", value=function_name)
+
+    # Add business metrics
+    metrics.add_metric(name="OrderDetailsRequest", unit="Count", value=1)
+    tracer.put_metadata(key="table_name", value=ORDERS_TABLE_NAME)
+
+    try:
+        # Get orderId from path parameters, falling back to the query string
+        path_parameters = event.get('pathParameters') or {}
+        query_params = event.get('queryStringParameters') or {}
+        order_id = path_parameters.get('orderId') or query_params.get('orderId')
+
+        # Validate orderId is provided
+        if not order_id:
+            return json_response(400, {"error": "Missing required parameter: orderId"})
+
+        # Conditional GET without a cache: read only the version, the order only if it changed
+        # (the projection saves transfer and parsing; the read costs the same capacity)
+        if cache.get_client() is None and request_header(event, 'If-None-Match'):
+            current = table.get_item(
+                Key={'orderId': order_id},
+                ProjectionExpression='#version',
+                ExpressionAttributeNames={'#version': VERSION_ATTRIBUTE}
+            ).get('Item')
+            if current is not None and etag_matches(event, current.get(VERSION_ATTRIBUTE)):
+                metrics.add_metric(name="OrderDetailsNotModified", unit="Count", value=1)
+                return not_modified(current.get(VERSION_ATTRIBUTE))
+
+        # Read through Redis; DynamoDB is only hit on a miss (404s are cached briefly too)
+        order = cache.get_or_load(
+            cache.order_key(order_id),
+            lambda: table.get_item(Key={'orderId': order_id}).get('Item'),
+            ttl=cache.ORDER_TTL_SECONDS,
+            metrics=metrics
+        )
+
+        # Check if the item exists
+        if order is None:
+            logger.warning("Order not found", extra={"orderId": order_id})
+            return json_response(404, {"error": "Order not found"})
+
+        # Check if the user has permission to access this order
+        # This would typically involve checking the authenticated user's ID
+        # against the userId in the order, but for this example we'll skip that
+
+        # Log success and add metrics
+        logger.info("Order details retrieved successfully", extra={
+            "orderId": order_id,
+            "userId": order.get('userId')
+        })
+        metrics.add_metric(name="OrderDetailsRetrieved", unit="Count", value=1)
+
+        # The cached copy is written through by every write path, so its version is current
+        version = order.get(VERSION_ATTRIBUTE, 0)
+        if etag_matches(event, version):
+            metrics.add_metric(name="OrderDetailsNotModified", unit="Count", value=1)
+            return not_modified(version)
+
+        # Prepare success response
+        response_body = {
+            "order": order
+        }
+
+    except ClientError as e:
+        # Handle DynamoDB errors
+        logger.error("DynamoDB error", extra={
+            "error_code": e.response['Error']['Code'],
+            "error_message": e.response['Error']['Message']
+        })
+        metrics.add_metric(name="DatabaseError", unit="Count", value=1)
+        return json_response(500, {"error": "Database operation failed"})
+
+    except Exception:
+        # Handle general errors
+        logger.exception("Error retrieving order details")
+        metrics.add_metric(name="ProcessingError", unit="Count", value=1)
+        return json_response(500, {"error": "Internal server error"})
+
+    return json_response(200, response_body, event=event, version=version)
@@ -0,0 +1,137 @@
+import json
+import os
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.logging import correlation_paths
+from botocore.exceptions import ClientError
+
+from common import cache, instrumentation, runtime
+from common.serialization import dumps, json_response
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Initialize PowerTools
+logger = Logger(service="get-orders")
+tracer = Tracer(service="get-orders", patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics(namespace="MyApp", service="get-orders")
+
+ORDERS_TABLE_NAME = os.environ.get('ORDERS_TABLE_NAME')
+INDEX_NAME = os.environ.get('INDEX_NAME')
+table = runtime.table(ORDERS_TABLE_NAME) if ORDERS_TABLE_NAME else None
+
+
+@logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
+@tracer.capture_lambda_handler
+@metrics.log_metrics(capture_cold_start_metric=True)
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    function_name = context.function_name
+
+    # Log structured information
+    logger.info("Function invoked", extra={
+        "function_name": function_name,
+        "request_id": context.aws_request_id
+    })
+
+    # Add custom annotation for X-Ray
+    tracer.put_annotation(key="function_name", value=function_name)
+
+    # Add business metrics
+    metrics.add_metric(name="OrdersListRequest", unit="Count", value=1)
+    tracer.put_metadata(key="table_name", value=ORDERS_TABLE_NAME)
+    tracer.put_metadata(key="index_name", value=INDEX_NAME)
+
+    try:
+        query_params = event.get('queryStringParameters') or {}
+
+        # Get userId from path parameters, falling back to the query string
+        path_parameters = event.get('pathParameters') or {}
+        user_id = path_parameters.get('userId') or query_params.get('userId')
+
+        # Validate userId is provided
+        if not user_id:
+            return json_response(400, {"error": "Missing required parameter: userId"})
+
+        # Get pagination parameters if provided
+        limit = int(query_params.get('limit', 20))  # Default to 20 items
+        last_evaluated_key = None
+
+        # If nextToken is provided, decode it for pagination
+        if 'nextToken' in query_params:
+            import base64  # only paginated requests need it
+            try:
+                last_evaluated_key_json = base64.b64decode(query_params['nextToken']).decode('utf-8')
+                last_evaluated_key = json.loads(last_evaluated_key_json)
+            except Exception as e:
+                logger.warning("Invalid nextToken", extra={"error": str(e)})
+
+        def load_page():
+            # Query parameters for DynamoDB
+            query_kwargs = {
+                'IndexName': INDEX_NAME,
+                'KeyConditionExpression': 'userId = :userId',
+                'ExpressionAttributeValues': {
+                    ':userId': user_id
+                },
+                'Limit': limit,
+                'ScanIndexForward': False  # Sort by most recent first
+            }
+
+            # Add ExclusiveStartKey for pagination if we have a last evaluated key
+            if last_evaluated_key:
+                query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+            # Query DynamoDB
+            response = table.query(**query_kwargs)
+
+            # Prepare items for response
+            items = response.get('Items', [])
+            page = {
+                "orders": items,
+                "count": len(items)
+            }
+
+            # Prepare pagination token if there are more results
+            if 'LastEvaluatedKey' in response:
+                import base64
+                last_key_json = dumps(response['LastEvaluatedKey'])
+                page["nextToken"] = base64.b64encode(last_key_json.encode('utf-8')).decode('utf-8')
+            return page
+
+        # Each page is cached as one field of the user's hash, so a status
+        # change can drop every page of that user with a single DEL
+        page_field = f"{limit}:{query_params.get('nextToken', '')}"
+        response_body = cache.get_or_load(
+            cache.user_orders_key(user_id),
+            load_page,
+            ttl=cache.ORDER_LIST_TTL_SECONDS,
+            field=page_field,
+            metrics=metrics
+        )
+
+        # Log success and add metrics
+        logger.info("Orders retrieved successfully", extra={
+            "userId": user_id,
+            "count": response_body["count"]
+        })
+        metrics.add_metric(name="OrdersRetrieved", unit="Count", value=response_body["count"])
+
+    except ClientError as e:
+        # Handle DynamoDB errors
+        logger.error("DynamoDB error", extra={
+            "error_code": e.response['Error']['Code'],
+            "error_message": e.response['Error']['Message']
+        })
+        metrics.add_metric(name="DatabaseError", unit="Count", value=1)
+        return json_response(500, {"error": "Database operation failed"})
+
+    except Exception:
+        # Handle general errors
+        logger.exception("Error retrieving orders")
+        metrics.add_metric(name="ProcessingError", unit="Count", value=1)
+        return json_response(500, {"error": "Internal server error"})
+
+    # Order pages are the large responses: compressed when the client accepts it
+    return json_response(200, response_body, event=event)
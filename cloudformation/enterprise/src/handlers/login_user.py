@@ -0,0 +1,138 @@
+import json
+import os
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.logging import correlation_paths
+from botocore.exceptions import ClientError
+
+from common import instrumentation, runtime
+from common.serialization import json_response, request_body
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Powertools initialization
+logger = Logger(service="login-user")
+tracer = Tracer(service="login-user", patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics(namespace="MyApp", service="login-user")
+
+USER_POOL_ID = os.environ.get("COGNITO_USER_POOL_ID")
+CLIENT_ID = os.environ.get("COGNITO_CLIENT_ID")
+# POST /login/refresh; a refreshToken in the body of POST /login renews the same way
+REFRESH_RESOURCE = "/login/refresh"
+
+cognito = runtime.client("cognito-idp")
+
+
+@logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
+@tracer.capture_lambda_handler
+@metrics.log_metrics(capture_cold_start_metric=True)
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    logger.info("LoginUser lambda triggered")
+
+    # Parse and validate request
+    try:
+        with instrumentation.stage("Parse"):
+            data = json.loads(request_body(event) or "{}")
+    except Exception:
+        return json_response(400, {"error": "Invalid JSON in request body"})
+
+    refresh_token = data.get("refreshToken")
+    if refresh_token or event.get("resource") == REFRESH_RESOURCE:
+        if not refresh_token:
+            return json_response(400, {"error": "Missing required field: refreshToken"})
+        return _refresh(refresh_token)
+
+    email = data.get("email")
+    password = data.get("password")
+    if not email or not password:
+        return json_response(400, {"error": "Missing required fields: email, password"})
+
+    try:
+        # Use AdminInitiateAuth for backend
+        resp = cognito.admin_initiate_auth(
+            UserPoolId=USER_POOL_ID,
+            ClientId=CLIENT_ID,
+            AuthFlow="ADMIN_USER_PASSWORD_AUTH",
+            AuthParameters={
+                "USERNAME": email,
+                "PASSWORD": password
+            }
+        )
+        logger.info("Cognito admin_initiate_auth success", extra={"username": email})
+        metrics.add_metric(name="LoginSuccess", unit="Count", value=1)
+
+        tokens = resp.get("AuthenticationResult", {})
+        return json_response(200, {
+            "message": "Login successful",
+            "idToken": tokens.get("IdToken"),
+            "accessToken": tokens.get("AccessToken"),
+            "refreshToken": tokens.get("RefreshToken"),
+            "expiresIn": tokens.get("ExpiresIn")
+        })
+
+    except cognito.exceptions.NotAuthorizedException:
+        logger.warning("Invalid login attempt", extra={"username": email})
+        metrics.add_metric(name="LoginFailed", unit="Count", value=1)
+        return json_response(401, {"error": "Invalid username or password"})
+
+    except cognito.exceptions.UserNotFoundException:
+        logger.warning("User not found", extra={"username": email})
+        metrics.add_metric(name="LoginFailed", unit="Count", value=1)
+        return json_response(401, {"error": "Invalid username or password"})
+
+    except cognito.exceptions.UserNotConfirmedException:
+        logger.info("User not confirmed", extra={"username": email})
+        return json_response(403, {"error": "User account not confirmed"})
+
+    except ClientError as e:
+        logger.exception("Cognito ClientError during login")
+        metrics.add_metric(name="LoginError", unit="Count", value=1)
+        return json_response(500, {"error": e.response["Error"]["Message"]})
+
+    except Exception:
+        logger.exception("Unknown error during login")
+        metrics.add_metric(name="LoginError", unit="Count", value=1)
+        return json_response(500, {"error": "Internal server error"})
+
+
+def _refresh(refresh_token):
+    """
+    New ID and access tokens for a refresh token (REFRESH_TOKEN_AUTH): no
+    password is sent or checked again. Cognito returns no new refresh token;
+    the client keeps using the one it has until it expires.
+    """
+    try:
+        resp = cognito.admin_initiate_auth(
+            UserPoolId=USER_POOL_ID,
+            ClientId=CLIENT_ID,
+            AuthFlow="REFRESH_TOKEN_AUTH",
+            AuthParameters={"REFRESH_TOKEN": refresh_token}
+        )
+        metrics.add_metric(name="TokenRefreshSuccess", unit="Count", value=1)
+
+        tokens = resp.get("AuthenticationResult", {})
+        return json_response(200, {
+            "message": "Token refreshed",
+            "idToken": tokens.get("IdToken"),
+            "accessToken": tokens.get("AccessToken"),
+            "expiresIn": tokens.get("ExpiresIn")
+        })
+
+    except cognito.exceptions.NotAuthorizedException:
+        # Expired, revoked, or issued to another client
+        logger.warning("Refresh token rejected")
+        metrics.add_metric(name="TokenRefreshFailed", unit="Count", value=1)
+        return json_response(401, {"error": "Invalid or expired refresh token"})
+
+    except ClientError as e:
+        logger.exception("Cognito ClientError during token refresh")
+        metrics.add_metric(name="LoginError", unit="Count", value=1)
+        return json_response(500, {"error": e.response["Error"]["Message"]})
+
+    except Exception:
+        logger.exception("Unknown error during token refresh")
+        metrics.add_metric(name="LoginError", unit="Count", value=1)
+        return json_response(500, {"error": "Internal server error"})
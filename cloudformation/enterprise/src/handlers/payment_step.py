@@ -0,0 +1,330 @@
+import datetime
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from common import cache, instrumentation, runtime, single_table
+from common.serialization import VERSION_ATTRIBUTE, to_plain
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Initialize PowerTools
+logger = Logger()
+tracer = Tracer(patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics()
+
+# Explicitly set log level from environment variable
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+
+ORDERS_TABLE_NAME = os.environ.get('ORDERS_TABLE_NAME')
+# Orders settled in parallel by one batch invocation (the low-level client is thread safe)
+BATCH_CONCURRENCY = int(os.environ.get('PAYMENT_BATCH_CONCURRENCY', 8))
+
+# Every write checks that the order exists and is not paid yet, in the same request
+_UNPAID = "attribute_exists(orderId) AND #st <> :paid"
+
+_deserializer = TypeDeserializer()
+
+
+class OrderNotFound(Exception):
+    """No such order. Step Functions sees the class name as the error name."""
+
+
+class OrderAlreadyPaid(Exception):
+    """The order was paid before this step ran."""
+
+
+def _now():
+    return str(int(datetime.datetime.now().timestamp()))
+
+
+def _update_order(table_name, order_id, update_expression, values, condition=_UNPAID):
+    """
+    Apply one conditional update_item and return the order as written (ALL_NEW).
+    The condition replaces the separate get_item: on failure DynamoDB hands back
+    the current item, which tells a missing order from one that is already paid.
+    """
+    client = runtime.client('dynamodb')
+    try:
+        response = client.update_item(
+            TableName=table_name,
+            Key={'orderId': {'S': order_id}},
+            # Every write bumps the version the order's ETag is derived from
+            UpdateExpression=update_expression + " ADD #version :one",
+            ConditionExpression=condition,
+            ExpressionAttributeNames={'#st': 'status', '#version': VERSION_ATTRIBUTE},
+            ExpressionAttributeValues={
+                ':paid': {'S': 'PAID'},
+                ':one': {'N': '1'},
+                **{name: {'S': value} for name, value in values.items()}
+            },
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD"
+        )
+    except client.exceptions.ConditionalCheckFailedException as e:
+        if 'Item' not in e.response:
+            raise OrderNotFound(f"Order not found: {order_id}") from None
+        raise OrderAlreadyPaid(f"Order already paid: {order_id}") from None
+    return {k: _deserializer.deserialize(v) for k, v in response['Attributes'].items()}
+
+
+def _new_payment_id():
+    # Simulated gateway reference; a real implementation would call the payment provider
+    return f"pmt_{datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+
+
+def complete_payment(table_name, order_id, payment_id):
+    """Mark the order paid. Re-running it with the same payment id (a retry) is a no-op."""
+    return _update_order(
+        table_name, order_id,
+        "SET paymentStatus = :status, paymentId = :pid, updatedAt = :time, #st = :paid",
+        {':status': 'COMPLETED', ':pid': payment_id, ':time': _now()},
+        condition="attribute_exists(orderId) AND (#st <> :paid OR paymentId = :pid)"
+    )
+
+
+def validate_payment(table_name, payload):
+    order = _update_order(
+        table_name, payload['orderId'],
+        "SET paymentStatus = :status, updatedAt = :time",
+        {':status': 'PROCESSING', ':time': _now()}
+    )
+    return order, {'paymentStatus': 'PROCESSING', 'orderTotal': order.get('orderTotal', 0)}
+
+
+def process_externally(table_name, payload):
+    # Talks to the payment provider only; the order is written once, by UpdateOrderStatus
+    return None, {'paymentId': payload.get('paymentId') or _new_payment_id(), 'paymentStatus': 'AUTHORIZED'}
+
+
+def update_order_status(table_name, payload):
+    payment_id = payload.get('paymentId') or _new_payment_id()
+    order = complete_payment(table_name, payload['orderId'], payment_id)
+    return order, {'paymentId': payment_id, 'paymentStatus': 'COMPLETED', 'orderStatus': 'PAID',
+                   'timestamp': order['updatedAt']}
+
+
+def payment_failed(table_name, payload):
+    try:
+        order = _update_order(
+            table_name, payload['orderId'],
+            "SET paymentStatus = :status, updatedAt = :time",
+            {':status': 'FAILED', ':time': _now()}
+        )
+    except OrderNotFound as e:
+        # Nothing to mark: report it and end the execution normally
+        logger.warning("Payment failure not recorded", extra={"orderId": payload['orderId'], "reason": str(e)})
+        return None, {'paymentStatus': 'FAILED'}
+    except OrderAlreadyPaid:
+        # A paid order is never flagged as failed
+        return None, {'paymentStatus': 'COMPLETED', 'orderStatus': 'PAID'}
+    return order, {'paymentStatus': 'FAILED'}
+
+
+# State name (from $$.State.Name in the state machine) -> step; each one does only its own work
+STEPS = {
+    "ValidatePayment": validate_payment,
+    "ProcessExternally": process_externally,
+    "UpdateOrderStatus": update_order_status,
+    "PaymentFailedNotification": payment_failed,
+}
+
+
+def settle(table_name, order_id):
+    """Whole payment in one write, for direct and batch invocations. Returns (order, error)."""
+    try:
+        return complete_payment(table_name, order_id, _new_payment_id()), None
+    except OrderAlreadyPaid:
+        return None, "already_paid"
+    except OrderNotFound:
+        return None, "not_found"
+    except ClientError as e:
+        logger.error("DynamoDB error", extra={
+            "error_code": e.response['Error']['Code'],
+            "error_message": e.response['Error']['Message'],
+            "orderId": order_id
+        })
+        return None, "error"
+
+
+def settle_many(table_name, order_ids):
+    """Settle several orders concurrently. Returns {orderId: (order, error)}."""
+    if not order_ids:
+        return {}
+    def settle_and_sync(order_id):
+        order, error = settle(table_name, order_id)
+        # The user table copy is written from the worker too (the client is thread safe)
+        return (order, error), order is None or single_table.sync_order(order)
+
+    with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(order_ids))) as executor:
+        outcomes = list(executor.map(settle_and_sync, order_ids))
+    results = {order_id: result for order_id, (result, _) in zip(order_ids, outcomes)}
+
+    # Cache writes and metrics stay on the handler thread
+    settled = [order for order, error in results.values() if order]
+    for order in settled:
+        cache.put_order(order, metrics=metrics)
+    metrics.add_metric(name="PaymentProcessed", unit="Count", value=len(settled))
+    metrics.add_metric(name="PaymentAmount", unit="None",
+                       value=float(sum(order.get('orderTotal', 0) for order in settled)))
+    failed = sum(1 for _, error in results.values() if error == "error")
+    if failed:
+        metrics.add_metric(name="DatabaseError", unit="Count", value=failed)
+    unsynced = sum(1 for _, synced in outcomes if not synced)
+    if unsynced:
+        metrics.add_metric(name="UserTableSyncError", unit="Count", value=unsynced)
+    return results
+
+
+def _order_id(message):
+    """The message's orderId when it is a non-empty string, else None."""
+    order_id = message.get('orderId') if isinstance(message, dict) else None
+    return order_id if isinstance(order_id, str) and order_id else None
+
+
+def _handle_sqs(table_name, records):
+    # Messages: {"orderId": "..."}. Only retryable failures go back to the queue
+    # (partial batch response); unknown and already paid orders are done with.
+    # Several messages may carry the same order: it is settled once, and all of
+    # them are retried when that fails.
+    message_ids, failures = {}, []
+    for record in records:
+        try:
+            order_id = _order_id(json.loads(record['body']))
+        except (ValueError, KeyError, TypeError):
+            order_id = None
+        if order_id is None:
+            logger.error("Malformed payment message", extra={"messageId": record.get('messageId')})
+            failures.append({"itemIdentifier": record.get('messageId')})
+            continue
+        message_ids.setdefault(order_id, []).append(record['messageId'])
+    results = settle_many(table_name, list(message_ids))
+    failures += [{"itemIdentifier": message_id}
+                 for order_id, (_, error) in results.items() if error == "error"
+                 for message_id in message_ids[order_id]]
+    return {"batchItemFailures": failures}
+
+
+def _handle_items(table_name, items):
+    # Map state with an ItemBatcher: {"Items": [{"orderId": "..."}, ...]}.
+    # An item without a usable orderId is reported on its own; the rest are settled
+    order_ids = [_order_id(item) for item in items]
+    results = settle_many(table_name, list(dict.fromkeys(order_id for order_id in order_ids if order_id)))
+    report = [
+        {'orderId': order_id, 'paymentStatus': 'COMPLETED' if order else 'FAILED', **({'error': error} if error else {})}
+        for order_id, (order, error) in results.items()
+    ]
+    report += [{'orderId': item.get('orderId') if isinstance(item, dict) else None,
+                'paymentStatus': 'FAILED', 'error': 'invalid_item'}
+               for item, order_id in zip(items, order_ids) if order_id is None]
+    if len(report) > len(results):
+        logger.error("Malformed payment items", extra={"count": len(report) - len(results)})
+    settled = sum(1 for order, _ in results.values() if order)
+    return {'statusCode': 200, 'settled': settled, 'failed': len(report) - settled, 'results': report}
+
+
+def _run_step(table_name, step, payload):
+    """
+    One state of PaymentProcessingStateMachine. Errors are raised so the state's
+    Retry/Catch rules see them (OrderNotFound, OrderAlreadyPaid, ClientError).
+    The output is the state input plus what the step added, for the next state.
+    """
+    if step not in STEPS:
+        raise ValueError(f"Unknown payment step: {step}")
+    if not payload.get('orderId'):
+        raise ValueError("Missing orderId in state input")
+
+    order, changes = STEPS[step](table_name, payload)
+    if order is not None:
+        # The order changed: refresh its cache entry, the owner's list pages and its user table copy
+        cache.put_order(order, metrics=metrics)
+        if not single_table.sync_order(order):
+            metrics.add_metric(name="UserTableSyncError", unit="Count", value=1)
+    if step == "UpdateOrderStatus":
+        metrics.add_metric(name="PaymentProcessed", unit="Count", value=1)
+        metrics.add_metric(name="PaymentAmount", unit="None", value=float(order.get('orderTotal', 0)))
+
+    logger.info("Payment step completed", extra={"step": step, "orderId": payload['orderId'], **changes})
+    # Step Functions needs plain JSON types: convert any Decimals in one pass
+    return to_plain({**payload, 'statusCode': 200, **changes})
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+@metrics.log_metrics(capture_cold_start_metric=True)
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    function_name = context.function_name
+
+    # Log structured information
+    logger.info("Function invoked", extra={
+        "function_name": function_name,
+        "request_id": context.aws_request_id
+    })
+
+    # Add custom annotation for X-Ray
+    tracer.put_annotation(key="function_name", value=function_name)
+
+    # Get the DynamoDB table name from environment variables or event
+    table_name = ORDERS_TABLE_NAME or event.get('ordersTable')
+    tracer.put_metadata(key="table_name", value=table_name)
+
+    # Batch entry points settle many orders per invocation
+    if 'Records' in event:
+        return _handle_sqs(table_name, event['Records'])
+    if 'Items' in event:
+        return _handle_items(table_name, event['Items'])
+
+    # Add business metrics
+    metrics.add_metric(name="PaymentProcessingAttempt", unit="Count", value=1)
+
+    step = event.get('step')
+    if step:
+        return _run_step(table_name, step, event.get('input') or {})
+
+    # Get the order ID from the event
+    order_id = event.get('orderId')
+    if not order_id:
+        error_msg = "Missing orderId in event"
+        logger.error(error_msg)
+        return {
+            'statusCode': 400,
+            'error': error_msg,
+            'paymentStatus': 'FAILED'
+        }
+
+    # Direct invocation: validate and pay in a single conditional write
+    results = settle_many(table_name, [order_id])
+    order, error = results[order_id]
+    if error:
+        status_code, message = {
+            "not_found": (404, f"Order not found: {order_id}"),
+            "already_paid": (409, f"Order already paid: {order_id}"),
+        }.get(error, (500, "Database operation failed"))
+        logger.warning(message)
+        return {
+            'statusCode': status_code,
+            'error': message,
+            'paymentStatus': 'FAILED'
+        }
+
+    logger.info("Payment processed successfully", extra={
+        "orderId": order_id,
+        "paymentId": order['paymentId'],
+        "paymentStatus": order['paymentStatus']
+    })
+    return {
+        'statusCode': 200,
+        'orderId': order_id,
+        'paymentId': order['paymentId'],
+        'paymentStatus': order['paymentStatus'],
+        'orderStatus': order['status'],
+        'timestamp': order['updatedAt']
+    }
+
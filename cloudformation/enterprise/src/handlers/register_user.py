@@ -0,0 +1,138 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.logging import correlation_paths
+from botocore.exceptions import ClientError
+
+from common import instrumentation, runtime, single_table
+from common.serialization import json_response, request_body
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Powertools initialization
+logger = Logger(service="register-user")
+tracer = Tracer(service="register-user", patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics(namespace="MyApp", service="register-user")
+
+USER_POOL_ID = os.environ.get("COGNITO_USER_POOL_ID")
+CLIENT_ID = os.environ.get("COGNITO_CLIENT_ID")
+CUSTOMERS_TABLE_NAME = os.environ.get("CUSTOMERS_TABLE_NAME")
+
+cognito = runtime.client("cognito-idp")
+table = runtime.table(CUSTOMERS_TABLE_NAME) if CUSTOMERS_TABLE_NAME else None
+# Confirms the new user while the handler thread writes the Customers item (the client is thread safe)
+_confirmations = ThreadPoolExecutor(max_workers=1)
+
+
+@logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
+@tracer.capture_lambda_handler
+@metrics.log_metrics(capture_cold_start_metric=True)
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    logger.info("RegisterUser lambda triggered")
+
+    # Parse and validate request
+    try:
+        with instrumentation.stage("Parse"):
+            data = json.loads(request_body(event) or "{}")
+    except Exception:
+        return json_response(400, {"error": "Invalid JSON in request body"})
+
+    required = ["email", "password", "firstName", "lastName"]
+    missing = [f for f in required if not data.get(f)]
+    if missing:
+        return json_response(400, {"error": f"Missing required fields: {', '.join(missing)}"})
+
+    email = data["email"]
+    password = data["password"]
+    first_name = data["firstName"]
+    last_name = data["lastName"]
+    phone = data.get("phoneNumber")
+
+    # Call Cognito sign_up
+    try:
+        cognito_kwargs = {
+            "ClientId": CLIENT_ID,
+            "Username": email,
+            "Password": password,
+            "UserAttributes": [
+                {"Name": "email", "Value": email},
+                {"Name": "name", "Value": first_name},
+                {"Name": "family_name", "Value": last_name},
+            ]
+        }
+        if phone:
+            cognito_kwargs["UserAttributes"].append({"Name": "phone_number", "Value": phone})
+        logger.info("Calling Cognito sign_up", extra={"username": email})
+        resp = cognito.sign_up(**cognito_kwargs)
+        user_sub = resp["UserSub"]
+        logger.info("Cognito sign_up success", extra={"userSub": user_sub})
+
+    except cognito.exceptions.UsernameExistsException:
+        logger.warning("User already exists", extra={"username": email})
+        metrics.add_metric(name="RegistrationConflict", unit="Count", value=1)
+        return json_response(409, {"error": "User already exists"})
+
+    except ClientError as e:
+        logger.exception("Cognito ClientError during registration")
+        metrics.add_metric(name="RegistrationFailed", unit="Count", value=1)
+        return json_response(500, {"error": e.response["Error"]["Message"]})
+
+    except Exception:
+        logger.exception("Unknown error during Cognito registration")
+        metrics.add_metric(name="RegistrationFailed", unit="Count", value=1)
+        return json_response(500, {"error": "Internal server error"})
+
+    # The confirmation and the Customers write only need the userSub: they run at the same time
+    logger.info(f"Attempting to auto-confirm user {email}")
+    confirmation = _confirmations.submit(cognito.admin_confirm_sign_up, UserPoolId=USER_POOL_ID, Username=email)
+    stored = _store_customer(user_sub, email, first_name, last_name, phone) if table else True
+    try:
+        confirmation.result()
+        logger.info(f"Auto-confirmation successful for user {email}")
+    except Exception as e:
+        logger.error(f"Failed to auto-confirm user {email} via admin_confirm_sign_up.",
+                     extra={"error": str(e), "username": email})
+    metrics.add_metric(name="SuccessfulRegistration", unit="Count", value=1)
+
+    if not stored:
+        # Still return 201 because Cognito registration succeeded
+        return json_response(201, {
+            "message": "User registered successfully (but not stored in Customers table)",
+            "userSub": user_sub,
+            "warning": "DynamoDB operation failed"
+        })
+
+    # Return success response
+    return json_response(201, {
+        "message": "User registered successfully",
+        "userSub": user_sub
+    })
+
+
+def _store_customer(user_sub, email, first_name, last_name, phone):
+    """Write the Customers item (and its user table copy). Returns False when it failed."""
+    try:
+        now = Decimal(int(time.time()))
+        item = {
+            "userId": user_sub,
+            "email": email,
+            "firstName": first_name,
+            "lastName": last_name,
+            "createdAt": now,
+            "updatedAt": now
+        }
+        if phone:
+            item["phoneNumber"] = phone
+        single_table.put(table, item, single_table.profile_item(item))
+        logger.info("User record inserted in DynamoDB", extra={"userId": user_sub})
+        return True
+    except Exception:
+        logger.exception("Failed to insert user in DynamoDB")
+        return False
@@ -0,0 +1,113 @@
+import json
+import os
+import time
+import uuid
+from decimal import Decimal
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.logging import correlation_paths
+from botocore.exceptions import ClientError
+
+from common import feedback, instrumentation, runtime, single_table
+from common.serialization import json_response, request_body
+
+if TYPE_CHECKING:  # annotations only, not needed at runtime
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Initialize PowerTools - service name will be picked from POWERTOOLS_SERVICE_NAME env var
+logger = Logger()
+tracer = Tracer(patch_modules=runtime.TRACER_PATCH_MODULES)
+metrics = Metrics()
+
+TABLE_NAME = os.environ.get('TABLE_NAME')
+table = runtime.table(TABLE_NAME) if TABLE_NAME else None
+
+
+@logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
+@tracer.capture_lambda_handler
+@metrics.log_metrics(capture_cold_start_metric=True)
+@instrumentation.instrument(logger, metrics)
+def lambda_handler(event, context: "LambdaContext"):
+    try:
+        if table is None:
+            logger.error("TABLE_NAME environment variable not set.")
+            # This internal config error should ideally not happen if CFN is correct
+            return json_response(500, {"error": "Server configuration error."})
+
+        body = request_body(event)
+        if not body:
+            logger.warning("Request body is missing for feedback submission.")
+            return json_response(400, {"error": "Missing request body"})
+
+        with instrumentation.stage("Parse"):
+            data = json.loads(body)
+        logger.info("Received feedback submission request", extra={"payload_keys": list(data.keys())})
+
+        user_id = data.get("userId")
+        rating = data.get("rating")
+        comment = data.get("comment")
+
+        if not all([user_id, rating is not None, comment]):
+            missing_fields = []
+            if not user_id: missing_fields.append("userId")
+            if rating is None: missing_fields.append("rating")
+            if not comment: missing_fields.append("comment")
+            logger.warning("Missing required fields in feedback", extra={"missing_fields": missing_fields})
+            return json_response(400, {"error": f"Missing required fields: {', '.join(missing_fields)}"})
+
+        try:
+            rating_val = int(rating)
+        except ValueError:
+            logger.warning("Invalid rating format, not an integer.", extra={"rating_received": rating})
+            return json_response(400, {"error": "Rating must be an integer."})
+
+        feedback_id = str(uuid.uuid4())
+        timestamp_now = int(time.time())
+
+        feedback_item = {
+            'feedbackId': feedback_id,
+            'userId': user_id,
+            'rating': rating_val,
+            'comment': comment,
+            'createdAt': Decimal(timestamp_now)
+        }
+
+        if "orderId" in data:
+            feedback_item['orderId'] = data['orderId']
+        if "category" in data:
+            feedback_item['category'] = data['category']
+
+        if feedback.ASYNC:
+            # FeedbackWriter writes it in batches (common/feedback.py)
+            feedback.enqueue(feedback_item)
+            logger.info("Feedback queued", extra={"feedbackId": feedback_id, "userId": user_id})
+            metrics.add_metric(name="FeedbackQueued", unit="Count", value=1)
+            metrics.add_metric(name="FeedbackRating", unit="None", value=rating_val)
+            return json_response(202, {"message": "Feedback accepted", "feedbackId": feedback_id})
+
+        single_table.put(table, feedback_item, single_table.feedback_item(feedback_item))
+        logger.info("Feedback submitted successfully to DynamoDB", extra={"feedbackId": feedback_id, "userId": user_id})
+        metrics.add_metric(name="FeedbackSubmitted", unit="Count", value=1)
+        metrics.add_metric(name="FeedbackRating", unit="None", value=rating_val)
+        if feedback.apply_ratings([feedback_item]):
+            metrics.add_metric(name="FeedbackRatingsError", unit="Count", value=1)
+
+        response_body = {
+            "message": "Feedback submitted successfully",
+            "feedbackId": feedback_id
+        }
+        return json_response(201, response_body)
+
+    except ClientError:
+        logger.exception("AWS error during feedback submission")
+        metrics.add_metric(name="FeedbackSubmissionErrorDB", unit="Count", value=1)
+        return json_response(500, {"error": "Could not submit feedback due to a database issue."})
+    except json.JSONDecodeError:
+        logger.warning("Invalid JSON in request body for feedback submission.")
+        metrics.add_metric(name="FeedbackSubmissionErrorFormat", unit="Count", value=1)
+        return json_response(400, {"error": "Invalid JSON format in request body."})
+    except Exception:
+        logger.exception("Unexpected error processing feedback submission")
+        metrics.add_metric(name="FeedbackSubmissionErrorUnexpected", unit="Count", value=1)
+        return json_response(500, {"error": "An unexpected error occurred."})
@@ -0,0 +1,136 @@
+import json
+from decimal import Decimal
+
+import fakeredis
+import pytest
+
+from common import cache
+
+
+@pytest.fixture
+def redis_client():
+    client = fakeredis.FakeRedis()
+    cache.set_client(client)
+    yield client
+    cache.set_client(None)
+
+
+class Loader:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def _event(order_id, headers=None):
+    return {"httpMethod": "GET", "path": f"/orders/{order_id}", "resource": "/orders/{orderId}",
+            "pathParameters": {"orderId": order_id}, "headers": headers or {},
+            "requestContext": {"requestId": "test", "stage": "prod"}}
+
+
+def test_miss_loads_once_then_hits(redis_client, metrics):
+    loader = Loader({"orderId": "o-1", "orderTotal": Decimal("12.50")})
+
+    first = cache.get_or_load("order:o-1", loader, metrics=metrics)
+    second = cache.get_or_load("order:o-1", loader, metrics=metrics)
+
+    assert first == second == {"orderId": "o-1", "orderTotal": Decimal("12.50")}
+    assert loader.calls == 1
+    assert metrics.counts == {"CacheMiss": 1, "CacheHit": 1}
+    assert 0 < redis_client.ttl("order:o-1") <= cache.ORDER_TTL_SECONDS
+
+
+def test_missing_item_is_cached_for_the_negative_ttl(redis_client):
+    loader = Loader(None)
+
+    assert cache.get_or_load("order:gone", loader) is None
+    assert cache.get_or_load("order:gone", loader) is None
+
+    assert loader.calls == 1
+    assert 0 < redis_client.ttl("order:gone") <= cache.NEGATIVE_TTL_SECONDS
+
+
+def test_negative_caching_can_be_turned_off(redis_client):
+    loader = Loader(None)
+
+    cache.get_or_load("order:gone", loader, negative_ttl=0)
+    cache.get_or_load("order:gone", loader, negative_ttl=0)
+
+    assert loader.calls == 2
+    assert not redis_client.exists("order:gone")
+
+
+def test_list_pages_are_fields_of_one_hash(redis_client):
+    key = cache.user_orders_key("u-1")
+    cache.get_or_load(key, Loader({"orders": [1]}), field="page:1")
+    cache.get_or_load(key, Loader({"orders": [2]}), field="page:2")
+
+    assert sorted(redis_client.hkeys(key)) == [b"page:1", b"page:2"]
+    assert cache.get_or_load(key, Loader(None), field="page:2") == {"orders": [2]}
+
+
+def test_put_order_refreshes_the_entry_and_drops_the_list_pages(redis_client):
+    cache.get_or_load(cache.order_key("o-1"), Loader({"orderId": "o-1", "status": "PENDING"}))
+    cache.get_or_load(cache.user_orders_key("u-1"), Loader({"orders": []}), field="page:1")
+
+    cache.put_order({"orderId": "o-1", "userId": "u-1", "status": "PAID"})
+
+    assert json.loads(redis_client.get(cache.order_key("o-1")))["status"] == "PAID"
+    assert not redis_client.exists(cache.user_orders_key("u-1"))
+
+
+def test_invalidate_order_drops_entry_and_list_pages(redis_client):
+    cache.get_or_load(cache.order_key("o-1"), Loader(None))
+    cache.get_or_load(cache.user_orders_key("u-1"), Loader({"orders": []}), field="page:1")
+
+    cache.invalidate_order("o-1", "u-1")
+
+    assert not redis_client.exists(cache.order_key("o-1"), cache.user_orders_key("u-1"))
+
+
+def test_redis_errors_fall_back_to_the_loader(metrics):
+    server = fakeredis.FakeServer()
+    server.connected = False
+    cache.set_client(fakeredis.FakeRedis(server=server))
+    try:
+        loader = Loader({"orderId": "o-1"})
+        assert cache.get_or_load("order:o-1", loader, metrics=metrics) == {"orderId": "o-1"}
+        cache.put_order({"orderId": "o-1", "userId": "u-1"}, metrics=metrics)
+    finally:
+        cache.set_client(None)
+    assert loader.calls == 1
+    assert metrics.counts == {"CacheError": 2}
+
+
+def test_without_a_cache_every_read_loads():
+    loader = Loader({"orderId": "o-1"})
+    cache.get_or_load("order:o-1", loader)
+    cache.get_or_load("order:o-1", loader)
+    assert loader.calls == 2
+
+
+def test_order_details_read_through(redis_client, orders_table, context):
+    from handlers import get_order_details
+
+    orders_table.put_item(Item={"orderId": "o-1", "userId": "u-1", "status": "PENDING", "version": 1})
+    assert get_order_details.lambda_handler(_event("o-1"), context)["statusCode"] == 200
+
+    # Served from the cache: DynamoDB no longer has it
+    orders_table.delete_item(Key={"orderId": "o-1"})
+    response = get_order_details.lambda_handler(_event("o-1"), context)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["order"]["status"] == "PENDING"
+
+
+def test_order_details_not_found_is_cached_until_invalidated(redis_client, orders_table, context):
+    from handlers import get_order_details
+
+    assert get_order_details.lambda_handler(_event("o-2"), context)["statusCode"] == 404
+    orders_table.put_item(Item={"orderId": "o-2", "userId": "u-1", "status": "PENDING", "version": 1})
+    assert get_order_details.lambda_handler(_event("o-2"), context)["statusCode"] == 404
+
+    cache.invalidate_order("o-2", "u-1")
+    assert get_order_details.lambda_handler(_event("o-2"), context)["statusCode"] == 200
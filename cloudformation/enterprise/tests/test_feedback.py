@@ -0,0 +1,106 @@
+import json
+from decimal import Decimal
+
+import boto3
+import pytest
+
+from common import feedback
+from conftest import FEEDBACK_TABLE
+
+
+@pytest.fixture
+def queue():
+    queue = feedback.LocalQueue()
+    feedback.set_queue(queue)
+    yield queue
+    feedback.set_queue(None)
+
+
+def _item(feedback_id, rating, user_id="u-1", order_id="o-1"):
+    return {"feedbackId": feedback_id, "userId": user_id, "orderId": order_id,
+            "rating": rating, "comment": "fine", "createdAt": Decimal(1714521600)}
+
+
+def _ratings(ratings_table):
+    return {item["ratingKey"]: (item["ratingCount"], item["ratingSum"])
+            for item in ratings_table.scan()["Items"]}
+
+
+def test_writer_stores_the_batch_and_the_rating_aggregates(feedback_tables, queue, context):
+    from handlers import feedback_writer
+
+    feedback_table, ratings_table = feedback_tables
+    for index in range(30):
+        feedback.enqueue(_item(f"f-{index}", 1 + index % 5, order_id=f"o-{index % 2}"))
+
+    response = feedback_writer.lambda_handler({"Records": queue.records()}, context)
+
+    assert response == {"batchItemFailures": []}
+    assert feedback_table.scan(Select="COUNT")["Count"] == 30
+    assert _ratings(ratings_table) == {"USER#u-1": (30, 90), "ORDER#o-0": (15, 45), "ORDER#o-1": (15, 45)}
+
+
+def test_message_delivered_twice_in_a_batch_is_written_once(feedback_tables, queue, context):
+    from handlers import feedback_writer
+
+    feedback_table, ratings_table = feedback_tables
+    feedback.enqueue(_item("f-1", 4))
+    feedback.enqueue(_item("f-1", 4))
+
+    response = feedback_writer.lambda_handler({"Records": queue.records()}, context)
+
+    assert response == {"batchItemFailures": []}
+    assert feedback_table.scan(Select="COUNT")["Count"] == 1
+    assert _ratings(ratings_table) == {"USER#u-1": (1, 4), "ORDER#o-1": (1, 4)}
+
+
+def test_only_malformed_messages_are_retried(feedback_tables, queue, context):
+    from handlers import feedback_writer
+
+    feedback.enqueue(_item("f-1", 5))
+    queue.send(json.dumps({"feedbackId": "f-2", "rating": 3}))
+    queue.send("not json")
+    records = queue.records()
+
+    response = feedback_writer.lambda_handler({"Records": records}, context)
+
+    assert [failure["itemIdentifier"] for failure in response["batchItemFailures"]] == \
+        [records[1]["messageId"], records[2]["messageId"]]
+    assert feedback_tables[0].get_item(Key={"feedbackId": "f-1"})["Item"]["rating"] == 5
+
+
+def test_unwritten_items_fail_every_message_carrying_them(feedback_tables, queue, context):
+    from handlers import feedback_writer
+
+    feedback.enqueue(_item("f-1", 5))
+    feedback.enqueue(_item("f-1", 5))
+    feedback.enqueue(_item("f-2", 3))
+    records = queue.records()
+    boto3.client("dynamodb").delete_table(TableName=FEEDBACK_TABLE)
+
+    response = feedback_writer.lambda_handler({"Records": records}, context)
+
+    assert sorted(failure["itemIdentifier"] for failure in response["batchItemFailures"]) == \
+        sorted(record["messageId"] for record in records)
+    # Nothing was written, so nothing was counted
+    assert _ratings(feedback_tables[1]) == {}
+
+
+def test_async_submission_round_trip(feedback_tables, queue, context, monkeypatch):
+    from handlers import feedback_writer, submit_feedback
+
+    monkeypatch.setattr(feedback, "ASYNC", True)
+    response = submit_feedback.lambda_handler({
+        "httpMethod": "POST", "path": "/feedback", "headers": {},
+        "body": json.dumps({"userId": "u-1", "orderId": "o-1", "rating": 4, "comment": "fine"}),
+        "requestContext": {"requestId": "test", "stage": "prod"},
+    }, context)
+
+    assert response["statusCode"] == 202
+    feedback_id = json.loads(response["body"])["feedbackId"]
+    assert feedback_tables[0].get_item(Key={"feedbackId": feedback_id}).get("Item") is None
+
+    feedback_writer.lambda_handler({"Records": queue.records()}, context)
+
+    assert feedback_tables[0].get_item(Key={"feedbackId": feedback_id})["Item"]["comment"] == "fine"
+    assert _ratings(feedback_tables[1]) == {"USER#u-1": (1, 4), "ORDER#o-1": (1, 4)}
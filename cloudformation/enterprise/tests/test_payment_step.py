@@ -0,0 +1,64 @@
+import json
+
+import boto3
+
+from conftest import ORDERS_TABLE
+
+
+def _order(orders_table, order_id, status="PENDING"):
+    orders_table.put_item(Item={"orderId": order_id, "userId": "u-1", "status": status,
+                                "orderTotal": 10, "version": 1})
+
+
+def _message(message_id, body):
+    return {"messageId": message_id, "eventSource": "aws:sqs",
+            "body": body if isinstance(body, str) else json.dumps(body)}
+
+
+def test_sqs_batch_returns_only_retryable_failures(orders_table, context):
+    from handlers import payment_step
+
+    _order(orders_table, "o-1")
+    _order(orders_table, "o-paid", status="PAID")
+    response = payment_step.lambda_handler({"Records": [
+        _message("m-1", {"orderId": "o-1"}),
+        _message("m-2", {"orderId": "o-paid"}),
+        _message("m-3", {"orderId": "o-unknown"}),
+        _message("m-4", "not json"),
+        _message("m-5", {"orderId": 42}),
+    ]}, context)
+
+    # Unknown and paid orders are done with; malformed messages go back to the queue
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m-4"}, {"itemIdentifier": "m-5"}]}
+    assert orders_table.get_item(Key={"orderId": "o-1"})["Item"]["status"] == "PAID"
+    assert "o-unknown" not in {item["orderId"] for item in orders_table.scan()["Items"]}
+
+
+def test_sqs_failed_order_retries_every_message_carrying_it(orders_table, context):
+    from handlers import payment_step
+
+    _order(orders_table, "o-1")
+    # Every write fails with a DynamoDB error, which is retryable
+    boto3.client("dynamodb").delete_table(TableName=ORDERS_TABLE)
+    response = payment_step.lambda_handler({"Records": [
+        _message("m-1", {"orderId": "o-1"}),
+        _message("m-2", {"orderId": "o-1"}),
+    ]}, context)
+
+    assert sorted(failure["itemIdentifier"] for failure in response["batchItemFailures"]) == ["m-1", "m-2"]
+
+
+def test_map_batch_reports_malformed_items_individually(orders_table, context):
+    from handlers import payment_step
+
+    _order(orders_table, "o-1")
+    response = payment_step.lambda_handler({"Items": [
+        {"orderId": "o-1"}, {"orderId": "o-1"}, {}, {"orderId": "o-unknown"},
+    ]}, context)
+
+    assert response["settled"] == 1 and response["failed"] == 2
+    assert response["results"] == [
+        {"orderId": "o-1", "paymentStatus": "COMPLETED"},
+        {"orderId": "o-unknown", "paymentStatus": "FAILED", "error": "not_found"},
+        {"orderId": None, "paymentStatus": "FAILED", "error": "invalid_item"},
+    ]
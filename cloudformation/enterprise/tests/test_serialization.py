@@ -0,0 +1,23 @@
+import json
+from decimal import Decimal
+
+from common import serialization
+
+
+def test_decimals_are_written_with_their_own_digits():
+    body = {"total": Decimal("12345678901234567.5"), "price": Decimal("368.50"),
+            "quantity": Decimal(3), "createdAt": Decimal(1714521600), "tags": {"a"}}
+
+    text = serialization.dumps(body)
+
+    assert text == ('{"total":12345678901234567.5,"price":368.50,"quantity":3,'
+                    '"createdAt":1714521600,"tags":["a"]}')
+    assert json.loads(text, parse_float=Decimal)["total"] == body["total"]
+
+
+def test_to_plain_gives_ints_and_floats():
+    plain = serialization.to_plain({"items": [{"price": Decimal("2.5"), "quantity": Decimal(2)}],
+                                    "id": Decimal(2 ** 60)})
+
+    assert plain == {"items": [{"price": 2.5, "quantity": 2}], "id": 2 ** 60}
+    assert type(plain["items"][0]["quantity"]) is int
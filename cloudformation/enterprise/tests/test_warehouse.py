@@ -0,0 +1,116 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+from common import warehouse
+
+_serializer = TypeSerializer()
+
+DAY = 1714521600  # 2024-05-01T00:00:00Z
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    warehouse.set_connection(connection, placeholder="?")
+    yield connection
+    warehouse.set_connection(None)
+    connection.close()
+
+
+def _record(event_name, keys, image=None):
+    record = {"eventName": event_name,
+              "dynamodb": {"Keys": {name: _serializer.serialize(value) for name, value in keys.items()}}}
+    if image is not None:
+        record["dynamodb"]["NewImage"] = {name: _serializer.serialize(value) for name, value in image.items()}
+    return record
+
+
+def _order(order_id, status, created_at=DAY, total="10.50"):
+    return _record("MODIFY", {"orderId": order_id}, {
+        "orderId": order_id, "userId": "u-1", "status": status, "orderTotal": Decimal(total),
+        "items": [{"productId": "p-1"}, {"productId": "p-2"}],
+        "createdAt": Decimal(created_at), "updatedAt": str(created_at + 60)})
+
+
+def _rows(connection, table):
+    return connection.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+
+
+def test_batch_is_folded_to_the_last_change_per_key(connection):
+    changes = warehouse.changes_from_records([
+        _order("o-1", "PENDING"), _order("o-1", "PAID"), _order("o-2", "PENDING"),
+    ])
+
+    assert warehouse.apply_changes(changes) == {"orders": (2, 0)}
+    assert _rows(connection, "orders") == [
+        ("o-1", "u-1", "PAID", None, 10.5, 2, DAY, DAY + 60),
+        ("o-2", "u-1", "PENDING", None, 10.5, 2, DAY, DAY + 60),
+    ]
+
+
+def test_retried_batch_writes_the_same_rows(connection):
+    records = [_order("o-1", "PENDING"), _order("o-1", "PAID")]
+    warehouse.apply_changes(warehouse.changes_from_records(records))
+    first = _rows(connection, "orders")
+    warehouse.apply_changes(warehouse.changes_from_records(records))
+    assert _rows(connection, "orders") == first
+
+
+def test_upsert_updates_and_remove_deletes(connection):
+    warehouse.apply_changes(warehouse.changes_from_records([
+        _order("o-1", "PENDING"),
+        _record("INSERT", {"userId": "u-1"},
+                {"userId": "u-1", "email": "someone@example.com", "createdAt": Decimal(DAY)}),
+        _record("INSERT", {"feedbackId": "f-1"},
+                {"feedbackId": "f-1", "userId": "u-1", "orderId": "o-1", "rating": Decimal(4),
+                 "comment": "fine", "createdAt": Decimal(DAY)}),
+    ]))
+    counts = warehouse.apply_changes(warehouse.changes_from_records([
+        _order("o-1", "PAID"), _record("REMOVE", {"feedbackId": "f-1"}),
+    ]))
+
+    assert counts == {"orders": (1, 0), "feedback": (0, 1)}
+    assert [row[2] for row in _rows(connection, "orders")] == ["PAID"]
+    # Only what the reports need is copied: no e-mail addresses or comments
+    assert _rows(connection, "customers") == [("u-1", DAY, None)]
+    assert _rows(connection, "feedback") == []
+
+
+def test_range_report(connection):
+    warehouse.apply_changes(warehouse.changes_from_records([
+        _order("o-1", "PAID", DAY + 10, "10.00"),
+        _order("o-2", "PENDING", DAY + 3600, "5.25"),
+        _order("o-3", "PAID", DAY + 86400, "1.00"),
+        _order("o-4", "PAID", DAY + 2 * 86400, "99.00"),
+    ]))
+
+    report = warehouse.range_report(DAY, DAY + 2 * 86400)
+
+    assert report["revenuePerDay"] == [
+        {"day": "2024-05-01", "orders": 2, "revenue": Decimal("15.25")},
+        {"day": "2024-05-02", "orders": 1, "revenue": Decimal("1.0")},
+    ]
+    assert report["ordersPerStatusPerHour"] == [
+        {"hour": "2024-05-01T00:00:00Z", "statuses": {"PAID": 1}},
+        {"hour": "2024-05-01T01:00:00Z", "statuses": {"PENDING": 1}},
+        {"hour": "2024-05-02T00:00:00Z", "statuses": {"PAID": 1}},
+    ]
+
+
+def test_sink_handler_writes_the_stream_batch(connection, context):
+    from handlers import analytics_sink
+
+    response = analytics_sink.lambda_handler({"Records": [_order("o-1", "PENDING"), _order("o-2", "PAID")]},
+                                             context)
+
+    assert response == {"statusCode": 200, "records": 2, "upserted": 2, "deleted": 0}
+    assert len(_rows(connection, "orders")) == 2
+
+
+def test_connection_is_not_opened_without_the_ca_bundle(monkeypatch, tmp_path):
+    monkeypatch.setattr(warehouse, "CA_BUNDLE", str(tmp_path / "missing.pem"))
+    with pytest.raises(RuntimeError, match="RDS CA bundle"):
+        warehouse._ssl_context()
@@ -0,0 +1,173 @@
+"""
+Copy the existing Customers, Orders and Feedback items into the user table
+(the single-table layout of layer/common/single_table.py). Run it after
+deploying with SingleTableWrites=true; from then on the handlers write the
+copies themselves.
+
+Every source table is read with a parallel segmented Scan (--segments), and
+each segment writes its copies with BatchWriteItem, 25 items per request,
+retrying unprocessed items with jittered backoff. A copy the backfill writes
+can replace one a handler wrote a moment earlier for an order that just
+changed, so unless --no-catch-up is given, customers and orders updated since
+the start are copied again from their current state at the end.
+
+    python tools/backfill_user_table.py --stack my-enterprise-stack
+    python tools/backfill_user_table.py --user-table P-UserData --customers-table P-Customers \\
+        --orders-table P-Orders --feedback-table P-Feedback --segments 16
+    python tools/backfill_user_table.py --stack my-enterprise-stack --dry-run
+
+The exit code is 1 when any item could not be written.
+"""
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+from botocore.config import Config
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "layer"))
+
+from common import single_table  # noqa: E402  (layer/ is put on the path above)
+
+# Source -> (stack output with the table name, copy builder)
+SOURCES = {
+    "customers": ("CustomersTableName", single_table.profile_item),
+    "orders": ("OrdersTableName", single_table.order_item),
+    "feedback": ("FeedbackTableName", single_table.feedback_item),
+}
+BATCH_SIZE = 25        # BatchWriteItem limit
+MAX_ATTEMPTS = 8
+# Clock skew allowance between this machine and the Lambdas stamping updatedAt
+CATCH_UP_SKEW_SECONDS = 60
+
+
+def _updated_at(item):
+    # create_order stores a number, PaymentStep a numeric string
+    try:
+        return int(float(item.get("updatedAt") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _write_batch(client, table_name, requests):
+    """Write up to 25 put requests; returns how many were still unprocessed after MAX_ATTEMPTS."""
+    for attempt in range(MAX_ATTEMPTS):
+        response = client.batch_write_item(RequestItems={table_name: requests})
+        requests = response.get("UnprocessedItems", {}).get(table_name, [])
+        if not requests:
+            return 0
+        time.sleep(random.uniform(0, min(0.05 * 2 ** attempt, 2.0)))  # full jitter
+    return len(requests)
+
+
+def copy_segment(client, source_table, to_copy, user_table, segment, segments, since=None, dry_run=False):
+    """Scan one segment of `source_table` and write its copies. Returns Counter of outcomes."""
+    counts = Counter()
+    batch = []
+
+    def flush():
+        if batch and not dry_run:
+            failed = _write_batch(client, user_table, batch)
+            counts["failed"] += failed
+            counts["copied"] += len(batch) - failed
+        elif batch:
+            counts["copied"] += len(batch)
+        batch.clear()
+
+    paginator = client.get_paginator("scan")
+    for page in paginator.paginate(TableName=source_table, Segment=segment, TotalSegments=segments):
+        for raw in page["Items"]:
+            counts["scanned"] += 1
+            item = single_table.deserialize(raw)
+            if since is not None and _updated_at(item) < since:
+                continue
+            if not item.get("userId"):
+                counts["skipped"] += 1  # nothing to file it under
+                continue
+            batch.append({"PutRequest": {"Item": single_table.serialize(to_copy(item))}})
+            if len(batch) == BATCH_SIZE:
+                flush()
+    flush()
+    return counts
+
+
+def backfill(client, tables, user_table, segments, since=None, dry_run=False, sources=SOURCES):
+    """Copy every source in `tables` ({source: table name}); returns {source: Counter}."""
+    results = {}
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        for source, table_name in tables.items():
+            to_copy = sources[source][1]
+            start = time.perf_counter()
+            parts = executor.map(
+                lambda segment: copy_segment(client, table_name, to_copy, user_table, segment, segments,
+                                             since, dry_run),
+                range(segments))
+            results[source] = sum(parts, Counter())
+            results[source]["seconds"] = round(time.perf_counter() - start, 1)
+    return results
+
+
+def _stack_outputs(stack_name, region):
+    stack = boto3.client("cloudformation", region_name=region).describe_stacks(StackName=stack_name)["Stacks"][0]
+    return {output["OutputKey"]: output["OutputValue"] for output in stack.get("Outputs", [])}
+
+
+def _report(label, results):
+    for source, counts in results.items():
+        print(f"{label:<9} {source:<9} scanned {counts['scanned']:>9,}  copied {counts['copied']:>9,}  "
+              f"skipped {counts['skipped']:>6,}  failed {counts['failed']:>6,}  {counts['seconds']:>7.1f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stack", help="read the table names from this stack's outputs")
+    parser.add_argument("--region", help="AWS region (default: from the environment)")
+    parser.add_argument("--user-table", help="target table (default: the stack's UserTableName)")
+    for source in SOURCES:
+        parser.add_argument(f"--{source}-table", help=f"{source} table (default: from the stack)")
+    parser.add_argument("--only", help="comma separated subset of: " + ", ".join(SOURCES))
+    parser.add_argument("--segments", type=int, default=8, help="parallel Scan segments (and writers) per table")
+    parser.add_argument("--no-catch-up", action="store_true", help="skip re-copying items updated during the run")
+    parser.add_argument("--dry-run", action="store_true", help="scan and count, write nothing")
+    args = parser.parse_args(argv)
+
+    outputs = _stack_outputs(args.stack, args.region) if args.stack else {}
+    user_table = args.user_table or outputs.get("UserTableName")
+    if not user_table:
+        parser.error("--user-table or --stack is required")
+    wanted = [name.strip() for name in args.only.split(",")] if args.only else list(SOURCES)
+    unknown = set(wanted) - set(SOURCES)
+    if unknown:
+        parser.error(f"unknown sources: {', '.join(sorted(unknown))}")
+    tables = {}
+    for source in wanted:
+        table_name = getattr(args, f"{source}_table") or outputs.get(SOURCES[source][0])
+        if not table_name:
+            parser.error(f"--{source}-table or --stack is required")
+        tables[source] = table_name
+
+    # One client for every thread; its pool has a connection per segment
+    client = boto3.client("dynamodb", region_name=args.region, config=Config(
+        max_pool_connections=max(args.segments, 10), retries={"max_attempts": 10, "mode": "adaptive"}))
+
+    started_at = int(time.time())
+    results = backfill(client, tables, user_table, args.segments, dry_run=args.dry_run)
+    _report("backfill", results)
+    failed = sum(counts["failed"] for counts in results.values())
+
+    # Feedback is never updated in place, so only customers and orders can have raced
+    changing = {source: name for source, name in tables.items() if source != "feedback"}
+    if changing and not args.no_catch_up and not args.dry_run:
+        caught_up = backfill(client, changing, user_table, args.segments,
+                             since=started_at - CATCH_UP_SKEW_SECONDS)
+        _report("catch-up", caught_up)
+        failed += sum(counts["failed"] for counts in caught_up.values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,127 @@
+import hashlib
 import json
-import jwt
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+
+import jwt  # PyJWT; RS256 (Cognito) also needs the cryptography package: pip install "pyjwt[crypto]"
+
+# HS256 (shared secret) by default; set COGNITO_USER_POOL_ID to accept Cognito RS256 tokens instead
+JWT_SECRET = os.environ.get('JWT_SECRET', 'YOUR_SECRET')
+COGNITO_USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
+COGNITO_APP_CLIENT_ID = os.environ.get('COGNITO_APP_CLIENT_ID')   # optional audience check
+REGION = os.environ.get('AWS_REGION', 'eu-central-1')
+ISSUER = f"https://cognito-idp.{REGION}.amazonaws.com/{COGNITO_USER_POOL_ID}" if COGNITO_USER_POOL_ID else None
+JWKS_URL = os.environ.get('JWKS_URL') or (f"{ISSUER}/.well-known/jwks.json" if ISSUER else None)
+# An unknown kid (key rotation) refetches the JWKS, at most this often
+JWKS_MIN_REFRESH_SECONDS = int(os.environ.get('JWKS_MIN_REFRESH_SECONDS', 60))
+
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 1024))
+# "method": policy for the called method only (as before)
+# "api": every method of the stage, so API Gateway's authorizer cache also answers other routes
+POLICY_SCOPE = os.environ.get('POLICY_SCOPE', 'method')
+
+# Verified claims by sha256(token), least recently used first; entries expire at the token's exp
+_token_cache = OrderedDict()
+_jwks_keys = {}
+_jwks_fetched_at = 0.0
+_jwks_lock = threading.Lock()
+
+
+def _cache_get(key, now):
+    entry = _token_cache.get(key)
+    if entry is None:
+        return None
+    claims, expires_at = entry
+    if expires_at <= now:
+        del _token_cache[key]
+        return None
+    _token_cache.move_to_end(key)
+    return claims
+
+
+def _cache_put(key, claims):
+    if 'exp' not in claims:
+        return  # without an expiry there is no safe point to evict it
+    _token_cache[key] = (claims, claims['exp'])
+    _token_cache.move_to_end(key)
+    while len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+
+
+def _fetch_jwks():
+    with urllib.request.urlopen(JWKS_URL, timeout=3) as response:
+        return json.loads(response.read())
+
+
+def _signing_key(kid):
+    """Public key for `kid`, fetching the JWKS on first use and again only for an unknown kid."""
+    global _jwks_fetched_at
+    key = _jwks_keys.get(kid)
+    if key is not None:
+        return key
+    with _jwks_lock:
+        if kid not in _jwks_keys and time.time() - _jwks_fetched_at >= JWKS_MIN_REFRESH_SECONDS:
+            keys = {}
+            for jwk in _fetch_jwks()['keys']:
+                keys[jwk['kid']] = jwt.PyJWK(jwk).key
+            _jwks_keys.clear()
+            _jwks_keys.update(keys)
+            _jwks_fetched_at = time.time()
+    key = _jwks_keys.get(kid)
+    if key is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key: {kid}")
+    return key
+
+
+def verify_token(token):
+    """Return the token's verified claims. Raises jwt.InvalidTokenError."""
+    if not ISSUER:
+        return jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+
+    key = _signing_key(jwt.get_unverified_header(token).get('kid'))
+    claims = jwt.decode(token, key, algorithms=['RS256'], issuer=ISSUER,
+                        options={'require': ['exp'], 'verify_aud': False})
+    # Cognito ID tokens carry the app client in aud, access tokens in client_id
+    if claims.get('token_use') not in ('id', 'access'):
+        raise jwt.InvalidTokenError("Unexpected token_use")
+    if COGNITO_APP_CLIENT_ID and COGNITO_APP_CLIENT_ID not in (claims.get('aud'), claims.get('client_id')):
+        raise jwt.InvalidTokenError("Token was not issued for this app client")
+    return claims
+
+
+def cached_claims(token):
+    """Verified claims for `token`, verifying it only the first time it is seen."""
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    now = time.time()
+    claims = _cache_get(key, now)
+    if claims is None:
+        claims = verify_token(token)
+        _cache_put(key, claims)
+    return claims
+
+
+def policy_resource(method_arn):
+    if POLICY_SCOPE != 'api':
+        return method_arn
+    # arn:aws:execute-api:region:account:apiId/stage/VERB/path -> arn:...:apiId/stage/*/*
+    api, stage = method_arn.split('/')[:2]
+    return f"{api}/{stage}/*/*"
+
 
 def lambda_handler(event, context):
     token = event['authorizationToken']
     method_arn = event['methodArn']
+    if token.startswith('Bearer '):
+        token = token[len('Bearer '):]
 
     try:
-        decoded = jwt.decode(token, 'YOUR_SECRET', algorithms=['HS256'])
-        principal_id = decoded['user']
+        decoded = cached_claims(token)
+        principal_id = decoded.get('user') or decoded['sub']
 
-        policy = generate_policy(principal_id, 'Allow', method_arn)
+        policy = generate_policy(principal_id, 'Allow', policy_resource(method_arn))
         return policy
 
     except Exception as e:
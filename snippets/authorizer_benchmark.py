@@ -0,0 +1,115 @@
+"""
+Throughput of authorizer.lambda_handler for repeated tokens (answered from the
+verified-token cache) and cold tokens (every one verified), for Cognito-style
+RS256 tokens and HS256 tokens.
+
+The RS256 run signs tokens with a throwaway RSA key and serves its JWKS from a
+local HTTP server, so the JWKS fetch is a real request made exactly once.
+
+    pip install "pyjwt[crypto]"
+    python authorizer_benchmark.py --tokens 2000
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+POOL_ID = "eu-central-1_bench"
+CLIENT_ID = "bench-client"
+HS256_SECRET = "bench-secret-" + "x" * 32
+METHOD_ARN = "arn:aws:execute-api:eu-central-1:123456789012:abcdef1234/prod/GET/items"
+
+
+def _serve_jwks(jwks):
+    hits = {"count": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits["count"] += 1
+            body = json.dumps(jwks).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+
+def _load_authorizer(env):
+    os.environ.update(env)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import authorizer
+    return importlib.reload(authorizer)  # re-read the environment
+
+
+def _throughput(authorizer, tokens):
+    start = time.perf_counter()
+    for token in tokens:
+        authorizer.lambda_handler({"authorizationToken": f"Bearer {token}", "methodArn": METHOD_ARN}, None)
+    return len(tokens) / (time.perf_counter() - start)
+
+
+def _report(name, authorizer, cold_tokens, repeats):
+    authorizer._token_cache.clear()
+    cold = _throughput(authorizer, cold_tokens)
+    # The first call verifies and caches, the rest are cache hits
+    warm = _throughput(authorizer, [cold_tokens[0]] * repeats)
+    print(f"{name:<6} cold {cold:>10,.0f} req/s   repeated {warm:>10,.0f} req/s   x{warm / cold:,.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=1000, help="distinct (cold) tokens per run")
+    parser.add_argument("--repeats", type=int, default=20000, help="calls with one repeated token")
+    args = parser.parse_args(argv)
+    expires = int(time.time()) + 3600
+
+    # Cognito-style RS256: the handler fetches the JWKS from the local server once
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid="bench-key", alg="RS256", use="sig")
+    server, hits = _serve_jwks({"keys": [jwk]})
+    authorizer = _load_authorizer({
+        "COGNITO_USER_POOL_ID": POOL_ID,
+        "COGNITO_APP_CLIENT_ID": CLIENT_ID,
+        "AWS_REGION": "eu-central-1",
+        "JWKS_URL": f"http://127.0.0.1:{server.server_port}/.well-known/jwks.json",
+        "TOKEN_CACHE_SIZE": str(args.tokens),
+    })
+    tokens = [jwt.encode({"sub": f"user-{i}", "iss": authorizer.ISSUER, "client_id": CLIENT_ID,
+                          "token_use": "access", "exp": expires}, private_key, algorithm="RS256",
+                         headers={"kid": "bench-key"}) for i in range(args.tokens)]
+    _report("RS256", authorizer, tokens, args.repeats)
+    assert hits["count"] == 1, f"JWKS fetched {hits['count']} times"
+    server.shutdown()
+
+    # Wildcard policies cover every method of the stage
+    authorizer.POLICY_SCOPE = "api"
+    policy = authorizer.lambda_handler({"authorizationToken": tokens[0], "methodArn": METHOD_ARN}, None)
+    assert policy["policyDocument"]["Statement"][0]["Resource"].endswith("abcdef1234/prod/*/*"), policy
+
+    # Shared-secret HS256 (the snippet's original mode)
+    del os.environ["COGNITO_USER_POOL_ID"]
+    authorizer = _load_authorizer({"JWT_SECRET": HS256_SECRET, "TOKEN_CACHE_SIZE": str(args.tokens)})
+    tokens = [jwt.encode({"user": f"user-{i}", "exp": expires}, HS256_SECRET, algorithm="HS256")
+              for i in range(args.tokens)]
+    _report("HS256", authorizer, tokens, args.repeats)
+    print(f"JWKS requests: {hits['count']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,118 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
 import boto3
-from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+TABLE_NAME = os.environ.get('ORDERS_TABLE', 'Orders')
+# Query a GSI instead when userId is not the table's partition key
+INDEX_NAME = os.environ.get('ORDERS_USER_INDEX')
+MAX_WORKERS = int(os.environ.get('QUERY_MAX_WORKERS', '16'))
+# Retries on top of the client's own, resuming at the page that was throttled
+THROTTLE_RETRIES = 5
+THROTTLE_BASE_DELAY = 0.05
+THROTTLE_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded')
+
+# Clients are thread safe (resources are not), so all workers share this one.
+# Adaptive retries rate-limit the client itself once DynamoDB starts throttling.
+client = boto3.client('dynamodb', config=Config(
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    max_pool_connections=max(MAX_WORKERS, 10)))
+_deserializer = TypeDeserializer()
+
+
+def _query_kwargs(key_name, key_value, projection=None, select=None, page_size=None,
+                  index_name=INDEX_NAME, table_name=TABLE_NAME):
+    kwargs = {
+        'TableName': table_name,
+        'KeyConditionExpression': '#key = :key',
+        'ExpressionAttributeNames': {'#key': key_name},
+        'ExpressionAttributeValues': {':key': {'S': key_value}},
+    }
+    if index_name:
+        kwargs['IndexName'] = index_name
+    if page_size:
+        kwargs['Limit'] = page_size
+    if select == 'COUNT':
+        kwargs['Select'] = 'COUNT'
+    elif projection:
+        # Placeholders, so reserved words such as "status" can be projected
+        names = {f'#p{i}': name for i, name in enumerate(projection)}
+        kwargs['ProjectionExpression'] = ', '.join(names)
+        kwargs['ExpressionAttributeNames'].update(names)
+    return kwargs
+
+
+def _query_page(kwargs):
+    for attempt in range(THROTTLE_RETRIES + 1):
+        try:
+            return client.query(**kwargs)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLE_ERRORS or attempt == THROTTLE_RETRIES:
+                raise
+            # Full jitter, so throttled workers don't come back in lockstep
+            time.sleep(random.uniform(0, THROTTLE_BASE_DELAY * 2 ** attempt))
+
+
+def iter_pages(key_name, key_value, **options):
+    """Yield every raw Query response for one partition key, fetching pages lazily."""
+    kwargs = _query_kwargs(key_name, key_value, **options)
+    while True:
+        page = _query_page(kwargs)
+        yield page
+        if 'LastEvaluatedKey' not in page:
+            return
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+def iter_query(key_name, key_value, projection=None, **options):
+    """Yield the items of every page for one partition key, as plain Python values."""
+    for page in iter_pages(key_name, key_value, projection=projection, **options):
+        for item in page.get('Items', ()):
+            yield {name: _deserializer.deserialize(value) for name, value in item.items()}
+
+
+def count_query(key_name, key_value, **options):
+    """Number of items for one partition key (Select=COUNT: nothing but counts is returned)."""
+    return sum(page['Count'] for page in iter_pages(key_name, key_value, select='COUNT', **options))
+
+
+def query_orders(user_id, projection=None):
+    """All orders of one user, every page."""
+    return list(iter_query('userId', user_id, projection=projection))
+
+
+def query_many(key_values, key_name='userId', projection=None, select=None, max_workers=MAX_WORKERS, **options):
+    """
+    Query many partition keys concurrently and yield (key_value, result) as
+    each finishes: the list of items, or the count with select='COUNT'. At most
+    `max_workers` queries run at once and no more than twice that many results
+    are held, so key_values can be a lazy iterable of any length.
+    """
+    def run(key_value):
+        if select == 'COUNT':
+            return key_value, count_query(key_name, key_value, **options)
+        return key_value, list(iter_query(key_name, key_value, projection=projection, **options))
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('Orders')
+    key_values = iter(key_values)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        for key_value in key_values:
+            pending.add(pool.submit(run, key_value))
+            if len(pending) >= max_workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
 
-def query_orders(user_id):
-    response = table.query(
-        KeyConditionExpression=Key('userId').eq(user_id)
-    )
-    return response['Items']
 
-orders = query_orders('user-123')
-print(orders)
+if __name__ == '__main__':
+    orders = query_orders('user-123')
+    print(orders)
@@ -0,0 +1,139 @@
+"""
+Orders of many users through dynamo_query.py: the sequential loop (one user
+after the other, every page) against query_many() with bounded concurrency,
+fetching the items and with Select=COUNT.
+
+The table lives in moto, so --latency-ms adds a sleep per Query request to
+stand in for the round trip to DynamoDB (in the same region, a few ms); use
+--endpoint-url to run against DynamoDB Local instead. moto sorts the whole
+table on every Query, CPU time that would serialize the threads on the GIL, so
+it answers each distinct request once during a warm-up pass and the measured
+runs get the recorded response back (after the sleep). --page-size caps the
+items per page, so users span several pages as they would past 1 MB.
+
+    pip install moto
+    python dynamo_query_benchmark.py --users 200 --orders-per-user 30 --page-size 25 --latency-ms 5
+"""
+import argparse
+import os
+import sys
+import time
+
+from botocore.awsrequest import AWSResponse
+
+TABLE_NAME = "bench-Orders"
+
+
+def _load(endpoint_url):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    if endpoint_url:
+        os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = endpoint_url
+    os.environ["ORDERS_TABLE"] = TABLE_NAME
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import dynamo_query
+    return dynamo_query
+
+
+def _seed(client, users, orders_per_user):
+    client.create_table(
+        TableName=TABLE_NAME, BillingMode="PAY_PER_REQUEST",
+        AttributeDefinitions=[{"AttributeName": "userId", "AttributeType": "S"},
+                              {"AttributeName": "orderId", "AttributeType": "S"}],
+        KeySchema=[{"AttributeName": "userId", "KeyType": "HASH"},
+                   {"AttributeName": "orderId", "KeyType": "RANGE"}])
+    requests = [{"PutRequest": {"Item": {
+        "userId": {"S": f"user-{user:05d}"}, "orderId": {"S": f"order-{user:05d}-{order:04d}"},
+        "status": {"S": "PAID" if order % 3 else "PENDING"}, "orderTotal": {"N": str(10 + order)},
+        "items": {"L": [{"M": {"productId": {"S": "p1"}, "quantity": {"N": "2"}}}]}}}}
+        for user in range(users) for order in range(orders_per_user)]
+    for start in range(0, len(requests), 25):
+        client.batch_write_item(RequestItems={TABLE_NAME: requests[start:start + 25]})
+
+
+def _replay(client):
+    """
+    Record every Query response moto gives and serve repeats from memory; every
+    request sleeps state["latency_ms"] first. Returns the state.
+    """
+    recorded, state = {}, {"latency_ms": 0.0}
+
+    def before_call(params, context, **kwargs):
+        key = params["body"]
+        context["replay_key"] = key
+        if state["latency_ms"]:
+            time.sleep(state["latency_ms"] / 1000)
+        if key in recorded:
+            return AWSResponse(params["url"], 200, {}, None), recorded[key]
+        return None
+
+    def after_call(parsed, context, **kwargs):
+        recorded.setdefault(context["replay_key"], parsed)
+
+    client.meta.events.register("before-call.dynamodb.Query", before_call)
+    client.meta.events.register("after-call.dynamodb.Query", after_call)
+    return state
+
+
+def _timed(name, users, run):
+    start = time.perf_counter()
+    results = dict(run())
+    elapsed = time.perf_counter() - start
+    total = sum(value if isinstance(value, int) else len(value) for value in results.values())
+    print(f"{name:<26} {len(users) / elapsed:>9,.0f} users/s   {elapsed * 1000:>9.0f} ms   {total:>8} orders")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--orders-per-user", type=int, default=30)
+    parser.add_argument("--page-size", type=int, default=25, help="Limit per Query page")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated round trip per Query")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local (e.g. http://localhost:8000) instead of moto")
+    args = parser.parse_args(argv)
+
+    mock = None
+    if not args.endpoint_url:
+        from moto import mock_aws
+        mock = mock_aws()
+        mock.start()
+    try:
+        dynamo_query = _load(args.endpoint_url)
+        _seed(dynamo_query.client, args.users, args.orders_per_user)
+        users = [f"user-{user:05d}" for user in range(args.users)]
+        options = {"page_size": args.page_size, "projection": ["orderId", "status", "orderTotal"]}
+        if mock:
+            replay = _replay(dynamo_query.client)
+            # Warm-up: moto answers every request the runs below will make once
+            dict(dynamo_query.query_many(users, max_workers=args.workers, **options))
+            dict(dynamo_query.query_many(users, select="COUNT", max_workers=args.workers,
+                                         page_size=args.page_size))
+            replay["latency_ms"] = args.latency_ms
+        elif args.latency_ms:
+            dynamo_query.client.meta.events.register(
+                "before-call.dynamodb.Query", lambda **kwargs: time.sleep(args.latency_ms / 1000))
+
+        first_page = _timed("first page only (old)", users, lambda: (
+            (user, list(next(dynamo_query.iter_pages("userId", user, **options))["Items"])) for user in users))
+        sequential = _timed("sequential, all pages", users, lambda: (
+            (user, list(dynamo_query.iter_query("userId", user, **options))) for user in users))
+        concurrent = _timed(f"query_many x{args.workers}", users, lambda: dynamo_query.query_many(
+            users, max_workers=args.workers, **options))
+        counts = _timed(f"query_many COUNT x{args.workers}", users, lambda: dynamo_query.query_many(
+            users, select="COUNT", max_workers=args.workers, page_size=args.page_size))
+
+        assert sorted(concurrent) == sorted(sequential) and all(
+            sorted(concurrent[user], key=lambda item: item["orderId"]) == sequential[user] for user in users)
+        assert counts == {user: len(items) for user, items in sequential.items()}
+        missing = sum(map(len, sequential.values())) - sum(map(len, first_page.values()))
+        print(f"the first-page-only loop misses {missing} of {sum(counts.values())} orders")
+    finally:
+        if mock:
+            mock.stop()
+
+
+if __name__ == "__main__":
+    main()
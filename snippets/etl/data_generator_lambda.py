@@ -3,12 +3,41 @@ import boto3
 import os
 import csv
 import io
-from datetime import datetime
+import random
+import zlib
+from datetime import datetime, timedelta
 
 s3_client = boto3.client('s3')
 
 # Environment variables that will be set by CloudFormation
 SOURCE_S3_BUCKET = os.environ.get('SOURCE_S3_BUCKET')
+# Defaults for a scheduled run; a manual invocation can override them in the event
+ROW_COUNT = int(os.environ.get('ROW_COUNT', 0))           # 0: the five hand-written sample rows
+DATA_SEED = int(os.environ.get('DATA_SEED', 42))
+OUTPUT_FORMAT = os.environ.get('OUTPUT_FORMAT', 'csv')    # csv | csv.gz | parquet
+CHUNK_ROWS = int(os.environ.get('CHUNK_ROWS', 50000))     # rows formatted/encoded at a time
+MULTIPART_PART_SIZE = int(os.environ.get('MULTIPART_PART_SIZE', 8 * 1024 * 1024))
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+
+FIELDNAMES = ["id", "name", "category", "price", "stock", "last_updated"]
+OUTPUT_FORMATS = {
+    # format: (key prefix, file suffix, ContentType, ContentEncoding)
+    'csv': ('product_data', '.csv', 'text/csv', None),
+    'csv.gz': ('product_data', '.csv.gz', 'text/csv', 'gzip'),
+    # Columnar output is for direct consumers (Athena, Spark); the Glue job reads CSV
+    'parquet': ('product_data_parquet', '.parquet', 'application/vnd.apache.parquet', None),
+}
+
+CATEGORIES = {
+    "Electronics": ["Laptop", "Monitor", "Tablet", "Headphones", "Camera"],
+    "Accessories": ["Mouse", "Keyboard", "Cable", "Charger", "Webcam"],
+    "Furniture": ["Office Chair", "Desk", "Bookshelf", "Lamp", "Cabinet"],
+    "Appliances": ["Kettle", "Toaster", "Blender", "Microwave", "Vacuum"],
+    "Books": ["Novel", "Cookbook", "Atlas", "Textbook", "Comic"],
+}
+ADJECTIVES = ["Pro", "Mini", "Max", "Classic", "Eco", "Smart", "Ultra", "Basic"]
+# Fixed reference point so the same seed always yields byte-identical output
+BASE_TIMESTAMP = datetime(2024, 1, 1)
 
 def generate_sample_data():
     """Generates a list of sample product data."""
@@ -21,6 +50,134 @@ def generate_sample_data():
     ]
     return data
 
+def generate_rows(count, seed):
+    """
+    Lazily yield `count` synthetic product rows (as tuples in FIELDNAMES order).
+    The same seed always produces the same rows, so load tests are repeatable.
+    """
+    rng = random.Random(seed)
+    categories = sorted(CATEGORIES)
+    for i in range(count):
+        category = rng.choice(categories)
+        # Roughly 10% out of stock, so consumers of the ETL output see sold-out products
+        stock = 0 if rng.random() < 0.1 else rng.randint(1, 500)
+        yield (
+            f"prod{seed}-{i:09d}",
+            f"{rng.choice(CATEGORIES[category])} {rng.choice(ADJECTIVES)}",
+            category,
+            round(rng.uniform(1, 2000), 2),
+            stock,
+            (BASE_TIMESTAMP + timedelta(seconds=rng.randrange(365 * 86400))).isoformat(),
+        )
+
+def iter_chunks(rows, size):
+    """Group an iterable of rows into lists of at most `size` rows."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class MultipartUploadWriter:
+    """
+    File-like sink that uploads to S3 in fixed-size parts, so only one part is
+    ever held in memory. Small outputs fall back to a single put_object.
+    """
+
+    def __init__(self, bucket, key, content_type, content_encoding=None, part_size=None):
+        self.bucket = bucket
+        self.key = key
+        self.extra_args = {'ContentType': content_type}
+        if content_encoding:
+            self.extra_args['ContentEncoding'] = content_encoding
+        self.part_size = max(part_size or MULTIPART_PART_SIZE, MIN_PART_SIZE)
+        self.buffer = bytearray()
+        self.parts = []
+        self.upload_id = None
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        if len(self.buffer) >= self.part_size:
+            self._upload_part()
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            self.upload_id = s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.extra_args)['UploadId']
+        part_number = len(self.parts) + 1
+        response = s3_client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=bytes(self.buffer))
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buffer = bytearray()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.upload_id is None:
+            s3_client.put_object(Bucket=self.bucket, Key=self.key,
+                                 Body=bytes(self.buffer), **self.extra_args)
+            return
+        if self.buffer:
+            self._upload_part()
+        s3_client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts})
+
+    def abort(self):
+        self.closed = True
+        if self.upload_id is not None:
+            s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+def write_csv(writer, chunks, compress=False):
+    """Format each chunk as CSV text and hand it to the writer (optionally gzipped)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: gzip container
+    for index, chunk in enumerate(chunks):
+        text = io.StringIO()
+        csv_writer = csv.writer(text, lineterminator='\n')
+        if index == 0:
+            csv_writer.writerow(FIELDNAMES)
+        csv_writer.writerows(chunk)
+        data = text.getvalue().encode('utf-8')
+        writer.write(compressor.compress(data) if compressor else data)
+    if compressor:
+        writer.write(compressor.flush())
+
+def write_parquet(writer, chunks):
+    """Write each chunk as one Parquet row group (needs pyarrow, e.g. via a Lambda layer)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("name", pa.string()),
+        ("category", pa.string()),
+        ("price", pa.float64()),
+        ("stock", pa.int32()),
+        ("last_updated", pa.timestamp("us")),
+    ])
+    with pq.ParquetWriter(writer, schema, compression="snappy") as parquet_writer:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            columns[5] = [datetime.fromisoformat(value) for value in columns[5]]
+            parquet_writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema))
+
 def lambda_handler(event, context):
     if not SOURCE_S3_BUCKET:
         print("Error: SOURCE_S3_BUCKET environment variable not set.")
@@ -29,36 +186,53 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': 'SOURCE_S3_BUCKET not configured'})
         }
 
-    sample_products = generate_sample_data()
-    
-    # Create CSV in memory
-    csv_buffer = io.StringIO()
-    fieldnames = sample_products[0].keys()
-    writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(sample_products)
-    
+    event = event if isinstance(event, dict) else {}
+    row_count = int(event.get('rows', ROW_COUNT))
+    seed = int(event.get('seed', DATA_SEED))
+    output_format = event.get('format', OUTPUT_FORMAT)
+    if output_format not in OUTPUT_FORMATS:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f"Unsupported format '{output_format}'", 'formats': sorted(OUTPUT_FORMATS)})
+        }
+
+    if row_count > 0:
+        rows = generate_rows(row_count, seed)
+    else:
+        rows = (tuple(product[name] for name in FIELDNAMES) for product in generate_sample_data())
+    chunks = iter_chunks(rows, CHUNK_ROWS)
+
     # Define S3 file name
+    prefix, suffix, content_type, content_encoding = OUTPUT_FORMATS[output_format]
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    s3_file_name = f"product_data/raw_products_{timestamp}.csv"
-    
+    s3_file_name = f"{prefix}/raw_products_{timestamp}{suffix}"
+
+    writer = MultipartUploadWriter(SOURCE_S3_BUCKET, s3_file_name, content_type, content_encoding)
     try:
-        s3_client.put_object(
-            Bucket=SOURCE_S3_BUCKET,
-            Key=s3_file_name,
-            Body=csv_buffer.getvalue(),
-            ContentType='text/csv'
-        )
+        # Rows are generated, encoded and uploaded one chunk / part at a time
+        if output_format == 'parquet':
+            write_parquet(writer, chunks)
+        else:
+            write_csv(writer, chunks, compress=output_format == 'csv.gz')
+        writer.close()
         message = f"Successfully uploaded {s3_file_name} to {SOURCE_S3_BUCKET}"
         print(message)
         return {
             'statusCode': 200,
-            'body': json.dumps({'message': message, 's3_uri': f"s3://{SOURCE_S3_BUCKET}/{s3_file_name}"})
+            'body': json.dumps({
+                'message': message,
+                's3_uri': f"s3://{SOURCE_S3_BUCKET}/{s3_file_name}",
+                'rows': row_count or 5,
+                'seed': seed,
+                'format': output_format,
+                'bytes': writer.position,
+                'parts': len(writer.parts) or 1
+            })
         }
     except Exception as e:
+        writer.abort()
         print(f"Error uploading to S3: {e}")
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
-    
\ No newline at end of file
@@ -1,60 +1,120 @@
 import sys
-from awsglue.transforms import *
-from awsglue.utils import getResolvedOptions
-from pyspark.context import SparkContext
-from awsglue.context import GlueContext
-from awsglue.job import Job
-from pyspark.sql.functions import col, when, lit
-from awsglue.dynamicframe import DynamicFrame
+from datetime import datetime, timezone
+
+from pyspark.sql.functions import col, current_timestamp, lit
+from pyspark.sql.types import (DoubleType, IntegerType, StringType, StructField,
+                               StructType, TimestampType)
 
 ## @params: [JOB_NAME, SOURCE_S3_PATH, TARGET_S3_PATH, DISCOUNT_RATE]
-args = getResolvedOptions(sys.argv, ['JOB_NAME', 'SOURCE_S3_PATH', 'TARGET_S3_PATH', 'DISCOUNT_RATE'])
-
-sc = SparkContext()
-glueContext = GlueContext(sc)
-spark = glueContext.spark_session
-job = Job(glueContext)
-job.init(args['JOB_NAME'], args)
-
-# Source and Target paths from job parameters
-source_s3_path = args['SOURCE_S3_PATH'] # e.g., "s3://your-source-bucket-name/product_data/"
-target_s3_path = args['TARGET_S3_PATH'] # e.g., "s3://your-target-bucket-name/transformed_product_data/"
-discount_rate = float(args['DISCOUNT_RATE'])
-
-# Read data from source S3 - reading all CSVs under the prefix
-datasource0 = glueContext.create_dynamic_frame.from_options(
-    connection_type="s3",
-    connection_options={"paths": [source_s3_path], "recurse": True},
-    format="csv",
-    format_options={"withHeader": True, "inferSchema": True}
-)
-
-# Convert DynamicFrame to Spark DataFrame for easier manipulation
-df = datasource0.toDF()
-
-if df.count() > 0:
-    # Transformation 1: Filter out products with stock <= 0
-    df_in_stock = df.filter(col("stock").cast("int") > 0)
-
-    # Transformation 2: Add a discounted_price column
-    # Ensure price is treated as a double for calculation
-    df_transformed = df_in_stock.withColumn(
+## optional: [MAX_RECORDS_PER_FILE]
+
+# Columns written by data_generator_lambda.py. Declaring them up front avoids a
+# separate inference pass over the CSVs and keeps types stable between runs.
+PRODUCT_SCHEMA = StructType([
+    StructField("id", StringType()),
+    StructField("name", StringType()),
+    StructField("category", StringType()),
+    StructField("price", DoubleType()),
+    StructField("stock", IntegerType()),
+    StructField("last_updated", TimestampType()),
+])
+
+PARTITION_KEYS = ["category", "ingest_date"]
+# Caps the size of each Parquet file; one partition directory gets as many files as it needs
+DEFAULT_MAX_RECORDS_PER_FILE = 500000
+
+
+def apply_product_schema(df):
+    """Cast the raw (string) CSV columns to PRODUCT_SCHEMA; unparsable values become null."""
+    return df.select([col(field.name).cast(field.dataType).alias(field.name)
+                      for field in PRODUCT_SCHEMA.fields])
+
+
+def transform_products(df, discount_rate, ingest_date):
+    """
+    The ETL business logic, free of any Glue dependency so it can run on a
+    plain local SparkSession (see local_harness.py).
+    """
+    # Transformation 1: Filter out rows with no (parsable) stock value. Products with
+    # stock <= 0 are kept: each run writes only the new rows, so a dropped row would
+    # leave the product's earlier, in-stock row as its latest one downstream
+    df_stocked = apply_product_schema(df).filter(col("stock").isNotNull())
+
+    # Transformation 2: Add a discounted_price column, formatted to 2 decimal places
+    df_transformed = df_stocked.withColumn(
         "discounted_price",
-        (col("price").cast("double") * (1 - discount_rate)).cast("decimal(10,2)") # Format to 2 decimal places
+        (col("price") * (1 - discount_rate)).cast("decimal(10,2)")
     )
-    
-    # Transformation 3: Add a processed_timestamp column
-    from pyspark.sql.functions import current_timestamp
-    df_final = df_transformed.withColumn("etl_processed_at", current_timestamp())
-
-    # Convert back to DynamicFrame
-    transformed_dynamic_frame = glueContext.write_dynamic_frame.from_options(
-        frame=DynamicFrame.fromDF(df_final, glueContext, "transformed_df"),
+
+    # Transformation 3: Add the processing timestamp and the ingest date used for partitioning
+    return (df_transformed
+            .withColumn("etl_processed_at", current_timestamp())
+            .withColumn("ingest_date", lit(ingest_date)))
+
+
+def is_empty(df):
+    """Fetch at most one row instead of counting the whole frame."""
+    return len(df.head(1)) == 0
+
+
+def write_partitioned(df, target_s3_path, max_records_per_file=DEFAULT_MAX_RECORDS_PER_FILE):
+    """
+    Append Parquet partitioned by category and ingest date. Repartitioning on
+    the partition keys gives one writer per output directory (instead of one
+    small file per input split), and maxRecordsPerFile splits large ones.
+    """
+    (df.repartition(*[col(key) for key in PARTITION_KEYS])
+       .write
+       .mode("append")
+       .partitionBy(*PARTITION_KEYS)
+       .option("maxRecordsPerFile", max_records_per_file)
+       .option("compression", "snappy")
+       .parquet(target_s3_path))
+
+
+def main():
+    from awsglue.context import GlueContext
+    from awsglue.job import Job
+    from awsglue.utils import getResolvedOptions
+    from pyspark.context import SparkContext
+
+    args = getResolvedOptions(sys.argv, ['JOB_NAME', 'SOURCE_S3_PATH', 'TARGET_S3_PATH', 'DISCOUNT_RATE'])
+    max_records_per_file = DEFAULT_MAX_RECORDS_PER_FILE
+    if '--MAX_RECORDS_PER_FILE' in sys.argv:
+        max_records_per_file = int(getResolvedOptions(sys.argv, ['MAX_RECORDS_PER_FILE'])['MAX_RECORDS_PER_FILE'])
+
+    sc = SparkContext()
+    glueContext = GlueContext(sc)
+    job = Job(glueContext)
+    job.init(args['JOB_NAME'], args)
+
+    # Source and Target paths from job parameters
+    source_s3_path = args['SOURCE_S3_PATH'] # e.g., "s3://your-source-bucket-name/product_data/"
+    target_s3_path = args['TARGET_S3_PATH'] # e.g., "s3://your-target-bucket-name/transformed_product_data/"
+    discount_rate = float(args['DISCOUNT_RATE'])
+    ingest_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    # Read only the CSVs added since the last successful run: the transformation_ctx
+    # ties this source to the job bookmark (--job-bookmark-option job-bookmark-enable),
+    # which job.commit() advances below.
+    datasource0 = glueContext.create_dynamic_frame.from_options(
         connection_type="s3",
-        connection_options={"path": target_s3_path},
-        format="parquet" # Writing output in Parquet format
+        connection_options={"paths": [source_s3_path], "recurse": True},
+        format="csv",
+        format_options={"withHeader": True},
+        transformation_ctx="datasource0"
     )
-else:
-    print(f"No data found in {source_s3_path}. Skipping transformation.")
 
-job.commit()
\ No newline at end of file
+    df = datasource0.toDF()
+
+    if is_empty(df):
+        print(f"No new data found in {source_s3_path}. Skipping transformation.")
+    else:
+        df_final = transform_products(df, discount_rate, ingest_date)
+        write_partitioned(df_final, target_s3_path, max_records_per_file)
+
+    job.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Runs the Glue job's transformation on a local SparkSession, without Glue.
+
+    pip install pyspark
+    python local_harness.py [output_dir]
+
+Builds a small raw frame shaped like the generator's CSV (all strings, as the
+CSV reader delivers them), checks the filter/discount logic and, when an output
+directory is given, writes the partitioned Parquet layout the job produces.
+"""
+import sys
+from decimal import Decimal
+
+from pyspark.sql import SparkSession
+
+from glue_etl_script import is_empty, transform_products, write_partitioned
+
+RAW_COLUMNS = ["id", "name", "category", "price", "stock", "last_updated"]
+RAW_ROWS = [
+    ("prod101", "Laptop Pro", "Electronics", "1200.50", "50", "2024-05-01T10:00:00"),
+    ("prod102", "Wireless Mouse", "Accessories", "25.99", "150", "2024-05-01T10:00:00"),
+    ("prod105", "Mechanical Keyboard", "Accessories", "75.20", "0", "2024-05-01T10:00:00"),
+    ("prod106", "Broken Row", "Accessories", "9.99", "n/a", "2024-05-01T10:00:00"),
+    ("prod107", "Returned Desk", "Furniture", "199.00", "-2", "2024-05-01T10:00:00"),
+]
+
+
+def main(output_dir=None):
+    spark = (SparkSession.builder
+             .master("local[2]")
+             .appName("glue-etl-local-harness")
+             .config("spark.sql.session.timeZone", "UTC")
+             .getOrCreate())
+    try:
+        raw = spark.createDataFrame(RAW_ROWS, RAW_COLUMNS)
+        assert not is_empty(raw)
+        assert is_empty(raw.limit(0))
+
+        result = transform_products(raw, 0.10, "2024-05-01")
+        rows = {row["id"]: row for row in result.collect()}
+
+        # Unparsable stock values are filtered out; sold-out rows are kept with their stock
+        assert sorted(rows) == ["prod101", "prod102", "prod105", "prod107"], sorted(rows)
+        assert rows["prod105"]["stock"] == 0 and rows["prod107"]["stock"] == -2
+        assert rows["prod101"]["discounted_price"] == Decimal("1080.45")
+        assert rows["prod102"]["discounted_price"] == Decimal("23.39")
+        assert rows["prod101"]["stock"] == 50
+        assert all(row["ingest_date"] == "2024-05-01" for row in rows.values())
+        assert dict(result.dtypes)["price"] == "double"
+        print("transform_products: OK")
+
+        if output_dir:
+            write_partitioned(result, output_dir, max_records_per_file=1)
+            print(f"Wrote partitioned Parquet to {output_dir}")
+    finally:
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
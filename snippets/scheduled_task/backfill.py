@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+import transform_lambda
+from transform_lambda import BUCKET_NAME, SOURCE_DATA_PREFIX, SOURCE_ETAG_METADATA, dest_key_for
+
+# Reprocess everything under SOURCE_DATA_PREFIX (after a transform change or lost
+# events) without re-uploading. Runs as a CLI or as the DataBackfillFunction:
+#
+#   S3_BUCKET_NAME=<bucket> python backfill.py --since 2024-05-01 --until 2024-06-01 --skip etag
+#
+# The prefix is split into its dt=YYYY-MM-DD/ partitions (pruned by name to the
+# time bounds), which are listed concurrently; within a partition the next
+# ListObjectsV2 page is fetched while the workers transform the current one.
+# A key is skipped when its transformed-* output exists (--skip existing) or
+# when the output's recorded source ETag equals the source's (--skip etag, so
+# only changed sources are redone); --skip none redoes everything.
+#
+# After each finished page the last key per partition is written to the
+# checkpoint object, so an interrupted run (or a Lambda that ran out of time)
+# resumes where it stopped; --reset starts over.
+
+BACKFILL_WORKERS = int(os.environ.get('BACKFILL_WORKERS', '32'))
+LIST_WORKERS = int(os.environ.get('BACKFILL_LIST_WORKERS', '4'))
+CHECKPOINT_KEY = os.environ.get('BACKFILL_CHECKPOINT_KEY', 'backfill/checkpoint.json')
+PROGRESS_SECONDS = float(os.environ.get('BACKFILL_PROGRESS_SECONDS', '10'))
+# Stop taking new pages this long before the Lambda timeout
+LAMBDA_SAFETY_SECONDS = 60
+SKIP_MODES = ('existing', 'etag', 'none')
+MAX_REPORTED_FAILURES = 100
+
+PARTITION_DAY = re.compile(r'(?:^|/)dt=(\d{4}-\d{2}-\d{2})/$')
+
+
+def parse_time(value):
+    """ISO date or datetime; naive values are UTC."""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _partition_in_range(partition, since, until):
+    match = PARTITION_DAY.search(partition)
+    if not match:
+        return True
+    day = datetime.strptime(match.group(1), '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    # dt= is the event time; a batch may be flushed into the next day's LastModified
+    return (since is None or day + timedelta(days=2) > since) and (until is None or day < until)
+
+
+def list_partitions(s3, prefix, since=None, until=None):
+    """
+    Units that can be listed independently: every top-level sub-prefix of
+    `prefix` (dt= partitions outside [since, until) left out) and `prefix`
+    itself, delimited, when it holds objects directly.
+    """
+    partitions, loose = [], False
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=BUCKET_NAME, Prefix=prefix, Delimiter='/'):
+        loose = loose or bool(page.get('Contents'))
+        partitions.extend(common['Prefix'] for common in page.get('CommonPrefixes', [])
+                          if _partition_in_range(common['Prefix'], since, until))
+    return ([prefix] if loose else []) + partitions
+
+
+class Checkpoint:
+    """Last finished key per partition, kept in S3 next to the data."""
+
+    def __init__(self, s3, key, params):
+        self.s3 = s3
+        self.key = key
+        self.params = params
+        self.after = {}
+        self.done = set()
+        self.failed = []
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            state = json.loads(self.s3.get_object(Bucket=BUCKET_NAME, Key=self.key)['Body'].read())
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return False
+            raise
+        if state.get('params') != self.params:
+            print(f"Checkpoint s3://{BUCKET_NAME}/{self.key} is for {state.get('params')}; starting over")
+            return False
+        self.after = state.get('after', {})
+        self.done = set(state.get('done', []))
+        self.failed = state.get('failed', [])
+        return True
+
+    def advance(self, partition, key, failed=(), finished=False):
+        with self.lock:
+            if key:
+                self.after[partition] = key
+            if finished:
+                self.done.add(partition)
+            self.failed = (self.failed + list(failed))[-MAX_REPORTED_FAILURES:]
+            body = json.dumps({'params': self.params, 'after': self.after, 'done': sorted(self.done),
+                               'failed': self.failed, 'updatedAt': datetime.now(timezone.utc).isoformat()})
+            self.s3.put_object(Bucket=BUCKET_NAME, Key=self.key, Body=body, ContentType='application/json')
+
+
+class _Progress:
+    def __init__(self):
+        self.counts = {'processed': 0, 'skipped': 0, 'failed': 0}
+        self.started = time.perf_counter()
+        self.reported = self.started
+        self.lock = threading.Lock()
+
+    def add(self, statuses):
+        with self.lock:
+            for status in statuses:
+                self.counts[status] += 1
+            now = time.perf_counter()
+            if now - self.reported >= PROGRESS_SECONDS:
+                self.reported = now
+                print(json.dumps({'progress': self.summary()}))
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.counts.values())
+        return {**self.counts, 'elapsedSeconds': round(elapsed, 1),
+                'objectsPerSecond': round(total / elapsed, 1) if elapsed else 0.0,
+                'processedPerSecond': round(self.counts['processed'] / elapsed, 1) if elapsed else 0.0}
+
+
+def already_transformed(s3, key, etag, skip):
+    """Whether `key` can be skipped under `skip` ('existing' or 'etag')."""
+    try:
+        head = s3.head_object(Bucket=BUCKET_NAME, Key=dest_key_for(key))
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+    if skip == 'existing':
+        return True
+    return head.get('Metadata', {}).get(SOURCE_ETAG_METADATA) == etag.strip('"')
+
+
+def _backfill_object(s3, obj, skip):
+    key = obj['Key']
+    try:
+        if skip != 'none' and already_transformed(s3, key, obj['ETag'], skip):
+            return 'skipped'
+        transform_lambda.handle_s3_record(BUCKET_NAME, key)
+        return 'processed'
+    except Exception as e:
+        print(f"Error backfilling s3://{BUCKET_NAME}/{key}: {e}")
+        return 'failed'
+
+
+def _in_window(obj, since, until):
+    if obj['Key'].endswith('/'):
+        return False
+    modified = obj['LastModified']
+    return (since is None or modified >= since) and (until is None or modified < until)
+
+
+def _backfill_partition(s3, pool, partition, root, since, until, skip, checkpoint, progress, deadline):
+    """List one partition page by page; returns False when stopped by the deadline."""
+    kwargs = {'Bucket': BUCKET_NAME, 'Prefix': partition}
+    if partition == root:
+        kwargs['Delimiter'] = '/'   # loose objects only; sub-prefixes are partitions of their own
+    if checkpoint.after.get(partition):
+        kwargs['StartAfter'] = checkpoint.after[partition]
+
+    def finish(futures, objects, last_key, finished=False):
+        statuses = [future.result() for future in futures]
+        progress.add(statuses)
+        failed = [obj['Key'] for obj, status in zip(objects, statuses) if status == 'failed']
+        checkpoint.advance(partition, last_key, failed, finished)
+
+    previous = None
+    for page in s3.get_paginator('list_objects_v2').paginate(**kwargs):
+        if deadline is not None and time.monotonic() > deadline:
+            if previous:
+                finish(*previous)
+            return False
+        contents = page.get('Contents', [])
+        objects = [obj for obj in contents if _in_window(obj, since, until)]
+        futures = [pool.submit(_backfill_object, s3, obj, skip) for obj in objects]
+        # Wait for the page before while this one runs and the next one is listed
+        if previous:
+            finish(*previous)
+        previous = (futures, objects, contents[-1]['Key'] if contents else None)
+    if previous:
+        finish(*previous, finished=True)
+    else:
+        checkpoint.advance(partition, None, finished=True)
+    return True
+
+
+def run_backfill(since=None, until=None, skip='existing', reset=False, workers=BACKFILL_WORKERS,
+                 checkpoint_key=CHECKPOINT_KEY, deadline=None):
+    """
+    Transform every object under SOURCE_DATA_PREFIX last modified in
+    [since, until) that `skip` does not rule out. Returns the counts, the
+    throughput and whether the run completed (False: stopped at `deadline`,
+    a time.monotonic() value, with the checkpoint saved).
+    """
+    if not BUCKET_NAME:
+        raise RuntimeError('S3_BUCKET_NAME environment variable not set')
+    if skip not in SKIP_MODES:
+        raise ValueError(f"skip must be one of {', '.join(SKIP_MODES)}")
+    # One pooled connection per worker and lister; handle_s3_record uses this client too
+    s3 = boto3.client('s3', config=Config(max_pool_connections=workers + LIST_WORKERS,
+                                          retries={'mode': 'adaptive', 'max_attempts': 10}))
+    transform_lambda.s3_client = s3
+
+    root = SOURCE_DATA_PREFIX.rstrip('/') + '/'
+    params = {'prefix': root, 'since': since.isoformat() if since else None,
+              'until': until.isoformat() if until else None, 'skip': skip}
+    checkpoint = Checkpoint(s3, checkpoint_key, params)
+    if not reset and checkpoint.load():
+        print(f"Resuming: {len(checkpoint.done)} partition(s) done, {len(checkpoint.after)} started")
+
+    partitions = [p for p in list_partitions(s3, root, since, until) if p not in checkpoint.done]
+    print(f"Backfilling {len(partitions)} partition(s) under s3://{BUCKET_NAME}/{root} with {workers} workers")
+    progress = _Progress()
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            ThreadPoolExecutor(max_workers=max(1, min(LIST_WORKERS, len(partitions)))) as listers:
+        listed = [listers.submit(_backfill_partition, s3, pool, partition, root, since, until, skip,
+                                 checkpoint, progress, deadline) for partition in partitions]
+        wait(listed)
+    completed = all(future.result() for future in listed)
+
+    summary = {**progress.summary(), 'complete': completed, 'partitions': len(partitions),
+               'failures': checkpoint.failed, 'checkpoint': f"s3://{BUCKET_NAME}/{checkpoint_key}"}
+    print(json.dumps(summary))
+    return summary
+
+
+def lambda_handler(event, context):
+    """
+    Run a backfill until shortly before the timeout. Invoke again with the same
+    event while the response has "complete": false; each call resumes from the
+    checkpoint. Event: {"since", "until", "skip", "reset"}, all optional.
+    """
+    event = event or {}
+    deadline = None
+    if context is not None:
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - LAMBDA_SAFETY_SECONDS
+    try:
+        return run_backfill(since=parse_time(event.get('since')), until=parse_time(event.get('until')),
+                            skip=event.get('skip', 'existing'), reset=bool(event.get('reset')),
+                            deadline=deadline)
+    except ValueError as e:
+        return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reprocess raw objects through the transform.')
+    parser.add_argument('--since', help='ISO date/datetime (UTC); objects last modified at or after it')
+    parser.add_argument('--until', help='ISO date/datetime (UTC); objects last modified before it')
+    parser.add_argument('--skip', choices=SKIP_MODES, default='existing',
+                        help='existing: output exists; etag: output built from the current source; none: redo all')
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS)
+    parser.add_argument('--checkpoint-key', default=CHECKPOINT_KEY)
+    parser.add_argument('--reset', action='store_true', help='ignore the saved checkpoint')
+    args = parser.parse_args(argv)
+    summary = run_backfill(since=parse_time(args.since), until=parse_time(args.until), skip=args.skip,
+                           reset=args.reset, workers=args.workers, checkpoint_key=args.checkpoint_key)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Streaming JSON array parser of transform_lambda.
+
+    pip install pytest boto3
+    python -m pytest snippets/scheduled_task/tests
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# transform_lambda creates its S3 client at import time
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from transform_lambda import iter_json_array_records  # noqa: E402
+
+
+def _bytewise(text):
+    # One byte per chunk, then the empty read at the end of the body
+    return [bytes([byte]) for byte in text.encode("utf-8")] + [b""]
+
+
+@pytest.mark.parametrize("document", [
+    "[2.5, true]",
+    "[1e-7,-0.25 ,3E+2,null,false,0]",
+    '[12345678901234567890.125, "s", {"a": 1.5}, [2.0, -3]]',
+    "[ ]",
+])
+def test_scalar_arrays_fed_one_byte_at_a_time(document):
+    assert list(iter_json_array_records(_bytewise(document))) == json.loads(document)
+
+
+def test_number_split_across_chunks():
+    assert list(iter_json_array_records(["[2", ".", "5, true]", ""])) == [2.5, True]
+
+
+def test_record_spanning_many_chunks():
+    document = json.dumps([{"k": "x" * 200_000}, 7])
+    chunks = [document[start:start + 4096] for start in range(0, len(document), 4096)]
+    assert list(iter_json_array_records(chunks)) == json.loads(document)
+
+
+@pytest.mark.parametrize("document", ["[1 2]", "[1,2", "[2.", "{}"])
+def test_malformed_arrays_raise(document):
+    with pytest.raises(ValueError):
+        list(iter_json_array_records(_bytewise(document)))
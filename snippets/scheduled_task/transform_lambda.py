@@ -1,44 +1,282 @@
 import json
 import boto3
+import gzip
+import io
 import os
+import re
+import zlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import urllib.parse
-
-# Initialize S3 client only once
-s3_client = boto3.client('s3')
+from botocore.config import Config
 
 # Environment variables
 BUCKET_NAME = os.environ.get('S3_BUCKET_NAME')
 SOURCE_DATA_PREFIX = os.environ.get('SOURCE_DATA_PREFIX', 'raw_data/')
 PROCESSED_DATA_PREFIX = os.environ.get('PROCESSED_DATA_PREFIX', 'processed_data/')
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', '8'))
+# Drop the pretty-printing indent from JSON output
+COMPACT_OUTPUT = os.environ.get('COMPACT_OUTPUT', 'false').lower() == 'true'
+# JSON arrays above this size are streamed instead of loaded whole
+STREAMING_THRESHOLD_BYTES = int(os.environ.get('STREAMING_THRESHOLD_BYTES', str(16 * 1024 * 1024)))
+MULTIPART_PART_SIZE = int(os.environ.get('MULTIPART_PART_SIZE', str(8 * 1024 * 1024)))
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+STREAM_CHUNK_SIZE = 64 * 1024
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl', '.ndjson.gz', '.jsonl.gz')
+# Whitespace and commas between the elements of a streamed array
+_ARRAY_SEPARATORS = re.compile(r'[ \t\r\n,]*')
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+# User metadata on every output: the ETag of the source it was built from (read by backfill.py)
+SOURCE_ETAG_METADATA = 'source-etag'
+
+# Initialize S3 client only once; clients are thread safe, so the worker pool shares it
+s3_client = boto3.client('s3', config=Config(max_pool_connections=max(MAX_WORKERS, 10)))
+
+def transform_record(data: dict, processing_timestamp: str) -> dict:
+    """
+    Apply the transform to one record in place: stamp it as processed,
+    upper-case payload.value2 and add items_count / items_sum.
+    """
+    data['processingTimestamp'] = processing_timestamp
+    data['status'] = 'processed'
+
+    payload = data.get('payload', {})
+    if 'value2' in payload:
+        payload['value2'] = payload['value2'].upper()
+    if isinstance(payload.get('items'), list):
+        payload['items_count'] = len(payload['items'])
+        payload['items_sum'] = sum(payload['items'])
+    return data
+
+def _dumps(data) -> str:
+    if COMPACT_OUTPUT:
+        return json.dumps(data, separators=(',', ':'))
+    return json.dumps(data, indent=2)
+
+class MultipartUploadWriter:
+    """
+    File-like sink that uploads to S3 in fixed-size parts, so only one part is
+    ever held in memory. Small outputs fall back to a single put_object.
+    """
+
+    def __init__(self, bucket: str, key: str, content_type: str, part_size: int = None,
+                 content_encoding: str = None, metadata: dict = None):
+        self.bucket = bucket
+        self.key = key
+        self.extra_args = {'ContentType': content_type}
+        if content_encoding:
+            self.extra_args['ContentEncoding'] = content_encoding
+        if metadata:
+            self.extra_args['Metadata'] = metadata
+        self.part_size = max(part_size or MULTIPART_PART_SIZE, MIN_PART_SIZE)
+        self.buffer = bytearray()
+        self.parts = []
+        self.upload_id = None
+
+    def write(self, data: bytes):
+        self.buffer += data
+        if len(self.buffer) >= self.part_size:
+            self._upload_part()
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            self.upload_id = s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.extra_args)['UploadId']
+        part_number = len(self.parts) + 1
+        response = s3_client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=bytes(self.buffer))
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buffer = bytearray()
+
+    def close(self):
+        if self.upload_id is None:
+            s3_client.put_object(Bucket=self.bucket, Key=self.key,
+                                 Body=bytes(self.buffer), **self.extra_args)
+            return
+        if self.buffer:
+            self._upload_part()
+        s3_client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts})
+
+    def abort(self):
+        if self.upload_id is not None:
+            s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+def iter_ndjson_records(lines):
+    """Yield one parsed record per non-blank line of an NDJSON / JSON Lines stream."""
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+class _GzipSink:
+    """Compress on the fly in front of a MultipartUploadWriter."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+
+    def write(self, data: bytes):
+        self.writer.write(self.compressor.compress(data))
+
+    def finish(self):
+        self.writer.write(self.compressor.flush())
+
+def iter_json_array_records(chunks):
+    """
+    Yield the elements of a top-level JSON array incrementally; only the
+    element being decoded (plus the chunks read for it) is held in memory.
+    A record spanning many chunks is decoded again only once twice as much of
+    it is buffered, so its cost stays linear in its size.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, started, exhausted = '', 0, False, False
+    # Chunks read since the last decode attempt, joined onto the buffer for the next one
+    pending, pending_size, needed = [], 0, 0
+    chunks = iter(chunks)
+    while True:
+        if pending and (exhausted or len(buffer) - pos + pending_size >= needed):
+            buffer = buffer[pos:] + ''.join(pending)
+            pos, pending, pending_size = 0, [], 0
+        pos = _ARRAY_SEPARATORS.match(buffer, pos).end()
+        if not started and pos < len(buffer):
+            if buffer[pos] != '[':
+                raise ValueError('Expected a JSON array')
+            pos, started = pos + 1, True
+            continue
+        if started and buffer.startswith(']', pos):
+            return
+        if pos < len(buffer) and not pending:
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            else:
+                # Only a separator proves the value complete: '2' may be the start of '2.5'
+                follow = _WHITESPACE.match(buffer, end).end()
+                if buffer.startswith((',', ']'), follow):
+                    yield record
+                    pos, needed = end, 0
+                    continue
+                if exhausted and follow < len(buffer):
+                    raise ValueError('Expected , or ] after an array element')
+            needed = 2 * (len(buffer) - pos)
+        if exhausted:
+            # The closing bracket returns above; an empty stream holds no array at all
+            if started or buffer[pos:].strip():
+                raise ValueError('Truncated JSON array')
+            return
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+        else:
+            pending.append(chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk)
+            pending_size += len(pending[-1])
+
+def _utf8_chunks(body):
+    # Decode incrementally so multi-byte characters split across chunks survive
+    import codecs
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in body.iter_chunks(chunk_size=STREAM_CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+def _source_metadata(obj) -> dict:
+    return {SOURCE_ETAG_METADATA: obj.get('ETag', '').strip('"')} if obj.get('ETag') else {}
+
+def _stream_transform(obj, source_key: str, dest_key: str):
+    """Streaming path: transform record by record straight into a multipart upload."""
+    timestamp = datetime.now().isoformat()
+    metadata = _source_metadata(obj)
+    count = 0
+    if source_key.endswith(NDJSON_SUFFIXES):
+        # Micro-batched objects from the uploader may be gzip NDJSON; keep the encoding on output
+        compressed = source_key.endswith('.gz')
+        if compressed:
+            lines = io.BufferedReader(gzip.GzipFile(fileobj=obj['Body']), buffer_size=STREAM_CHUNK_SIZE)
+        else:
+            lines = obj['Body'].iter_lines(chunk_size=STREAM_CHUNK_SIZE)
+        with MultipartUploadWriter(BUCKET_NAME, dest_key, 'application/x-ndjson',
+                                   content_encoding='gzip' if compressed else None,
+                                   metadata=metadata) as writer:
+            sink = _GzipSink(writer) if compressed else writer
+            for record in iter_ndjson_records(lines):
+                # NDJSON output is always one compact record per line
+                sink.write((json.dumps(transform_record(record, timestamp), separators=(',', ':')) + '\n').encode('utf-8'))
+                count += 1
+            if compressed:
+                sink.finish()
+    else:
+        with MultipartUploadWriter(BUCKET_NAME, dest_key, 'application/json', metadata=metadata) as writer:
+            writer.write(b'[')
+            for record in iter_json_array_records(_utf8_chunks(obj['Body'])):
+                writer.write(((',\n' if count else '\n') + _dumps(transform_record(record, timestamp))).encode('utf-8'))
+                count += 1
+            writer.write(b'\n]\n')
+    return count
+
+def dest_key_for(source_key: str) -> str:
+    """
+    processed_data/[<partitions>/]transformed-<filename>; dt=/hour= partitions
+    written by the batching uploader are kept.
+    """
+    prefix = SOURCE_DATA_PREFIX.rstrip('/') + '/'
+    relative = source_key[len(prefix):] if source_key.startswith(prefix) else source_key.split('/')[-1]
+    directory, _, filename = relative.rpartition('/')
+    directory = f"{directory}/" if directory else ''
+    return f"{PROCESSED_DATA_PREFIX.rstrip('/')}/{directory}transformed-{filename}"
 
 def handle_s3_record(source_bucket: str, source_key: str):
     """
     Download JSON from S3, transform it, and upload to the processed prefix.
+    NDJSON / JSON Lines objects and JSON arrays larger than
+    STREAMING_THRESHOLD_BYTES are streamed record by record through a
+    multipart upload, so memory stays flat regardless of object size;
+    smaller arrays are transformed element by element in memory. The output carries the source's ETag as SOURCE_ETAG_METADATA.
     """
+    dest_key = dest_key_for(source_key)
+
     # Download
     print(f"Downloading object: s3://{source_bucket}/{source_key}")
     obj = s3_client.get_object(Bucket=source_bucket, Key=source_key)
-    body = obj['Body'].read().decode('utf-8')
-    data = json.loads(body)
 
-    # Transform
-    transformed = data.copy()
-    transformed['processingTimestamp'] = datetime.now().isoformat()
-    transformed['status'] = 'processed'
+    streamable = source_key.endswith(NDJSON_SUFFIXES)
+    if not streamable and obj['ContentLength'] > STREAMING_THRESHOLD_BYTES:
+        # Only a top-level array can be split into records; peek at the first byte
+        first = obj['Body'].read(1)
+        while first.isspace():
+            first = obj['Body'].read(1)
+        obj['Body'] = _Prefixed(first, obj['Body'])
+        streamable = first == b'['
 
-    payload = transformed.get('payload', {})
-    if 'value2' in payload:
-        payload['value2'] = payload['value2'].upper()
-    if isinstance(payload.get('items'), list):
-        payload['items_count'] = len(payload['items'])
-        payload['items_sum'] = sum(payload['items'])
+    if streamable:
+        print(f"Streaming transform to s3://{BUCKET_NAME}/{dest_key}")
+        count = _stream_transform(obj, source_key, dest_key)
+        print(f"✅ Finished streaming {count} record(s) to {dest_key}")
+        return
 
-    out_body = json.dumps(transformed, indent=2)
+    data = json.loads(obj['Body'].read().decode('utf-8'))
 
-    # Compute destination key
-    filename = source_key.split('/')[-1]
-    dest_key = f"{PROCESSED_DATA_PREFIX.rstrip('/')}/transformed-{filename}"
+    # Transform (a top-level array record by record, as the streaming path does)
+    timestamp = datetime.now().isoformat()
+    if isinstance(data, list):
+        transformed = [transform_record(record, timestamp) for record in data]
+    else:
+        transformed = transform_record(data, timestamp)
+    out_body = _dumps(transformed)
 
     # Upload
     print(f"Uploading transformed data to s3://{BUCKET_NAME}/{dest_key}")
@@ -46,14 +284,84 @@ def handle_s3_record(source_bucket: str, source_key: str):
         Bucket=BUCKET_NAME,
         Key=dest_key,
         Body=out_body,
-        ContentType='application/json'
+        ContentType='application/json',
+        Metadata=_source_metadata(obj)
     )
     print(f"✅ Finished transforming and uploaded {dest_key}")
 
+class _Prefixed:
+    """Re-attach bytes already consumed from a StreamingBody."""
+
+    def __init__(self, prefix: bytes, body):
+        self.prefix = prefix
+        self.body = body
+
+    def read(self, amt=None):
+        data = self.prefix + self.body.read(amt)
+        self.prefix = b''
+        return data
+
+    def iter_chunks(self, chunk_size=STREAM_CHUNK_SIZE):
+        if self.prefix:
+            yield self.prefix
+            self.prefix = b''
+        yield from self.body.iter_chunks(chunk_size=chunk_size)
+
+def extract_s3_objects(event):
+    """
+    Return (item_id, bucket, key) for every object in the event. Supports
+    native S3 notifications, SQS messages wrapping S3 notifications (item_id
+    is the SQS messageId) and EventBridge "Object Created" events.
+    Raises ValueError for an unrecognized event shape.
+    """
+    objects = []
+    # 1) EventBridge S3 event (detail.bucket & detail.object)
+    if 'detail' in event and 'bucket' in event['detail']:
+        det = event['detail']
+        key = urllib.parse.unquote_plus(det['object']['key'], encoding='utf-8')
+        return [(key, det['bucket']['name'], key)]
+
+    if not event.get('Records'):
+        raise ValueError('Bad event format')
+
+    for record in event['Records']:
+        # 2) Native S3 event (Records[].s3)
+        if record.get('s3'):
+            key = urllib.parse.unquote_plus(record['s3']['object']['key'], encoding='utf-8')
+            objects.append((key, record['s3']['bucket']['name'], key))
+        # 3) SQS message whose body is an S3 notification
+        elif record.get('eventSource') == 'aws:sqs':
+            body = json.loads(record['body'])
+            for inner in body.get('Records', []):  # s3:TestEvent messages have none
+                key = urllib.parse.unquote_plus(inner['s3']['object']['key'], encoding='utf-8')
+                objects.append((record['messageId'], inner['s3']['bucket']['name'], key))
+        else:
+            raise ValueError('Bad event format')
+    return objects
+
+def _process_object(bucket: str, key: str):
+    """Transform one object; returns (status, elapsed_ms, error)."""
+    started = time.perf_counter()
+    # Only process files under your raw_data/ prefix
+    prefix = SOURCE_DATA_PREFIX.rstrip('/')
+    if not key.startswith(prefix):
+        print(f"Skipping {key}; does not start with prefix '{prefix}'.")
+        return 'skipped', (time.perf_counter() - started) * 1000, None
+    try:
+        handle_s3_record(bucket, key)
+        status, error = 'processed', None
+    except Exception as e:
+        print(f"Error processing s3://{bucket}/{key}: {e}")
+        status, error = 'failed', str(e)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(json.dumps({'key': key, 'status': status, 'latencyMs': round(elapsed_ms, 1)}))
+    return status, elapsed_ms, error
+
 def lambda_handler(event, context):
     """
-    Lambda entrypoint: detect event shape, extract bucket & key,
-    and invoke handle_s3_record if prefix matches.
+    Lambda entrypoint: extract every bucket & key in the event and transform
+    them concurrently on a bounded thread pool. Failed SQS messages are
+    returned in batchItemFailures so only they are retried.
     """
     if not BUCKET_NAME:
         msg = "Error: S3_BUCKET_NAME environment variable not set."
@@ -61,34 +369,32 @@ def lambda_handler(event, context):
         return {'statusCode': 500, 'body': json.dumps({'error': msg})}
 
     try:
-        # 1) Native S3 event (Records[].s3)
-        if 'Records' in event and event['Records'][0].get('s3'):
-            rec = event['Records'][0]['s3']
-            bucket = rec['bucket']['name']
-            key = urllib.parse.unquote_plus(rec['object']['key'], encoding='utf-8')
-        # 2) EventBridge S3 event (detail.bucket & detail.object)
-        elif 'detail' in event and 'bucket' in event['detail']:
-            det = event['detail']
-            bucket = det['bucket']['name']
-            key = urllib.parse.unquote_plus(det['object']['key'], encoding='utf-8')
-        else:
-            print("❌ Unrecognized event format:")
-            print(json.dumps(event))
-            return {'statusCode': 400, 'body': json.dumps({'error': 'Bad event format'})}
+        objects = extract_s3_objects(event)
+    except (ValueError, KeyError, TypeError):
+        print("❌ Unrecognized event format:")
+        print(json.dumps(event))
+        return {'statusCode': 400, 'body': json.dumps({'error': 'Bad event format'})}
 
-        print(f"Received event for bucket={bucket}, key={key}")
+    print(f"Received event with {len(objects)} object(s)")
 
-        # Only process files under your raw_data/ prefix
-        prefix = SOURCE_DATA_PREFIX.rstrip('/')
-        if not key.startswith(prefix):
-            print(f"Skipping {key}; does not start with prefix '{prefix}'.")
-            return {'statusCode': 200, 'body': json.dumps({'message': 'Skipped'})}
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(objects)))) as executor:
+        results = list(executor.map(lambda obj: _process_object(obj[1], obj[2]), objects))
 
-        # Delegate to handler
-        handle_s3_record(bucket, key)
-        return {'statusCode': 200, 'body': json.dumps({'message': 'Success'})}
+    summary = {'processed': 0, 'skipped': 0, 'failed': 0}
+    failed_ids, failures, timings = [], [], []
+    for (item_id, bucket, key), (status, elapsed_ms, error) in zip(objects, results):
+        summary[status] += 1
+        timings.append({'key': key, 'status': status, 'latencyMs': round(elapsed_ms, 1)})
+        if status == 'failed':
+            failures.append({'key': key, 'error': error})
+            if item_id not in failed_ids:
+                failed_ids.append(item_id)
 
-    except Exception as e:
-        print(f"Error processing S3 event: {e}")
-        print("Full event:", json.dumps(event))
-        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+    body = {'message': 'Success' if not failures else 'Partial failure', **summary,
+            'failures': failures, 'timings': timings}
+    return {
+        'statusCode': 200 if not failures else 500,
+        'body': json.dumps(body),
+        # Honoured by SQS event source mappings with ReportBatchItemFailures
+        'batchItemFailures': [{'itemIdentifier': item_id} for item_id in failed_ids],
+    }
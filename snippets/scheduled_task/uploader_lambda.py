@@ -1,40 +1,196 @@
 import json
 import boto3
+import gzip
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 import uuid
 
 s3_client = boto3.client('s3')
+sqs_client = boto3.client('sqs')
 
 # Environment variables from SAM template
 BUCKET_NAME = os.environ.get('S3_BUCKET_NAME')
 SOURCE_DATA_PREFIX = os.environ.get('SOURCE_DATA_PREFIX', 'raw_data/')
+# Batching: many events per NDJSON object instead of one JSON file per event.
+# Producers (and the schedule) send events to EVENT_QUEUE_URL; the queue's event
+# source mapping hands them over in batches of up to BatchSize messages or
+# MaximumBatchingWindowInSeconds, and each batch becomes one object.
+# BATCH_MAX_EVENTS caps the events per object (larger lists are split).
+BATCH_MODE = os.environ.get('BATCH_MODE', 'false').lower() == 'true'
+BATCH_MAX_EVENTS = int(os.environ.get('BATCH_MAX_EVENTS', '1000'))
+EVENT_QUEUE_URL = os.environ.get('EVENT_QUEUE_URL')
+GZIP_OUTPUT = os.environ.get('GZIP_OUTPUT', 'false').lower() == 'true'
+SQS_SEND_BATCH = 10
+
+def generate_sample_event(current_time=None):
+    current_time = current_time or datetime.now()
+    return {
+        "eventId": str(uuid.uuid4()),
+        "timestamp": current_time.isoformat(),
+        "source": "DataUploaderLambda",
+        "payload": {
+            "value1": 123.45,
+            "value2": "example_string",
+            "items": [1, 2, 3, 4, 5],
+            "metadata": {"version": "1.0", "status": "new"}
+        }
+    }
+
+class EventBatcher:
+    """
+    Accumulates events and writes them as one NDJSON object (optionally gzip)
+    once max_events are buffered or on flush(). How long events wait is up to
+    the source: the SQS batching window, or the caller's list.
+    Keys are time partitioned: <prefix>/dt=YYYY-MM-DD/hour=HH/<file>.
+    """
+
+    def __init__(self, bucket, prefix, max_events=BATCH_MAX_EVENTS, compress=GZIP_OUTPUT):
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/')
+        self.max_events = max_events
+        self.compress = compress
+        self.lines = []
+        self.keys = []
+
+    def add(self, event):
+        self.lines.append(json.dumps(event, separators=(',', ':')))
+        if len(self.lines) >= self.max_events:
+            self.flush()
+
+    def flush(self):
+        if not self.lines:
+            return None
+        now = datetime.now(timezone.utc)
+        file_name = f"{now.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4()}.ndjson"
+        s3_key = f"{self.prefix}/dt={now.strftime('%Y-%m-%d')}/hour={now.strftime('%H')}/{file_name}"
+        body = ('\n'.join(self.lines) + '\n').encode('utf-8')
+        extra = {}
+        if self.compress:
+            body = gzip.compress(body)
+            s3_key += '.gz'
+            extra['ContentEncoding'] = 'gzip'
+
+        print(f"Uploading batch of {len(self.lines)} events to S3 Bucket: {self.bucket}, Key: {s3_key}")
+        s3_client.put_object(
+            Bucket=self.bucket,
+            Key=s3_key,
+            Body=body,
+            ContentType='application/x-ndjson',
+            **extra
+        )
+        self.keys.append(s3_key)
+        self.lines = []
+        return s3_key
+
+def _sample_count(event):
+    # One sample per scheduled tick, as without batching; {"samples": N} asks for more
+    count = event.get('samples', 1) if isinstance(event, dict) else 1
+    if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+        raise ValueError("samples must be a positive integer")
+    return count
+
+def enqueue_events(events):
+    """Send events to EVENT_QUEUE_URL, 10 per SendMessageBatch. Returns the number not sent."""
+    failed = 0
+    for start in range(0, len(events), SQS_SEND_BATCH):
+        entries = [{'Id': str(index), 'MessageBody': json.dumps(item, separators=(',', ':'))}
+                   for index, item in enumerate(events[start:start + SQS_SEND_BATCH])]
+        response = sqs_client.send_message_batch(QueueUrl=EVENT_QUEUE_URL, Entries=entries)
+        for failure in response.get('Failed', []):
+            print(f"Event not queued: {failure.get('Code')} {failure.get('Message')}")
+        failed += len(response.get('Failed', []))
+    return failed
+
+def write_queued_events(records):
+    """
+    Write an SQS batch as NDJSON objects of up to BATCH_MAX_EVENTS events.
+    Returns the batch item failures: malformed messages and the messages of
+    any object that could not be written.
+    """
+    events, message_ids, failed = [], [], []
+    for record in records:
+        try:
+            events.append(json.loads(record['body']))
+            message_ids.append(record['messageId'])
+        except (KeyError, TypeError, ValueError):
+            print(f"Malformed event message (messageId {record.get('messageId')})")
+            failed.append(record.get('messageId'))
+
+    batcher = EventBatcher(BUCKET_NAME, SOURCE_DATA_PREFIX)
+    for start in range(0, len(events), batcher.max_events):
+        chunk = events[start:start + batcher.max_events]
+        try:
+            for item in chunk:
+                batcher.add(item)
+            batcher.flush()
+        except Exception as e:
+            print(f"Error uploading data batch: {e}")
+            batcher.lines = []
+            failed += message_ids[start:start + len(chunk)]
+    return [{'itemIdentifier': message_id} for message_id in failed]
 
 def lambda_handler(event, context):
     """
     Generates sample data and uploads it to S3.
     Triggered by EventBridge schedule.
+    With BATCH_MODE the scheduled samples ({"samples": N} for more than one)
+    are sent to EVENT_QUEUE_URL, and the queue's batches (SQS Records) are
+    written as one NDJSON object each. An {"events": [...]} list is written
+    as-is, as are the samples when no queue is configured.
     """
     if not BUCKET_NAME:
         print("Error: S3_BUCKET_NAME environment variable not set.")
         return {'statusCode': 500, 'body': json.dumps({'error': 'S3_BUCKET_NAME not configured'})}
 
+    if BATCH_MODE:
+        if isinstance(event, dict) and event.get('Records'):
+            # Failures are retried by SQS, then go to the dead-letter queue
+            return {'batchItemFailures': write_queued_events(event['Records'])}
+
+        try:
+            if isinstance(event, dict) and isinstance(event.get('events'), list):
+                events = event['events']
+            else:
+                try:
+                    count = _sample_count(event)
+                except ValueError as e:
+                    return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
+                events = [generate_sample_event() for _ in range(count)]
+                if EVENT_QUEUE_URL:
+                    failed = enqueue_events(events)
+                    return {
+                        'statusCode': 500 if failed else 200,
+                        'body': json.dumps({
+                            'message': 'Events queued' if not failed else 'Some events were not queued',
+                            'queued': len(events) - failed,
+                            'failed': failed
+                        })
+                    }
+            batcher = EventBatcher(BUCKET_NAME, SOURCE_DATA_PREFIX)
+            for item in events:
+                batcher.add(item)
+            batcher.flush()
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Data uploaded successfully!',
+                    'bucket': BUCKET_NAME,
+                    'events': len(events),
+                    'keys': batcher.keys
+                })
+            }
+        except Exception as e:
+            print(f"Error uploading data batch: {e}")
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': str(e)})
+            }
+
     try:
         # Generate some sample data
         current_time = datetime.now()
-        data_id = str(uuid.uuid4())
-        
-        sample_data = {
-            "eventId": data_id,
-            "timestamp": current_time.isoformat(),
-            "source": "DataUploaderLambda",
-            "payload": {
-                "value1": 123.45,
-                "value2": "example_string",
-                "items": [1, 2, 3, 4, 5],
-                "metadata": {"version": "1.0", "status": "new"}
-            }
-        }
+        sample_data = generate_sample_event(current_time)
+        data_id = sample_data["eventId"]
         
         file_content = json.dumps(sample_data, indent=2)
         
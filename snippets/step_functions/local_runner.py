@@ -0,0 +1,415 @@
+"""
+Runs the state machines of template.yaml locally, to compare the variants
+without deploying them. A small interpreter for the part of the Amazon States
+Language they use (Task, Choice, Wait, Pass, Succeed, Fail and Map, inline or
+distributed with an ItemBatcher) executes the inline Lambda code of the
+template against an in-memory DynamoDB table:
+
+    pip install pyyaml
+    python local_runner.py --orders 500
+    python local_runner.py --orders 100 --hold-seconds 2 --variants standard express
+
+Every variant processes the same orders, with at most --concurrency Lambda
+invocations in flight:
+
+* standard - PaymentStateMachine: one execution per order, create, hold and
+             accept as three tasks; --concurrency executions at a time
+* express  - ExpressPaymentStateMachine: --express-batch orders per execution,
+             an inline Map; hold and accept are one SettlePayment call unless
+             --hold-seconds asks for the wait between them
+* batch    - BatchPaymentStateMachine: one execution; a Distributed Map hands
+             MapBatchSize orders to each Express child execution, which settles
+             them with one BatchPayment call
+
+Latency is simulated by sleeping: --lambda-ms per invocation, --dynamodb-ms
+per DynamoDB request and a per-transition cost for each workflow type. These
+are assumptions to adjust, not measurements. A Wait state sleeps its seconds
+times --wait-scale. The Step Functions cost per million orders uses the
+us-east-1 list prices below: Standard is billed per state transition, Express
+per execution and per 64 MB x 100 ms of duration (here the simulated duration).
+"""
+import argparse
+import copy
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template.yaml')
+LAMBDA_ARN = 'arn:aws:lambda:local:000000000000:function:{}'
+
+STANDARD_PRICE_PER_TRANSITION = 0.025 / 1000
+EXPRESS_PRICE_PER_EXECUTION = 1.00 / 1_000_000
+EXPRESS_PRICE_PER_64MB_100MS = 0.00001667 / 16 / 10   # $ per GB-second, in 64 MB x 100 ms units
+
+VARIANTS = {
+    'standard': 'PaymentStateMachine',
+    'express': 'ExpressPaymentStateMachine',
+    'batch': 'BatchPaymentStateMachine',
+}
+
+
+class _Loader(yaml.SafeLoader):
+    pass
+
+
+# CloudFormation short forms (!Ref, !Sub, !GetAtt) load as {"Ref": ...} and so on
+_Loader.add_multi_constructor('!', lambda loader, tag, node: {tag: (
+    loader.construct_scalar(node) if isinstance(node, yaml.ScalarNode) else loader.construct_sequence(node))})
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {'executions': 0, 'standardTransitions': 0, 'expressExecutions': 0,
+                       'express100msUnits': 0, 'lambdaInvocations': 0, 'dynamodbRequests': 0}
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                self.counts[name] += value
+
+
+class FakeTable:
+    """The Table calls the inline Lambdas make, on a dict; every request sleeps `latency`."""
+
+    def __init__(self, store, stats, latency):
+        self.store = store
+        self.stats = stats
+        self.latency = latency
+        self.lock = threading.Lock()
+
+    def _request(self):
+        self.stats.add(dynamodbRequests=1)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put_item(self, Item):
+        self._request()
+        with self.lock:
+            self.store[Item['orderId']] = dict(Item)
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                    **kwargs):
+        self._request()
+        names, values = ExpressionAttributeNames or {}, ExpressionAttributeValues or {}
+        assignments = UpdateExpression.strip()
+        if not assignments.upper().startswith('SET '):
+            raise NotImplementedError(UpdateExpression)
+        with self.lock:
+            item = self.store.setdefault(Key['orderId'], dict(Key))
+            for assignment in assignments[4:].split(','):
+                name, value = (part.strip() for part in assignment.split('='))
+                item[names.get(name, name)] = values[value]
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _BatchWriter(self)
+
+
+class _BatchWriter:
+    def __init__(self, table):
+        self.table = table
+        self.items = []
+
+    def put_item(self, Item):
+        self.items.append(dict(Item))
+        if len(self.items) == 25:
+            self._flush()
+
+    def _flush(self):
+        if self.items:
+            self.table._request()
+            with self.table.lock:
+                self.table.store.update((item['orderId'], item) for item in self.items)
+            self.items = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._flush()
+
+
+def _fake_boto3(table):
+    module = types.ModuleType('boto3')
+    module.resource = lambda service, **kwargs: types.SimpleNamespace(Table=lambda name: table)
+    return module
+
+
+def _resolve(value, parameters):
+    if isinstance(value, dict) and 'Ref' in value:
+        return parameters[value['Ref']]
+    return value
+
+
+def load_template(parameters):
+    with open(TEMPLATE) as f:
+        template = yaml.load(f, Loader=_Loader)
+    defaults = {name: str(spec.get('Default')) for name, spec in template['Parameters'].items()}
+    return template, {**defaults, **{name: str(value) for name, value in parameters.items()}}
+
+
+def load_functions(template, parameters, table):
+    """{Lambda ARN: handler} for every inline function, importing its code against `table`."""
+    functions = {}
+    real_boto3 = sys.modules.get('boto3')
+    sys.modules['boto3'] = _fake_boto3(table)
+    try:
+        for name, resource in template['Resources'].items():
+            if resource['Type'] != 'AWS::Lambda::Function':
+                continue
+            properties = resource['Properties']
+            variables = properties.get('Environment', {}).get('Variables', {})
+            os.environ.update({key: _resolve(value, parameters) for key, value in variables.items()})
+            namespace = {'__name__': f'index_{name}'}
+            exec(compile(properties['Code']['ZipFile'], f'{name}/index.py', 'exec'), namespace)
+            functions[LAMBDA_ARN.format(name)] = namespace[properties['Handler'].split('.')[1]]
+    finally:
+        if real_boto3 is None:
+            sys.modules.pop('boto3')
+        else:
+            sys.modules['boto3'] = real_boto3
+    return functions
+
+
+def load_definition(template, name, parameters):
+    text = template['Resources'][name]['Properties']['DefinitionString']['Sub']
+
+    def substitute(match):
+        reference = match.group(1)
+        if reference.endswith('.Arn'):
+            return LAMBDA_ARN.format(reference[:-4])
+        return parameters[reference]
+
+    definition = json.loads(re.sub(r'\$\{([^}]+)\}', substitute, text))
+    execution_type = template['Resources'][name]['Properties'].get('StateMachineType', 'STANDARD')
+    return definition, execution_type
+
+
+def _path(data, path, context=None):
+    if path.startswith('$$'):
+        data, path = context, path[1:]
+    value = data
+    for part in path[2:].split('.') if path != '$' else ():
+        value = value[part]
+    return value
+
+
+def _with_result(data, result_path, result):
+    if result_path is None:
+        return data
+    if result_path == '$':
+        return result
+    data = copy.copy(data)
+    target, parts = data, result_path[2:].split('.')
+    for part in parts[:-1]:
+        target[part] = dict(target.get(part) or {})
+        target = target[part]
+    target[parts[-1]] = result
+    return data
+
+
+def _select(template, data, context):
+    """Parameters / ItemSelector: keys ending in .$ are paths into the input or ($$) the context."""
+    if isinstance(template, dict):
+        return {key[:-2] if key.endswith('.$') else key:
+                _path(data, value, context) if key.endswith('.$') else _select(value, data, context)
+                for key, value in template.items()}
+    if isinstance(template, list):
+        return [_select(value, data, context) for value in template]
+    return template
+
+
+_COMPARISONS = {
+    'NumericGreaterThan': lambda a, b: a > b,
+    'NumericLessThan': lambda a, b: a < b,
+    'NumericEquals': lambda a, b: a == b,
+    'StringEquals': lambda a, b: a == b,
+    'BooleanEquals': lambda a, b: a == b,
+}
+
+
+def _matches(rule, data):
+    if 'And' in rule:
+        return all(_matches(r, data) for r in rule['And'])
+    if 'Or' in rule:
+        return any(_matches(r, data) for r in rule['Or'])
+    if 'Not' in rule:
+        return not _matches(rule['Not'], data)
+    try:
+        value = _path(data, rule['Variable'])
+    except (KeyError, TypeError):
+        return rule.get('IsPresent') is False
+    if 'IsPresent' in rule:
+        return rule['IsPresent']
+    for name, compare in _COMPARISONS.items():
+        if name in rule:
+            return compare(value, rule[name])
+    raise NotImplementedError(f'Choice rule {rule}')
+
+
+class Interpreter:
+    def __init__(self, functions, stats, args):
+        self.functions = functions
+        self.stats = stats
+        self.lambda_seconds = args.lambda_ms / 1000
+        self.transition_seconds = {'STANDARD': args.standard_transition_ms / 1000,
+                                   'EXPRESS': args.express_transition_ms / 1000}
+        self.wait_scale = args.wait_scale
+
+    def execute(self, definition, data, execution_type):
+        """One execution: returns its output."""
+        start = time.perf_counter()
+        execution = {'type': execution_type, 'transitions': 0, 'lock': threading.Lock()}
+        output = self._run(definition, data, execution, {})
+        if execution_type == 'EXPRESS':
+            units = math.ceil((time.perf_counter() - start) / 0.1)
+            self.stats.add(executions=1, expressExecutions=1, express100msUnits=units)
+        else:
+            self.stats.add(executions=1, standardTransitions=execution['transitions'])
+        return output
+
+    def _run(self, machine, data, execution, context):
+        name = machine['StartAt']
+        while True:
+            state = machine['States'][name]
+            with execution['lock']:
+                execution['transitions'] += 1
+            if self.transition_seconds[execution['type']]:
+                time.sleep(self.transition_seconds[execution['type']])
+            data, next_name = self._state(name, state, data, execution, {**context, 'State': {'Name': name}})
+            if next_name is None:
+                return data
+            name = next_name
+
+    def _next(self, state):
+        return None if state.get('End') else state['Next']
+
+    def _state(self, name, state, data, execution, context):
+        kind = state['Type']
+        if kind == 'Task':
+            payload = _select(state['Parameters'], data, context) if 'Parameters' in state else data
+            result = self._invoke(state['Resource'], payload)
+            return _with_result(data, state.get('ResultPath', '$'), result), self._next(state)
+        if kind == 'Choice':
+            for rule in state['Choices']:
+                if _matches(rule, data):
+                    return data, rule['Next']
+            return data, state['Default']
+        if kind == 'Wait':
+            seconds = state['Seconds'] if 'Seconds' in state else _path(data, state['SecondsPath'])
+            time.sleep(seconds * self.wait_scale)
+            return data, self._next(state)
+        if kind == 'Map':
+            result = self._map(state, data, execution, context)
+            return _with_result(data, state.get('ResultPath', '$'), result), self._next(state)
+        if kind == 'Pass':
+            return _with_result(data, state.get('ResultPath', '$'), state.get('Result', data)), self._next(state)
+        if kind == 'Succeed':
+            return data, None
+        if kind == 'Fail':
+            raise RuntimeError(f"{name}: {state.get('Error')} {state.get('Cause', '')}")
+        raise NotImplementedError(f'{kind} state {name}')
+
+    def _invoke(self, arn, payload):
+        self.stats.add(lambdaInvocations=1)
+        if self.lambda_seconds:
+            time.sleep(self.lambda_seconds)
+        # Through JSON, as Lambda hands the payload over
+        return json.loads(json.dumps(self.functions[arn](json.loads(json.dumps(payload)), None)))
+
+    def _map(self, state, data, execution, context):
+        items = _path(data, state.get('ItemsPath', '$'))
+        processor = state['ItemProcessor']
+        config = processor.get('ProcessorConfig', {})
+        batcher = state.get('ItemBatcher')
+        if batcher:
+            size = batcher['MaxItemsPerBatch']
+            inputs = [{'Items': items[start:start + size]} for start in range(0, len(items), size)]
+        else:
+            inputs = [_select(state['ItemSelector'], data, {**context, 'Map': {'Item': {'Index': index, 'Value': item}}})
+                      if 'ItemSelector' in state else item for index, item in enumerate(items)]
+
+        if config.get('Mode') == 'DISTRIBUTED':
+            # Each iteration is a child execution; the parent pays one transition per child started
+            child_type = config.get('ExecutionType', 'STANDARD')
+            with execution['lock']:
+                execution['transitions'] += len(inputs)
+
+            def iterate(item):
+                return self.execute(processor, item, child_type)
+        else:
+            def iterate(item):
+                return self._run(processor, item, execution, context)
+
+        concurrency = state.get('MaxConcurrency') or len(inputs) or 1
+        with ThreadPoolExecutor(max_workers=min(concurrency, max(len(inputs), 1))) as pool:
+            return list(pool.map(iterate, inputs))
+
+
+def run_variant(variant, template, parameters, args):
+    store, stats = {}, Stats()
+    table = FakeTable(store, stats, args.dynamodb_ms / 1000)
+    interpreter = Interpreter(load_functions(template, parameters, table), stats, args)
+    definition, execution_type = load_definition(template, VARIANTS[variant], parameters)
+    order_ids = [f'{variant}-{index:06d}' for index in range(args.orders)]
+
+    start = time.perf_counter()
+    if variant == 'standard':
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(lambda order_id: interpreter.execute(definition, {'orderId': order_id}, execution_type),
+                          order_ids))
+    elif variant == 'express':
+        batches = [order_ids[i:i + args.express_batch] for i in range(0, len(order_ids), args.express_batch)]
+        for batch in batches:
+            interpreter.execute(definition, {'orderIds': batch, 'holdSeconds': args.hold_seconds}, execution_type)
+    else:
+        interpreter.execute(definition, {'orderIds': order_ids}, execution_type)
+    elapsed = time.perf_counter() - start
+
+    unpaid = [order_id for order_id in order_ids if store.get(order_id, {}).get('status') != 'paid']
+    assert not unpaid and len(store) == len(order_ids), f'{variant}: {len(unpaid)} orders not paid'
+    counts = stats.counts
+    cost = (counts['standardTransitions'] * STANDARD_PRICE_PER_TRANSITION
+            + counts['expressExecutions'] * EXPRESS_PRICE_PER_EXECUTION
+            + counts['express100msUnits'] * EXPRESS_PRICE_PER_64MB_100MS)
+    per_order = {name: value / args.orders for name, value in counts.items()}
+    print(f"{variant:<9} {args.orders / elapsed:>8,.0f} orders/s  {per_order['executions']:>6.3f} executions  "
+          f"{per_order['standardTransitions']:>5.2f} std transitions  {per_order['lambdaInvocations']:>5.2f} Lambda  "
+          f"{per_order['dynamodbRequests']:>5.2f} DynamoDB  ${cost / args.orders * 1_000_000:>8,.2f} per 1M orders")
+    return {'ordersPerSecond': args.orders / elapsed, 'perOrder': per_order,
+            'stepFunctionsCostPerMillion': cost / args.orders * 1_000_000}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--variants', nargs='+', choices=sorted(VARIANTS), default=['standard', 'express', 'batch'])
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='Standard executions in flight; also MapMaxConcurrency for the Map variants')
+    parser.add_argument('--batch-size', type=int, default=50, help='MapBatchSize of the Distributed Map')
+    parser.add_argument('--express-batch', type=int, default=100, help='orders per Express execution')
+    parser.add_argument('--hold-seconds', type=float, default=0, help='wait between hold and accept (express)')
+    parser.add_argument('--wait-scale', type=float, default=0.01, help='real seconds slept per Wait second')
+    parser.add_argument('--lambda-ms', type=float, default=15, help='invocation overhead per Lambda call')
+    parser.add_argument('--dynamodb-ms', type=float, default=5, help='round trip per DynamoDB request')
+    parser.add_argument('--standard-transition-ms', type=float, default=20)
+    parser.add_argument('--express-transition-ms', type=float, default=2)
+    args = parser.parse_args(argv)
+
+    template, parameters = load_template({'MapMaxConcurrency': args.concurrency, 'MapBatchSize': args.batch_size})
+    print(f"{args.orders} orders, {args.concurrency} Lambda calls in flight, {args.lambda_ms:g} ms per call, "
+          f"{args.dynamodb_ms:g} ms per DynamoDB request, transitions {args.standard_transition_ms:g} ms "
+          f"(Standard) / {args.express_transition_ms:g} ms (Express), hold {args.hold_seconds:g} s")
+    return {variant: run_variant(variant, template, parameters, args) for variant in args.variants}
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import base64
+import json
+import os
+import zlib
+
+from instrumentation import stage
+from pagination import json_default
+
+# Shared by every handler (packaged into every zip by lambda.ps1)
+
+HEADERS = {
+    "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
+    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, If-None-Match, If-Match",
+    "Access-Control-Expose-Headers": "ETag",
+    "Content-Type": "application/json"
+}
+# Built once, not per response
+_VARY_HEADERS = {**HEADERS, "Vary": "Accept-Encoding"}
+_GZIP_HEADERS = {**_VARY_HEADERS, "Content-Encoding": "gzip"}
+
+# Smaller bodies are not worth the CPU it takes to compress them
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 5))
+
+# Counter every write path bumps; the item's ETag is derived from it
+VERSION_ATTRIBUTE = 'version'
+
+
+def request_header(event, name):
+    # Header names keep the client's casing in payload format 1.0 (the integrations' default)
+    headers = (event or {}).get('headers') or {}
+    name = name.lower()
+    return next((value for key, value in headers.items() if key.lower() == name), None)
+
+
+def etag(version):
+    # Weak: the gzip and the plain body of one version are the same representation
+    return f'W/"{int(version or 0)}"'
+
+
+def etag_version(header):
+    """The version an If-Match header names (one ETag), or None when it names none."""
+    value = (header or '').strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        return None
+
+
+def etag_matches(header, version):
+    """Weak comparison of an If-None-Match header (a list of ETags or *) with `version`."""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    current = etag(version)[2:]
+    return '*' in tags or any(tag[2:] == current if tag.startswith('W/') else tag == current for tag in tags)
+
+
+def not_modified(version):
+    """304 for a conditional GET: the ETag and no body."""
+    return {"statusCode": 304, "headers": {**HEADERS, "ETag": etag(version)}, "body": ""}
+
+
+def accepts_gzip(event):
+    accept = request_header(event, 'accept-encoding') or ''
+    for part in accept.split(','):
+        name, _, params = part.partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            params = params.strip()
+            try:
+                return not params.startswith('q=') or float(params[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def json_response(status_code, body, event=None, version=None):
+    """
+    HTTP API response with the CORS headers. `body` may already be encoded JSON
+    text; when the request `event` is given, a large body is gzipped (and
+    base64-encoded, which the HTTP API decodes) if the client accepts it. With
+    an item `version` the response carries its ETag. The time it takes is the
+    request's Serialize stage (instrumentation.py).
+    """
+    with stage('Serialize'):
+        text = body if isinstance(body, str) else json.dumps(body, default=json_default, separators=(',', ':'))
+        if event is None:
+            response = {"statusCode": status_code, "headers": HEADERS, "body": text}
+        else:
+            data = text.encode('utf-8')
+            if len(data) >= COMPRESSION_MIN_BYTES and accepts_gzip(event):
+                compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits=31: gzip container
+                response = {
+                    "statusCode": status_code,
+                    "headers": _GZIP_HEADERS,
+                    "isBase64Encoded": True,
+                    "body": base64.b64encode(compressor.compress(data) + compressor.flush()).decode('ascii')
+                }
+            else:
+                response = {"statusCode": status_code, "headers": _VARY_HEADERS, "body": text}
+        if version is not None:
+            response["headers"] = {**response["headers"], "ETag": etag(version)}
+        return response
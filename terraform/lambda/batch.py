@@ -0,0 +1,180 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+# Shared by the bulk handlers (packaged into every zip by lambda.ps1)
+
+WRITE_CHUNK_SIZE = 25    # BatchWriteItem limit
+GET_CHUNK_SIZE = 100     # BatchGetItem limit
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', 1000))
+MAX_ATTEMPTS = int(os.environ.get('BATCH_MAX_ATTEMPTS', 8))
+# UpdateItem calls in flight at once for bulk replacements
+UPDATE_CONCURRENCY = int(os.environ.get('BATCH_UPDATE_CONCURRENCY', 8))
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 2.0
+KEY_ATTRIBUTE = 'id'
+# Provisioned tables throttle with the first; on-demand tables and account limits with the others
+THROTTLE_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded')
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _backoff(attempt):
+    # Exponential backoff with full jitter, as recommended for throttled batch calls
+    time.sleep(random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))))
+
+
+def _throttled(error):
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in THROTTLE_ERRORS
+
+
+def serialize(item):
+    return {k: _serializer.serialize(v) for k, v in item.items()}
+
+
+def deserialize(raw_item):
+    return {k: _deserializer.deserialize(v) for k, v in raw_item.items()}
+
+
+def check_ids(ids):
+    """
+    Validate a list of ids for a bulk request. Returns a list of per-index
+    errors (None where the id is fine); a table key may only appear once in a
+    batch call, so repeats are rejected rather than sent.
+    """
+    if len(ids) > MAX_BATCH_ITEMS:
+        raise ValueError(f"At most {MAX_BATCH_ITEMS} items per request")
+    seen, errors = set(), []
+    for item_id in ids:
+        if not isinstance(item_id, str) or not item_id:
+            errors.append("id must be a non-empty string")
+        elif item_id in seen:
+            errors.append("duplicate id in request")
+        else:
+            seen.add(item_id)
+            errors.append(None)
+    return errors
+
+
+def _request_id(request):
+    if 'PutRequest' in request:
+        return _deserializer.deserialize(request['PutRequest']['Item'][KEY_ATTRIBUTE])
+    return _deserializer.deserialize(request['DeleteRequest']['Key'][KEY_ATTRIBUTE])
+
+
+def batch_write(client, table_name, requests):
+    """
+    Send BatchWriteItem requests ({'PutRequest': ...} / {'DeleteRequest': ...},
+    already serialized) in chunks of 25, retrying UnprocessedItems with
+    backoff. Returns {id: error message} for the items that never got written.
+    """
+    failed = {}
+    for chunk in _chunks(requests, WRITE_CHUNK_SIZE):
+        pending = chunk
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                _backoff(attempt)
+            try:
+                response = client.batch_write_item(RequestItems={table_name: pending})
+            except Exception as e:
+                if _throttled(e):
+                    # The whole call was throttled; every request in it is still pending
+                    continue
+                # Validation errors etc. fail the whole chunk, not the whole request
+                for request in pending:
+                    failed[_request_id(request)] = str(e)
+                pending = []
+                break
+            pending = response.get('UnprocessedItems', {}).get(table_name, [])
+            if not pending:
+                break
+        for request in pending:
+            failed[_request_id(request)] = "Unprocessed after retries"
+    return failed
+
+
+def _update(client, table_name, item_id, attributes, version_attribute):
+    names = {f"#a{index}": name for index, name in enumerate(attributes)}
+    values = {f":a{index}": _serializer.serialize(value) for index, value in enumerate(attributes.values())}
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            _backoff(attempt)
+        try:
+            client.update_item(
+                TableName=table_name,
+                Key={KEY_ATTRIBUTE: {'S': item_id}},
+                UpdateExpression="SET " + ", ".join(f"#a{index} = :a{index}" for index in range(len(attributes)))
+                                 + " ADD #version :one",
+                ExpressionAttributeNames={**names, "#version": version_attribute},
+                ExpressionAttributeValues={**values, ":one": {'N': '1'}})
+            return
+        except Exception as e:
+            if not _throttled(e) or attempt == MAX_ATTEMPTS - 1:
+                raise
+
+
+def update_items(client, table_name, updates, version_attribute):
+    """
+    Write {id: attributes} with one UpdateItem each, UPDATE_CONCURRENCY at a
+    time, adding one to `version_attribute` as put.py does (BatchWriteItem can
+    only overwrite it). Returns {id: error message} for the items not written.
+    """
+    def update(entry):
+        item_id, attributes = entry
+        try:
+            _update(client, table_name, item_id, attributes, version_attribute)
+        except Exception as e:
+            return item_id, str(e)
+        return item_id, None
+
+    if not updates:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(UPDATE_CONCURRENCY, len(updates)))) as executor:
+        return {item_id: error for item_id, error in executor.map(update, updates.items()) if error}
+
+
+def batch_get(client, table_name, ids, projection=None):
+    """
+    Fetch items by id with BatchGetItem in chunks of 100, retrying UnprocessedKeys
+    with backoff. Returns (items_by_id, failed) where failed maps id -> error.
+    `projection` is an optional (ProjectionExpression, ExpressionAttributeNames) pair.
+    """
+    found, failed = {}, {}
+    for chunk in _chunks(ids, GET_CHUNK_SIZE):
+        request = {'Keys': [{KEY_ATTRIBUTE: {'S': item_id}} for item_id in chunk]}
+        if projection:
+            request['ProjectionExpression'], request['ExpressionAttributeNames'] = projection
+        pending = request
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                _backoff(attempt)
+            try:
+                response = client.batch_get_item(RequestItems={table_name: pending})
+            except Exception as e:
+                if _throttled(e):
+                    continue
+                for key in pending['Keys']:
+                    failed[key[KEY_ATTRIBUTE]['S']] = str(e)
+                pending = None
+                break
+            for raw_item in response.get('Responses', {}).get(table_name, []):
+                item = deserialize(raw_item)
+                found[item[KEY_ATTRIBUTE]] = item
+            pending = response.get('UnprocessedKeys', {}).get(table_name)
+            if not pending or not pending.get('Keys'):
+                pending = None
+                break
+        if pending:
+            for key in pending['Keys']:
+                failed[key[KEY_ATTRIBUTE]['S']] = "Unprocessed after retries"
+    return found, failed
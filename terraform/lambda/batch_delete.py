@@ -0,0 +1,51 @@
+import json
+import os
+import boto3
+
+from batch import batch_write, check_ids
+from api_responses import json_response
+from instrumentation import instrument, stage
+
+# DELETE (bulk): {"ids": ["<uuid>", ...]}
+dynamodb_client = boto3.client('dynamodb')
+table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'example-table')
+
+@instrument
+def lambda_handler(event, context):
+    try:
+        with stage('Parse'):
+            body = json.loads(event.get('body') or '{}')
+        if not isinstance(body, dict):
+            return json_response(400, {"error": "Request body must be a JSON object"})
+        ids = body.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return json_response(400, {"error": "ids must be a non-empty array"})
+        try:
+            errors = check_ids(ids)
+        except ValueError as e:
+            return json_response(400, {"error": str(e)})
+
+        requests = [{"DeleteRequest": {"Key": {"id": {"S": item_id}}}}
+                    for item_id, error in zip(ids, errors) if not error]
+        failed = batch_write(dynamodb_client, table_name, requests)
+
+        # BatchWriteItem cannot return old items, so a missing id is reported as deleted too
+        results = []
+        for index, (item_id, error) in enumerate(zip(ids, errors)):
+            error = error or failed.get(item_id)
+            if error:
+                results.append({"index": index, "id": item_id, "status": "failed", "error": error})
+            else:
+                results.append({"index": index, "id": item_id, "status": "deleted"})
+
+        failed_count = sum(1 for result in results if result["status"] == "failed")
+        return json_response(200 if not failed_count else 207, {
+            "succeeded": len(results) - failed_count,
+            "failed": failed_count,
+            "results": results
+        })
+
+    except json.JSONDecodeError:
+        return json_response(400, {"error": "Request body must be valid JSON"})
+    except Exception as e:
+        return json_response(500, {"error": str(e)})
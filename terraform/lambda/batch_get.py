@@ -0,0 +1,62 @@
+import json
+import os
+import boto3
+
+from batch import batch_get, check_ids
+from pagination import KEY_ATTRIBUTES, build_projection, parse_list_params
+from api_responses import json_response
+from instrumentation import instrument, stage
+
+# POST (bulk read): {"ids": ["<uuid>", ...], "fields": ["name", "value"]}
+dynamodb_client = boto3.client('dynamodb')
+table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'example-table')
+
+@instrument
+def lambda_handler(event, context):
+    try:
+        with stage('Parse'):
+            body = json.loads(event.get('body') or '{}')
+        if not isinstance(body, dict):
+            return json_response(400, {"error": "Request body must be a JSON object"})
+        ids = body.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return json_response(400, {"error": "ids must be a non-empty array"})
+        try:
+            errors = check_ids(ids)
+            # Same field validation as the list endpoints
+            fields = body.get('fields') or []
+            if not isinstance(fields, list):
+                raise ValueError("fields must be an array")
+            fields = parse_list_params({'fields': ','.join(map(str, fields))})['fields']
+        except ValueError as e:
+            return json_response(400, {"error": str(e)})
+
+        # id is always projected so results can be matched to the request
+        projection = build_projection(fields, KEY_ATTRIBUTES) if fields else None
+
+        valid_ids = [item_id for item_id, error in zip(ids, errors) if not error]
+        found, failed = batch_get(dynamodb_client, table_name, valid_ids, projection)
+
+        # One result per requested id, in request order
+        results = []
+        for index, (item_id, error) in enumerate(zip(ids, errors)):
+            error = error or failed.get(item_id)
+            if error:
+                results.append({"index": index, "id": item_id, "status": "failed", "error": error})
+            elif item_id in found:
+                results.append({"index": index, "id": item_id, "status": "found", "item": found[item_id]})
+            else:
+                results.append({"index": index, "id": item_id, "status": "not_found"})
+
+        failed_count = sum(1 for result in results if result["status"] == "failed")
+        return json_response(200 if not failed_count else 207, {
+            "found": len(found),
+            "notFound": len(results) - failed_count - len(found),
+            "failed": failed_count,
+            "results": results
+        }, event=event)
+
+    except json.JSONDecodeError:
+        return json_response(400, {"error": "Request body must be valid JSON"})
+    except Exception as e:
+        return json_response(500, {"error": str(e)})
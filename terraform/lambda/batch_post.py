@@ -0,0 +1,78 @@
+import json
+import os
+import boto3
+from decimal import Decimal
+from uuid import uuid4
+
+from batch import MAX_BATCH_ITEMS, batch_write, check_ids, serialize, update_items
+from api_responses import VERSION_ATTRIBUTE, json_response
+from instrumentation import instrument, stage
+
+# POST (bulk): {"items": [{"name": ..., "description": ..., "value": ...}, ...]}
+dynamodb_client = boto3.client('dynamodb')
+table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'example-table')
+
+@instrument
+def lambda_handler(event, context):
+    try:
+        # Numbers stay Decimal so DynamoDB accepts them
+        with stage('Parse'):
+            body = json.loads(event.get('body') or '{}', parse_float=Decimal)
+        if not isinstance(body, dict):
+            return json_response(400, {"error": "Request body must be a JSON object"})
+        items = body.get('items')
+        if not isinstance(items, list) or not items:
+            return json_response(400, {"error": "items must be a non-empty array"})
+        if len(items) > MAX_BATCH_ITEMS:
+            return json_response(400, {"error": f"At most {MAX_BATCH_ITEMS} items per request"})
+        if not all(isinstance(item, dict) for item in items):
+            return json_response(400, {"error": "every entry in items must be an object"})
+
+        # An item that carries an id replaces that item (bulk PUT); otherwise a UUID is generated
+        ids = [item.get('id') or str(uuid4()) for item in items]
+        errors = check_ids(ids)
+
+        # New items start at version 1 and go out in batches. A replacement is an
+        # UpdateItem that adds one to the version, as put.py does
+        requests, replacements = [], {}
+        for item_id, item, error in zip(ids, items, errors):
+            if error:
+                continue
+            attributes = {
+                'name': item.get('name', 'default_name'),
+                'description': item.get('description', 'default_description'),
+                'value': item.get('value', 'default_value'),
+            }
+            if item.get('id'):
+                replacements[item_id] = attributes
+            else:
+                requests.append({"PutRequest": {"Item": serialize({'id': item_id, **attributes, VERSION_ATTRIBUTE: 1})}})
+
+        failed = batch_write(dynamodb_client, table_name, requests)
+        failed.update(update_items(dynamodb_client, table_name, replacements, VERSION_ATTRIBUTE))
+
+        # One result per input item, in request order
+        results = []
+        for index, (item_id, error) in enumerate(zip(ids, errors)):
+            error = error or failed.get(item_id)
+            if error:
+                results.append({"index": index, "id": item_id, "status": "failed", "error": error})
+            else:
+                results.append({"index": index, "id": item_id, "status": "written"})
+
+        failed_count = sum(1 for result in results if result["status"] == "failed")
+        return json_response(200 if not failed_count else 207, {
+            "succeeded": len(results) - failed_count,
+            "failed": failed_count,
+            "results": results
+        })
+
+    except json.JSONDecodeError:
+        return json_response(400, {"error": "Request body must be valid JSON"})
+    except Exception as e:
+        return json_response(500, {"error": str(e)})
+
+
+# {
+#     "body": "{\"items\": [{\"name\": \"A\", \"value\": \"1\"}, {\"id\": \"<uuid>\", \"name\": \"B\"}]}"
+# }
@@ -1,64 +1,58 @@
 import json
 import boto3
+from botocore.exceptions import ClientError
+
+from api_responses import VERSION_ATTRIBUTE, etag_version, json_response, request_header
+from instrumentation import instrument, stage
 
 # Fetch the table name from the environment variable
 dynamodb = boto3.resource('dynamodb')
 table_name = 'example-table'
 table = dynamodb.Table(table_name)
 
+@instrument
 def lambda_handler(event, context):
     try:
-        body = json.loads(event.get('body', '{}'))
+        with stage('Parse'):
+            body = json.loads(event.get('body', '{}'))
         item_id = body.get('id')
 
         if not item_id:
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Content-Type": "application/json"
-                },
-                "body": json.dumps({"error": "id is required to delete an item"})
-            }
+            return json_response(400, {"error": "id is required to delete an item"})
+
+        # With If-Match, only delete the version the client has seen
+        condition = {}
+        if_match = request_header(event, 'if-match')
+        if if_match and if_match.strip() != '*':
+            expected = etag_version(if_match)
+            if expected is None:
+                return json_response(400, {"error": "If-Match must be an ETag returned by this API"})
+            condition["ExpressionAttributeNames"] = {"#version": VERSION_ATTRIBUTE}
+            if expected:
+                condition["ConditionExpression"] = "#version = :expected"
+                condition["ExpressionAttributeValues"] = {":expected": expected}
+            else:
+                # Items written before versioning have no counter (ETag W/"0")
+                condition["ConditionExpression"] = "attribute_exists(id) AND attribute_not_exists(#version)"
 
-        response = table.delete_item(
-            Key={'id': item_id},
-            ReturnValues="ALL_OLD"
-        )
+        try:
+            response = table.delete_item(
+                Key={'id': item_id},
+                ReturnValues="ALL_OLD",
+                **condition
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return json_response(412, {"error": "Item was modified since the given ETag"})
 
         if 'Attributes' in response:
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Content-Type": "application/json"
-                },
-                "body": json.dumps({
-                    "message": "Item deleted successfully",
-                    "deletedItem": response['Attributes']
-                })
-            }
+            return json_response(200, {
+                "message": "Item deleted successfully",
+                "deletedItem": response['Attributes']
+            })
         else:
-            return {
-                "statusCode": 404,
-                "headers": {
-                    "Content-Type": "application/json"
-                },
-                "body": json.dumps({"error": "Item not found"})
-            }
+            return json_response(404, {"error": "Item not found"})
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                    "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Content-Type": "application/json"
-                },
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(500, {"error": str(e)})
@@ -1,41 +1,30 @@
-import json
+import os
 import boto3
 import logging
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('example-table')
+from pagination import list_items, parse_list_params
+from api_responses import json_response
+from instrumentation import instrument
+
+# The list endpoint uses the low-level client: it is thread safe for parallel scans
+dynamodb_client = boto3.client('dynamodb')
+table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'example-table')
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+@instrument
 def lambda_handler(event, context):
-    logger.info("Received event: %s", json.dumps(event))
-
     try:
-        # Scan the entire DynamoDB table
-        response = table.scan()
-        items = response.get('Items', [])
+        # ?limit=&nextToken=&fields=a,b&segments=N
+        params = parse_list_params(event.get('queryStringParameters'))
+    except ValueError as e:
+        return json_response(400, {"error": str(e)})
 
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Content-Type": "application/json"
-            },
-            "body": json.dumps(items)  # Ensure body is a string
-        }
+    try:
+        # One page of the table, encoded item by item (gzipped when the client accepts it)
+        return json_response(200, list_items(dynamodb_client, table_name, params), event=event)
 
     except Exception as e:
         logger.error("Error: %s", str(e))
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Content-Type": "application/json"
-            },
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(500, {"error": str(e)})
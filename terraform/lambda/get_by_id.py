@@ -1,9 +1,17 @@
-import json
+import os
 import boto3
 
+from pagination import list_items, parse_list_params
+from api_responses import VERSION_ATTRIBUTE, etag_matches, json_response, not_modified, request_header
+from instrumentation import instrument
+
 dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('example-table')
+# Plain client for list pages (a resource's client rewrites attribute values)
+dynamodb_client = boto3.client('dynamodb')
+table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'example-table')
+table = dynamodb.Table(table_name)
 
+@instrument
 def lambda_handler(event, context):
     try:
         # Check if 'id' is present in path parameters
@@ -11,55 +19,33 @@ def lambda_handler(event, context):
         item_id = path_parameters.get('id') if path_parameters else None
         
         if item_id:
+            # Conditional GET: read only the version first, the item only when it changed
+            # (a projection saves transfer and parsing, not read capacity)
+            if_none_match = request_header(event, 'if-none-match')
+            if if_none_match:
+                current = table.get_item(
+                    Key={'id': item_id},
+                    ProjectionExpression='#version',
+                    ExpressionAttributeNames={'#version': VERSION_ATTRIBUTE}
+                ).get('Item')
+                if current is not None and etag_matches(if_none_match, current.get(VERSION_ATTRIBUTE)):
+                    return not_modified(current.get(VERSION_ATTRIBUTE))
+
             # Fetch a single item if 'id' is provided
             response = table.get_item(Key={'id': item_id})
             item = response.get('Item')
 
             if item:
-                return {
-                    "statusCode": 200,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Content-Type": "application/json"
-                    },
-                    "body": json.dumps(item)
-                }
+                return json_response(200, item, event=event, version=item.get(VERSION_ATTRIBUTE, 0))
             else:
-                return {
-                    "statusCode": 404,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Content-Type": "application/json"
-                    },
-                    "body": json.dumps({"message": "Item not found"})
-                }
+                return json_response(404, {"message": "Item not found"})
         else:
-            # If no 'id' is provided, return all items
-            response = table.scan()
-            items = response.get('Items', [])
-            return {
-                "statusCode": 200,
-                "headers": {
-                        "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Content-Type": "application/json"
-                    },
-                "body": json.dumps(items)
-            }
+            # If no 'id' is provided, return one page of items (same contract as get.py)
+            try:
+                params = parse_list_params(event.get('queryStringParameters'))
+            except ValueError as e:
+                return json_response(400, {"error": str(e)})
+            return json_response(200, list_items(dynamodb_client, table_name, params), event=event)
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                        "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Content-Type": "application/json"
-                    },
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(500, {"error": str(e)})
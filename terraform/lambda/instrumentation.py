@@ -0,0 +1,158 @@
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import boto3
+
+# Shared by every handler (packaged into every zip by lambda.ps1)
+#
+# @instrument times each request and its stages and writes them as one
+# CloudWatch Embedded Metric Format line: HandlerDuration and <Stage>Duration
+# (milliseconds) for DynamoDB calls (timed through botocore's events), Parse
+# (`with stage('Parse'):`) and Serialize (json_response). Time in the same stage
+# is summed, also across the threads of a parallel scan.
+#
+# The full event and DEBUG lines are logged for LOG_EVENT_SAMPLE_RATE of the
+# requests (default 1%) and for every failed (exception or 5xx) or slow
+# (SLOW_REQUEST_MS, default 1000) request; DEBUG lines are held back until the
+# request's outcome is known. Only the handlers' own lines: the AWS SDK loggers
+# stay at WARNING, their DEBUG output costs time on every call and botocore's
+# includes signed request headers.
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'CrudApi')
+EVENT_SAMPLE_RATE = float(os.environ.get('LOG_EVENT_SAMPLE_RATE', 0.01))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 1000))
+MAX_BUFFERED_RECORDS = 200
+QUIET_LOGGERS = ('boto3', 'botocore', 's3transfer', 'urllib3')
+
+_lock = threading.Lock()
+_stages = {}
+
+
+def record(name, seconds):
+    with _lock:
+        _stages[name] = _stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def _before_call(context, **kwargs):
+    context['instrumentation_start'] = time.perf_counter()
+
+
+def _after_call(model, context, **kwargs):
+    start = context.get('instrumentation_start')
+    if start is not None:
+        record(model.service_model.service_id.replace(' ', ''), time.perf_counter() - start)
+
+
+# Clients copy the session's handlers when they are created: handlers import
+# this (through api_responses) before they create theirs
+if boto3.DEFAULT_SESSION is None:
+    boto3.setup_default_session()
+boto3.DEFAULT_SESSION.events.register('before-call', _before_call, unique_id='instrumentation-before-call')
+boto3.DEFAULT_SESSION.events.register('after-call', _after_call, unique_id='instrumentation-after-call')
+
+# The wrapper lowers the root logger to DEBUG; an explicit level keeps these out
+for name in QUIET_LOGGERS:
+    if logging.getLogger(name).level == logging.NOTSET:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+class _HoldBack(logging.Filter):
+    """Keeps records below `threshold` out of a handler until flushed (or dropped)."""
+
+    def __init__(self, threshold):
+        super().__init__()
+        self.threshold = threshold
+        self.records = []
+        self.passing = False
+
+    def filter(self, record):
+        if self.passing or record.levelno >= self.threshold:
+            return True
+        if len(self.records) < MAX_BUFFERED_RECORDS:
+            self.records.append(record)
+        return False
+
+    def flush(self, handlers):
+        self.passing = True
+        for record in self.records:
+            for handler in handlers:
+                handler.handle(record)
+        self.records.clear()
+
+
+def _emit_metrics(function_name, values):
+    # One EMF line; CloudWatch Logs turns it into metrics, no PutMetricData call
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [["FunctionName"]],
+                "Metrics": [{"Name": name, "Unit": "Count" if name == "SlowRequest" else "Milliseconds"}
+                            for name in values],
+            }],
+        },
+        "FunctionName": function_name,
+        **values
+    }, separators=(',', ':')), flush=True)
+
+
+def instrument(handler):
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        with _lock:
+            _stages.clear()
+        logger = logging.getLogger()
+        level = logger.getEffectiveLevel()
+        sampled = random.random() < EVENT_SAMPLE_RATE
+        hold_back, handlers = None, list(logger.handlers)
+        if level > logging.DEBUG:
+            logger.setLevel(logging.DEBUG)
+            if not sampled:
+                hold_back = _HoldBack(level)
+                for log_handler in handlers:
+                    log_handler.addFilter(hold_back)
+
+        failed, start = True, time.perf_counter()
+        try:
+            response = handler(event, context)
+            failed = isinstance(response, dict) and response.get('statusCode', 200) >= 500
+            return response
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            with _lock:
+                values = {f"{name}Duration": round(seconds * 1000, 3) for name, seconds in _stages.items()}
+            values["HandlerDuration"] = round(duration_ms, 3)
+            slow = duration_ms >= SLOW_REQUEST_MS
+            if slow:
+                values["SlowRequest"] = 1
+            function_name = getattr(context, 'function_name', None) or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', '')
+            _emit_metrics(function_name, values)
+
+            if hold_back is not None and (failed or slow):
+                hold_back.flush(handlers)
+            if failed or slow or sampled:
+                reason = "error" if failed else "slow" if slow else "sampled"
+                log = logger.info if reason == "sampled" else logger.warning
+                log("Request event (%s, %.1f ms): %s", reason, duration_ms, json.dumps(event, default=str))
+            if hold_back is not None:
+                for log_handler in handlers:
+                    log_handler.removeFilter(hold_back)
+            if level > logging.DEBUG:
+                logger.setLevel(level)
+    return wrapper
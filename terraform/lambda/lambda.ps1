@@ -5,8 +5,14 @@ $lambdas = @{
     "delete.py" = "delete.zip"
     "post.py" = "post.zip"
     "get_by_id.py" = "get_by_id.zip"
+    "batch_post.py" = "batch_post.zip"
+    "batch_get.py" = "batch_get.zip"
+    "batch_delete.py" = "batch_delete.zip"
 }
 
+# Shared helper modules bundled into every zip next to the handler
+$shared = @("pagination.py", "batch.py", "api_responses.py", "instrumentation.py")
+
 # Loop through each Lambda function, zip them, and create the corresponding .zip file
 foreach ($lambda in $lambdas.Keys) {
     $zip_file = $lambdas[$lambda]
@@ -14,7 +20,7 @@ foreach ($lambda in $lambdas.Keys) {
     # Check if the Python file exists
     if (Test-Path $lambda) {
         Write-Host "Zipping $lambda into $zip_file..."
-        Compress-Archive -Path $lambda -DestinationPath $zip_file -Force
+        Compress-Archive -Path (@($lambda) + $shared) -DestinationPath $zip_file -Force
     } else {
         Write-Host "Error: $lambda not found! Skipping..." -ForegroundColor Red
     }
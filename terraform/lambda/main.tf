@@ -33,7 +33,9 @@ resource "aws_iam_policy" "lambda_dynamodb_policy" {
           "dynamodb:UpdateItem",
           "dynamodb:GetItem",
           "dynamodb:Scan",
-          "dynamodb:DeleteItem"
+          "dynamodb:DeleteItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:BatchGetItem"
         ],
         Effect   = "Allow",
         Resource = "arn:aws:dynamodb:eu-central-1:<number of account>:table/example-table"
@@ -130,6 +132,58 @@ resource "aws_lambda_function" "delete_function" {
   }
 }
 
+# Bulk handlers (arrays of items, BatchWriteItem / BatchGetItem)
+resource "aws_lambda_function" "batch_post_function" {
+  function_name = "batch_post"
+  handler       = "batch_post.lambda_handler"
+  runtime       = "python3.9"
+  role          = aws_iam_role.lambda_role_testing_part.arn
+  timeout       = 30 # Bulk requests with retries take longer than the 3 s default
+
+  filename = "batch_post.zip"
+  source_code_hash = filebase64sha256("batch_post.zip")
+
+  environment {
+    variables = {
+      DYNAMODB_TABLE_NAME = "example-table"
+    }
+  }
+}
+
+resource "aws_lambda_function" "batch_get_function" {
+  function_name = "batch_get"
+  handler       = "batch_get.lambda_handler"
+  runtime       = "python3.9"
+  role          = aws_iam_role.lambda_role_testing_part.arn
+  timeout       = 30 # Bulk requests with retries take longer than the 3 s default
+
+  filename = "batch_get.zip"
+  source_code_hash = filebase64sha256("batch_get.zip")
+
+  environment {
+    variables = {
+      DYNAMODB_TABLE_NAME = "example-table"
+    }
+  }
+}
+
+resource "aws_lambda_function" "batch_delete_function" {
+  function_name = "batch_delete"
+  handler       = "batch_delete.lambda_handler"
+  runtime       = "python3.9"
+  role          = aws_iam_role.lambda_role_testing_part.arn
+  timeout       = 30 # Bulk requests with retries take longer than the 3 s default
+
+  filename = "batch_delete.zip"
+  source_code_hash = filebase64sha256("batch_delete.zip")
+
+  environment {
+    variables = {
+      DYNAMODB_TABLE_NAME = "example-table"
+    }
+  }
+}
+
 # HTTP API Gateway v2 Setup with CORS
 resource "aws_apigatewayv2_api" "http_api" {
   name          = "API"
@@ -180,6 +234,27 @@ resource "aws_apigatewayv2_integration" "delete_function_integration" {
   integration_method = "POST"  # AWS_PROXY requires POST method
 }
 
+resource "aws_apigatewayv2_integration" "batch_post_function_integration" {
+  api_id             = aws_apigatewayv2_api.http_api.id
+  integration_type   = "AWS_PROXY"
+  integration_uri    = aws_lambda_function.batch_post_function.invoke_arn
+  integration_method = "POST"  # AWS_PROXY requires POST method
+}
+
+resource "aws_apigatewayv2_integration" "batch_get_function_integration" {
+  api_id             = aws_apigatewayv2_api.http_api.id
+  integration_type   = "AWS_PROXY"
+  integration_uri    = aws_lambda_function.batch_get_function.invoke_arn
+  integration_method = "POST"  # AWS_PROXY requires POST method
+}
+
+resource "aws_apigatewayv2_integration" "batch_delete_function_integration" {
+  api_id             = aws_apigatewayv2_api.http_api.id
+  integration_type   = "AWS_PROXY"
+  integration_uri    = aws_lambda_function.batch_delete_function.invoke_arn
+  integration_method = "POST"  # AWS_PROXY requires POST method
+}
+
 # Routes for each function (map correct HTTP method in routes)
 resource "aws_apigatewayv2_route" "post_function_route" {
   api_id    = aws_apigatewayv2_api.http_api.id
@@ -211,6 +286,24 @@ resource "aws_apigatewayv2_route" "delete_function_route" {
   target    = "integrations/${aws_apigatewayv2_integration.delete_function_integration.id}"
 }
 
+resource "aws_apigatewayv2_route" "batch_post_function_route" {
+  api_id    = aws_apigatewayv2_api.http_api.id
+  route_key = "POST /batch_post_function"
+  target    = "integrations/${aws_apigatewayv2_integration.batch_post_function_integration.id}"
+}
+
+resource "aws_apigatewayv2_route" "batch_get_function_route" {
+  api_id    = aws_apigatewayv2_api.http_api.id
+  route_key = "POST /batch_get_function"
+  target    = "integrations/${aws_apigatewayv2_integration.batch_get_function_integration.id}"
+}
+
+resource "aws_apigatewayv2_route" "batch_delete_function_route" {
+  api_id    = aws_apigatewayv2_api.http_api.id
+  route_key = "DELETE /batch_delete_function"
+  target    = "integrations/${aws_apigatewayv2_integration.batch_delete_function_integration.id}"
+}
+
 # Permissions for Lambda to be invoked by API Gateway
 resource "aws_lambda_permission" "allow_post_function" {
   statement_id  = "AllowAPIGatewayInvokePost"
@@ -252,6 +345,30 @@ resource "aws_lambda_permission" "allow_delete_function" {
   source_arn    = "${aws_apigatewayv2_api.http_api.execution_arn}/*/DELETE/delete_function"
 }
 
+resource "aws_lambda_permission" "allow_batch_post_function" {
+  statement_id  = "AllowAPIGatewayInvokeBatchPost"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.batch_post_function.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.http_api.execution_arn}/*/POST/batch_post_function"
+}
+
+resource "aws_lambda_permission" "allow_batch_get_function" {
+  statement_id  = "AllowAPIGatewayInvokeBatchGet"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.batch_get_function.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.http_api.execution_arn}/*/POST/batch_get_function"
+}
+
+resource "aws_lambda_permission" "allow_batch_delete_function" {
+  statement_id  = "AllowAPIGatewayInvokeBatchDelete"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.batch_delete_function.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.http_api.execution_arn}/*/DELETE/batch_delete_function"
+}
+
 # Deploy the API Gateway HTTP API
 resource "aws_apigatewayv2_stage" "default" {
   api_id      = aws_apigatewayv2_api.http_api.id
@@ -0,0 +1,185 @@
+import base64
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer
+
+# Shared by get.py and get_by_id.py (packaged into both zips by lambda.ps1)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MAX_SEGMENTS = 16
+MAX_FIELDS = 20
+# Stay well below the 6 MB synchronous Lambda response payload limit
+MAX_BODY_BYTES = 5 * 1024 * 1024
+KEY_ATTRIBUTES = ('id',)
+
+_FIELD_PATTERN = re.compile(r'^[A-Za-z0-9_\-]{1,255}$')
+_deserializer = TypeDeserializer()
+
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode('ascii')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_token(state):
+    raw = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_token(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid nextToken")
+
+
+def _is_start_key(key):
+    # A LastEvaluatedKey as the scan returned it: the key attributes, each one typed value
+    return isinstance(key, dict) and set(key) == set(KEY_ATTRIBUTES) and all(
+        isinstance(value, dict) and len(value) == 1
+        and isinstance(value.get('S', value.get('N', value.get('B'))), str)
+        for value in key.values())
+
+
+def parse_list_params(query_params):
+    """
+    Validate the list query string: limit, nextToken, fields (comma separated)
+    and segments (parallel scan). Raises ValueError on bad input.
+    """
+    query_params = query_params or {}
+
+    try:
+        limit = int(query_params.get('limit', DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    try:
+        segments = int(query_params.get('segments', 1))
+    except (TypeError, ValueError):
+        raise ValueError("segments must be an integer")
+    if not 1 <= segments <= MAX_SEGMENTS:
+        raise ValueError(f"segments must be between 1 and {MAX_SEGMENTS}")
+
+    fields = None
+    if query_params.get('fields'):
+        fields = [f.strip() for f in query_params['fields'].split(',') if f.strip()]
+        if len(fields) > MAX_FIELDS:
+            raise ValueError(f"At most {MAX_FIELDS} fields can be requested")
+        invalid = [f for f in fields if not _FIELD_PATTERN.match(f)]
+        if invalid:
+            raise ValueError(f"Invalid field names: {', '.join(invalid)}")
+
+    state = None
+    if query_params.get('nextToken'):
+        state = decode_token(query_params['nextToken'])
+        # A token is only valid for the scan mode that produced it
+        if not isinstance(state, dict) or state.get('segments') != segments:
+            raise ValueError("nextToken does not match the requested segments")
+        if segments == 1:
+            valid = _is_start_key(state.get('key'))
+        else:
+            keys = state.get('keys')
+            valid = isinstance(keys, list) and len(keys) == segments \
+                and all(key is None or _is_start_key(key) for key in keys)
+        if not valid:
+            raise ValueError("Invalid nextToken")
+
+    return {'limit': limit, 'fields': fields, 'segments': segments, 'state': state}
+
+
+def build_projection(fields, key_attributes):
+    # The key is always projected so a truncated page can be resumed from the last item
+    names = list(dict.fromkeys(list(key_attributes) + fields))
+    placeholders = {f"#p{i}": name for i, name in enumerate(names)}
+    return ', '.join(placeholders), placeholders
+
+
+def scan_page(client, table_name, limit, start_key=None, fields=None, segment=None,
+              total_segments=None, max_bytes=None, key_attributes=KEY_ATTRIBUTES):
+    """
+    Scan up to `limit` items, following LastEvaluatedKey across the 1 MB
+    DynamoDB pages. Items are JSON-encoded as they are read and the scan stops
+    early once `max_bytes` of encoded output is reached.
+
+    Returns (encoded_items, size_in_bytes, next_key); next_key is None when the
+    table (or segment) is exhausted.
+    """
+    max_bytes = max_bytes or MAX_BODY_BYTES
+    kwargs = {'TableName': table_name}
+    if fields:
+        kwargs['ProjectionExpression'], kwargs['ExpressionAttributeNames'] = build_projection(fields, key_attributes)
+    if total_segments and total_segments > 1:
+        kwargs['Segment'] = segment
+        kwargs['TotalSegments'] = total_segments
+
+    encoded, size, next_key, last_key = [], 0, start_key, None
+    while True:
+        if next_key:
+            kwargs['ExclusiveStartKey'] = next_key
+        kwargs['Limit'] = limit - len(encoded)
+        response = client.scan(**kwargs)
+
+        for raw_item in response.get('Items', []):
+            item = {k: _deserializer.deserialize(v) for k, v in raw_item.items()}
+            chunk = json.dumps(item, default=json_default, separators=(',', ':'))
+            # +1 accounts for the separating comma
+            if encoded and size + len(chunk) + 1 > max_bytes:
+                return encoded, size, last_key
+            encoded.append(chunk)
+            size += len(chunk) + 1
+            last_key = {k: raw_item[k] for k in key_attributes}
+
+        next_key = response.get('LastEvaluatedKey')
+        if not next_key or len(encoded) >= limit:
+            return encoded, size, next_key
+
+
+def list_items(client, table_name, params):
+    """
+    Build the JSON body for one page of a list request. With segments > 1 the
+    page is assembled from a parallel scan, one worker thread per segment, and
+    the returned nextToken carries one cursor per segment.
+    """
+    limit, fields, segments, state = params['limit'], params['fields'], params['segments'], params['state']
+
+    if segments == 1:
+        start_key = state['key'] if state else None
+        encoded, _, next_key = scan_page(client, table_name, limit, start_key, fields)
+        next_state = {'segments': 1, 'key': next_key} if next_key else None
+    else:
+        # None marks a finished segment; a missing token means every segment starts fresh
+        cursors = state['keys'] if state else [{}] * segments
+        per_segment_limit = max(1, -(-limit // segments))
+        per_segment_bytes = MAX_BODY_BYTES // segments
+
+        def scan_segment(segment):
+            cursor = cursors[segment]
+            if cursor is None:
+                return [], 0, None
+            return scan_page(client, table_name, per_segment_limit, cursor or None, fields,
+                             segment, segments, per_segment_bytes)
+
+        # The low-level client is thread safe, so one client serves every worker
+        with ThreadPoolExecutor(max_workers=segments) as executor:
+            results = list(executor.map(scan_segment, range(segments)))
+
+        encoded = [chunk for chunk_list, _, _ in results for chunk in chunk_list]
+        next_keys = [key for _, _, key in results]
+        next_state = {'segments': segments, 'keys': next_keys} if any(next_keys) else None
+
+    body = '{"items":[' + ','.join(encoded) + '],"count":' + str(len(encoded))
+    if next_state:
+        body += ',"nextToken":' + json.dumps(encode_token(next_state))
+    return body + '}'
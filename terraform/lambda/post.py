@@ -1,14 +1,20 @@
 import json
 import boto3
 from uuid import uuid4
+
+from api_responses import VERSION_ATTRIBUTE, json_response
+from instrumentation import instrument, stage
+
 # POST
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table('example-table')
 
+@instrument
 def lambda_handler(event, context):
     try:
         # Parse the body of the request
-        body = json.loads(event['body'])
+        with stage('Parse'):
+            body = json.loads(event['body'])
 
         # Generate a random item ID
         item_id = str(uuid4())
@@ -22,20 +28,15 @@ def lambda_handler(event, context):
                 'id': item_id,
                 'name': item_name,
                 'description': item_description,
-                'value': random_value
+                'value': random_value,
+                VERSION_ATTRIBUTE: 1
             }
         )
 
-        return {
-            "statusCode": 200,
-            "body": json.dumps({ "message": "Item inserted successfully", "id": item_id })
-        }
+        return json_response(200, { "message": "Item inserted successfully", "id": item_id }, version=1)
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({ "error": str(e) })
-        }
+        return json_response(500, { "error": str(e) })
 
 
 # {
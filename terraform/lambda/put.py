@@ -1,40 +1,28 @@
 import json
 import boto3
+from botocore.exceptions import ClientError
+
+from api_responses import VERSION_ATTRIBUTE, etag_version, json_response, request_header
+from instrumentation import instrument, stage
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table('example-table')
 
+@instrument
 def lambda_handler(event, context):
     try:
         # Parse the body of the request
-        body = json.loads(event.get('body', '{}'))
+        with stage('Parse'):
+            body = json.loads(event.get('body', '{}'))
         
         # Check if 'id' is provided in the request body
         item_id = body.get('id')
         if not item_id:
-            return {
-                "statusCode": 400,
-                "headers": {
-                        "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Content-Type": "application/json"
-                    },
-                "body": json.dumps({"error": "id is required to update an item"})
-            }
+            return json_response(400, {"error": "id is required to update an item"})
         
         # Check if there is at least one field to update
         if not any(field in body for field in ['name', 'description', 'value']):
-            return {
-                "statusCode": 400,
-                "headers": {
-                        "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Content-Type": "application/json"
-                    },
-                "body": json.dumps({"error": "No fields to update"})
-            }
+            return json_response(400, {"error": "No fields to update"})
         
         # Update item attributes
         update_expression = "set"
@@ -53,43 +41,51 @@ def lambda_handler(event, context):
         # Remove the trailing comma from the update expression
         update_expression = update_expression.rstrip(',')
 
-        # Define the attribute names to update
-        expression_attribute_names = {
-            "#name": "name",
-            "#value": "value"
-        }
+        # Every update bumps the version the ETag is derived from
+        update_expression += " ADD #version :one"
+        expression_attribute_values[":one"] = 1
+
+        # Define the attribute names to update (DynamoDB rejects names the expressions don't use)
+        expression_attribute_names = {"#version": VERSION_ATTRIBUTE}
+        if 'name' in body:
+            expression_attribute_names["#name"] = "name"
+        if 'value' in body:
+            expression_attribute_names["#value"] = "value"
+
+        # With If-Match, only update the version the client has seen
+        condition = {}
+        if_match = request_header(event, 'if-match')
+        if if_match and if_match.strip() != '*':
+            expected = etag_version(if_match)
+            if expected is None:
+                return json_response(400, {"error": "If-Match must be an ETag returned by this API"})
+            if expected:
+                condition["ConditionExpression"] = "#version = :expected"
+                expression_attribute_values[":expected"] = expected
+            else:
+                # Items written before versioning have no counter (ETag W/"0")
+                condition["ConditionExpression"] = "attribute_not_exists(#version)"
 
         # Perform the update operation
-        response = table.update_item(
-            Key={'id': item_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values,
-            ExpressionAttributeNames=expression_attribute_names,
-            ReturnValues="UPDATED_NEW"
-        )
-        
-        return {
-            "statusCode": 200,
-            "headers": {
-                        "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Content-Type": "application/json"
-                    },
-            "body": json.dumps({
-                "message": "Item updated successfully",
-                "updatedAttributes": response.get('Attributes')
-            })
-        }
+        try:
+            response = table.update_item(
+                Key={'id': item_id},
+                UpdateExpression=update_expression,
+                ExpressionAttributeValues=expression_attribute_values,
+                ExpressionAttributeNames=expression_attribute_names,
+                ReturnValues="UPDATED_NEW",
+                **condition
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return json_response(412, {"error": "Item was modified since the given ETag"})
+
+        attributes = response.get('Attributes', {})
+        return json_response(200, {
+            "message": "Item updated successfully",
+            "updatedAttributes": attributes
+        }, version=attributes.get(VERSION_ATTRIBUTE))
     
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                        "Access-Control-Allow-Origin": "*",  # Allow all origins (adjust as needed)
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Content-Type": "application/json"
-                    },
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(500, {"error": str(e)})